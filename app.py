@@ -1,15 +1,28 @@
+import pandas as pd
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import time
 import logging
 from datetime import datetime, timedelta
 
-from src.api.binance_client import BinanceAPI
-from src.data.market_data import get_market_info, fetch_candlesticks
+from src.api.account_stream import get_account_stream
+from src.api.binance_client import get_binance_api
+from src.api.depth_stream import get_depth_stream
+from src.api.local_client import LocalStoreClient
+from src.data.kline_store import INTERVAL_MS
+from src.data.market_data import get_market_info, get_market_overview, fetch_candlesticks
 from src.utils.formatting import format_currency, format_price_change, format_number
-from src.utils.email_service import send_price_alert
-from src.visualization.charts import plot_candlestick, plot_price_evolution
+from src.utils.cache import candle_ttl, get_data_cache
+from src.utils.metrics import export_metrics, get_metrics_registry, span, start_metrics_server
+from src.visualization.chart_width import chart_max_points
+from src.visualization.live_charts import LiveCandlestickChart, LivePriceChart
 import config
 
+# Every rerun executes this file from the top, so modules only some views or
+# actions need (plotly figures, cross-asset analytics, the archive, SMTP) are
+# imported where they are used rather than here.
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -97,21 +110,266 @@ def display_market_info(market_data, symbol):
         st.markdown("<p class='market-label'>ALL-TIME HIGH</p>", unsafe_allow_html=True)
         st.markdown(f"<p class='market-metric'>${market_data['all_time_high']:,.0f}</p>", unsafe_allow_html=True)
 
-def display_account_info(client):
+def display_microstructure(summary):
+    if summary is None:
+        return
+    if not summary['synced']:
+        st.caption("Order book syncing...")
+        return
+
+    cols = st.columns(5)
+    metrics = [
+        ("SPREAD", f"${summary['spread']:,.2f} ({summary['spread_bps']:.2f} bps)"),
+        ("BOOK IMBALANCE (TOP 10)", f"{summary['imbalance']:+.2f}"),
+        ("VWAP 1M", f"${summary['vwap_1m']:,.2f}"),
+        ("VWAP 5M", f"${summary['vwap_5m']:,.2f}"),
+        ("TAKER BUY 5M", f"{summary['buy_ratio_5m']:.0%}")
+    ]
+    for col, (label, value) in zip(cols, metrics):
+        with col:
+            st.markdown(f"<p class='market-label'>{label}</p>", unsafe_allow_html=True)
+            st.markdown(f"<p class='market-metric'>{value}</p>", unsafe_allow_html=True)
+
+def display_watchlist(client, cache):
+    overview = cache.get_or_compute(
+        ("overview", tuple(config.DEFAULT_SYMBOLS)),
+        lambda: get_market_overview(client, config.DEFAULT_SYMBOLS),
+        config.OVERVIEW_TTL
+    )
+    if overview is None or overview.empty:
+        st.error("Watchlist unavailable")
+        return
+
+    st.subheader("Watchlist")
+    st.dataframe(
+        overview.style.format({
+            'last_price': '${:,.4f}',
+            'low_24h': '${:,.4f}',
+            'high_24h': '${:,.4f}',
+            'volume_24h': format_currency,
+            'price_change_1h': '{:+.2f}%',
+            'price_change_24h': '{:+.2f}%',
+            'price_change_7d': '{:+.2f}%'
+        })
+    )
+
+@st.cache_data(show_spinner="Computing cross-asset analytics...", max_entries=2)
+def cross_asset_stats_for_day(_client, symbols, interval, day_ts):
+    # Candles up to the start of the UTC day, so one computation per day
+    # serves every session and refresh
+    from src.data.cross_asset import cross_asset_stats, load_closes
+
+    start_ts = day_ts - config.CROSS_ASSET_DAYS * 86_400_000
+    closes = load_closes(_client, list(symbols), interval, start_ts, day_ts - 1, native=True)
+    return cross_asset_stats(closes, config.CROSS_ASSET_WINDOW)
+
+def display_cross_asset(client):
+    from src.visualization.charts import plot_correlation_heatmap
+
+    day_ts = int(time.time() * 1000) // 86_400_000 * 86_400_000
+    stats = cross_asset_stats_for_day(client, tuple(config.DEFAULT_SYMBOLS), config.CROSS_ASSET_INTERVAL, day_ts)
+    if stats is None or len(stats.correlation) == 0:
+        st.error("Cross-asset data unavailable")
+        return
+
+    days = config.CROSS_ASSET_WINDOW * INTERVAL_MS[config.CROSS_ASSET_INTERVAL] / 86_400_000
+    plot_correlation_heatmap(
+        stats.symbols,
+        stats.correlation[-1],
+        f"{config.CROSS_ASSET_INTERVAL} Return Correlation (last {days:g} days)"
+    )
+    latest = pd.DataFrame({
+        'beta_vs_btc': stats.beta.iloc[-1],
+        'volatility': stats.volatility.iloc[-1]
+    }).rename_axis('symbol')
+    st.dataframe(latest.style.format({'beta_vs_btc': '{:.2f}', 'volatility': '{:.1%}'}))
+
+def display_account_info(client, cache):
+    # Balances come from the account stream; only prices are fetched here,
+    # all of them in one ticker request shared for OVERVIEW_TTL
+    stream = get_account_stream()
+    if not stream.ready:
+        st.caption("Loading account...")
+        return
+    tickers = cache.get_or_compute(("tickers",), client.get_tickers, config.OVERVIEW_TTL) or []
+    stream.portfolio.update_prices(tickers)
+    valuation = stream.portfolio.valuation(tickers)
+
     st.markdown("---")
     st.subheader("Account Information")
-    
-    balances = client.get_account_info()
-    if balances:
-        col1, col2, col3 = st.columns(3)
-        
-        for balance in balances[:3]:
-            with col1:
-                st.write(f"**{balance['asset']}**")
-            with col2:
-                st.write(f"Available: {float(balance['free']):.8f}")
-            with col3:
-                st.write(f"In Order: {float(balance['locked']):.8f}")
+    cols = st.columns(3)
+    metrics = [
+        ("PORTFOLIO VALUE", format_currency(valuation.total_value)),
+        ("24H CHANGE", f"${valuation.change_24h:+,.2f}"),
+        ("PNL SINCE SESSION START", f"${valuation.pnl:+,.2f}")
+    ]
+    for col, (label, value) in zip(cols, metrics):
+        with col:
+            st.markdown(f"<p class='market-label'>{label}</p>", unsafe_allow_html=True)
+            st.markdown(f"<p class='market-metric'>{value}</p>", unsafe_allow_html=True)
+
+    st.dataframe(
+        valuation.holdings.set_index('asset').style.format({
+            'free': '{:,.8f}',
+            'locked': '{:,.8f}',
+            'quantity': '{:,.8f}',
+            'price': '${:,.6f}',
+            'value': '${:,.2f}',
+            'weight': '{:.1%}',
+            'change_24h': '${:+,.2f}',
+            'change_24h_pct': '{:+.2f}%',
+            'avg_cost': '${:,.6f}',
+            'pnl': '${:+,.2f}',
+            'pnl_pct': '{:+.2f}%'
+        }, na_rep='-')
+    )
+    caption = ("PnL is since the session started: balances held at start are costed at their first price, "
+               "later changes at the price when they happened.")
+    if valuation.unpriced:
+        caption += f" No USDT price for: {', '.join(valuation.unpriced)}."
+    st.caption(caption)
+
+def display_diagnostics(cache):
+    registry = get_metrics_registry()
+    if not registry.enabled:
+        st.info("Instrumentation is disabled (METRICS_ENABLED=false)")
+        return
+
+    st.subheader("Latency")
+    spans = pd.DataFrame(registry.span_stats())
+    if not spans.empty:
+        st.dataframe(
+            spans.style.format({name: '{:,.1f}' for name in ['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms']}),
+            hide_index=True
+        )
+
+    st.subheader("Binance requests")
+    requests = {}
+    for name, _, labels, value in registry.samples():
+        if name.startswith("binance_") and "path" in labels:
+            requests.setdefault(labels["path"], {})[name[len("binance_"):-len("_total")]] = value
+    if requests:
+        st.dataframe(pd.DataFrame.from_dict(requests, orient='index').rename_axis('path'))
+
+    cache_stats = cache.stats()
+    st.caption(
+        f"Data cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['evictions']} evictions, "
+        f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 1e6:.1f} MB"
+    )
+
+FOOTER = """
+    <style>
+        .footer {
+            position: fixed;
+            bottom: 0;
+            left: 0;
+            width: 100%;
+            background-color: #f1f1f1;
+            text-align: center;
+            padding: 10px 0;
+            font-size: 12px;
+            color: #555;
+        }
+    </style>
+    <div class="footer">
+        Copyright M&K
+    </div>
+"""
+
+def build_dashboard(client, symbol):
+    # Laid out once per script run; refreshes only fill the slots, so the
+    # streaming charts and the table page selector keep their state.
+    dashboard = {'market_info': st.empty(), 'microstructure': st.empty()}
+    # Measured in the main column, which the charts span; a new width reruns
+    # the script and lays the charts out again
+    dashboard['max_points'] = chart_max_points()
+
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+        "Technical Analysis",
+        "Price Evolution",
+        "Watchlist",
+        "Cross-Asset",
+        "Data",
+        "Diagnostics"
+    ])
+    dashboard['candlestick'] = tab1.empty()
+    dashboard['evolution'] = tab2.empty()
+    dashboard['watchlist'] = tab3.empty()
+    with tab4:
+        # Loads CROSS_ASSET_DAYS of candles for every symbol and runs the
+        # analytics across the process pool, so only when asked for
+        dashboard['show_cross_asset'] = st.toggle("Compute cross-asset analytics")
+        dashboard['cross_asset'] = st.empty()
+    dashboard['diagnostics'] = tab6.empty()
+    if config.CHART_STREAMING:
+        dashboard['live_candlestick'] = LiveCandlestickChart(symbol, dashboard['max_points'])
+        dashboard['live_evolution'] = LivePriceChart(symbol, dashboard['max_points'])
+
+    with tab5:
+        st.subheader(f"Latest {symbol} Data")
+        dashboard['page'] = st.number_input("Page (newest first)", min_value=1, value=1, step=1)
+        dashboard['table'] = st.empty()
+        dashboard['table_caption'] = st.empty()
+        # Closed candles of the loaded range, into the columnar archive
+        # (python -m src.data.archive read/import to load them back)
+        dashboard['export'] = st.button(f"Export to {config.ARCHIVE_FORMAT.capitalize()} archive")
+        dashboard['export_status'] = st.empty()
+
+    dashboard['alert'] = st.empty()
+    dashboard['account'] = st.empty()
+    st.markdown(FOOTER, unsafe_allow_html=True)
+    return dashboard
+
+def update_dashboard(dashboard, client, cache, df, market_data, symbol):
+    with dashboard['market_info'].container():
+        display_market_info(market_data, symbol)
+
+    # Spread, imbalance and short-window VWAP from the live order book
+    if config.DEPTH_STREAM and not client.read_only:
+        with dashboard['microstructure'].container():
+            display_microstructure(get_depth_stream().summary(symbol))
+
+    if config.CHART_STREAMING:
+        dashboard['live_candlestick'].render(dashboard['candlestick'], df)
+        dashboard['live_evolution'].render(dashboard['evolution'], df)
+    else:
+        from src.visualization.charts import plot_candlestick, plot_price_evolution
+        with dashboard['candlestick'].container():
+            plot_candlestick(df, symbol, dashboard['max_points'])
+        with dashboard['evolution'].container():
+            plot_price_evolution(df, symbol, dashboard['max_points'])
+
+    with dashboard['watchlist'].container():
+        display_watchlist(client, cache)
+
+    if dashboard['show_cross_asset']:
+        with dashboard['cross_asset'].container():
+            display_cross_asset(client)
+
+    # Only one page is formatted and sent, newest rows first
+    page_size = config.TABLE_PAGE_SIZE
+    pages = max(-(-len(df) // page_size), 1)
+    page = min(int(dashboard['page']), pages)
+    start = max(len(df) - page * page_size, 0)
+    end = len(df) - (page - 1) * page_size
+    dashboard['table'].dataframe(
+        df.iloc[start:end].iloc[::-1].style.format({
+            'open': '${:,.2f}',
+            'high': '${:,.2f}',
+            'low': '${:,.2f}',
+            'close': '${:,.2f}',
+            'volume': '{:,.0f}'
+        })
+    )
+    dashboard['table_caption'].caption(f"Rows {len(df) - end + 1}-{len(df) - start} of {len(df)} (page {page} of {pages})")
+
+    with dashboard['diagnostics'].container():
+        display_diagnostics(cache)
+
+    if config.BINANCE_API_KEY and not client.read_only:
+        with dashboard['account'].container():
+            display_account_info(client, cache)
 
 def main():
     st.set_page_config(
@@ -121,11 +379,17 @@ def main():
     )
 
     try:
-        client = BinanceAPI()
+        if config.USE_COLLECTOR:
+            client = LocalStoreClient()
+        else:
+            client = get_binance_api()
     except Exception as e:
         st.error(f"Error connecting to Binance: {e}")
         return
 
+    cache = get_data_cache()
+    start_metrics_server(config.METRICS_PORT)
+
     st.title("Advanced Market Trend Analysis Platform")
 
     with st.sidebar:
@@ -163,73 +427,69 @@ def main():
 
         auto_refresh = st.checkbox("Auto-refresh (60s)", value=True)
 
-    placeholder = st.empty()
+    # A price alert belongs to the session that set it: removed when the
+    # session turns it off, replaced when the symbol, price or email
+    # changes, and dropped by the dispatcher once the session has ended
+    session_id = get_script_run_ctx().session_id
+    watch_alert = bool(enable_alerts and alert_price and email)
+    if not watch_alert and st.session_state.pop('price_alert', False):
+        from src.utils.alert_dispatcher import get_alert_dispatcher
+        get_alert_dispatcher().unwatch(session_id)
+
+    status = st.empty()
+    dashboard = None
 
     while True:
         try:
-            with placeholder.container():
+            with span("dashboard_refresh"):
                 end_date = datetime.now()
                 start_date = end_date - timedelta(days=days)
 
-                with st.spinner("Fetching market data..."):
-                    df = fetch_candlesticks(client, symbol, interval, start_date, end_date)
-                    market_data = get_market_info(client, symbol)
+                with status.container():
+                    with st.spinner("Fetching market data..."):
+                        progress_bar = st.empty()
 
-                if df is not None and not df.empty:
-                    display_market_info(market_data, symbol)
-
-                    tab1, tab2, tab4 = st.tabs([
-                        "Technical Analysis",
-                        "Price Evolution",
-                        "Data"
-                    ])
-
-                    with tab1:
-                        plot_candlestick(df, symbol)
-
-                    with tab2:
-                        plot_price_evolution(df, symbol)
-
-                    with tab4:
-                        st.subheader(f"Latest {symbol} Data")
-                        st.dataframe(
-                            df.style.format({
-                                'open': '${:,.2f}',
-                                'high': '${:,.2f}',
-                                'low': '${:,.2f}',
-                                'close': '${:,.2f}',
-                                'volume': '{:,.0f}'
-                            })
+                        def show_progress(done, total):
+                            progress_bar.progress(done / total, text=f"Backfilling history: {done}/{total} chunks")
+
+                        # Keyed by window length rather than exact bounds so every
+                        # session looking at the same view shares one entry.
+                        df = cache.get_or_compute(
+                            ("candlesticks", symbol, interval, days),
+                            lambda: fetch_candlesticks(client, symbol, interval, start_date, end_date, show_progress),
+                            candle_ttl(interval)
+                        )
+                        progress_bar.empty()
+                        market_data = cache.get_or_compute(
+                            ("market_info", symbol),
+                            lambda: get_market_info(client, symbol),
+                            config.MARKET_INFO_TTL
                         )
 
-                    if enable_alerts and alert_price and email and df['close'].iloc[-1] <= alert_price:
-                        success = send_price_alert(symbol, df['close'].iloc[-1], alert_price, email)
-                        if success:
-                            st.success("Price alert email sent successfully!")
-
-                    display_account_info(client)
-                    
-                    footer = """
-                        <style>
-                            .footer {
-                                position: fixed;
-                                bottom: 0;
-                                left: 0;
-                                width: 100%;
-                                background-color: #f1f1f1;
-                                text-align: center;
-                                padding: 10px 0;
-                                font-size: 12px;
-                                color: #555;
-                            }
-                        </style>
-                        <div class="footer">
-                            Copyright M&K
-                        </div>
-                    """
-                    st.markdown(footer, unsafe_allow_html=True)
+                if df is not None and not df.empty:
+                    status.empty()
+                    if dashboard is None:
+                        dashboard = build_dashboard(client, symbol)
+                    update_dashboard(dashboard, client, cache, df, market_data, symbol)
+                    if dashboard.pop('export', False):
+                        from src.data.archive import write_klines
+                        closed = df[df['close_time'] < int(time.time() * 1000)]
+                        written = write_klines(closed, symbol, interval)
+                        dashboard['export_status'].success(f"{written} {interval} candles archived in {config.ARCHIVE_DIR}")
+
+                    if watch_alert:
+                        from src.data.alert_rules import get_alert_features
+                        from src.utils.alert_dispatcher import get_alert_dispatcher
+                        dispatcher = get_alert_dispatcher()
+                        dispatcher.prune_watchers(Runtime.instance().is_active_session)
+                        dispatcher.watch_price(session_id, symbol, alert_price, email)
+                        st.session_state['price_alert'] = True
+                        features = get_alert_features(client, symbol, df, dispatcher.engine.required_features(symbol))
+                        if dispatcher.check(symbol, features):
+                            dashboard['alert'].success("Alert email queued for delivery!")
                 else:
-                    st.error("Failed to fetch market data. Please check your connection and try again.")
+                    status.error("Failed to fetch market data. Please check your connection and try again.")
+            export_metrics()
 
         except Exception as e:
             logger.error(f"Error in main loop: {str(e)}")
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+import pandas as pd
+from benchmarks.fixtures import synthesize
+from src.data.archive import DAY_MS, read_klines, write_klines
+from src.data.kline_decoder import KLINE_COLUMNS, klines_frame
+
+# Candle archive formats against CSV, on synthetic 1m candles:
+# python -m benchmarks.archive --days 1095 --slice-days 30
+#
+# For each format: export time, size on disk, a full read, and a read of
+# --slice-days in the middle of the history restricted to close/volume.
+# CSV is one file read with pandas and filtered afterwards, the way the
+# data would be exported without the archive.
+
+SYMBOL = "BTCUSDT"
+
+def _size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def _best(run: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Parquet/Arrow candle archive against CSV")
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--slice-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="archive_formats.json")
+    args = parser.parse_args(argv)
+
+    rows = synthesize([SYMBOL], args.days)[SYMBOL]
+    df = klines_frame(rows)
+    middle = int(rows["open_time"][len(rows) // 2])
+    start_ts, end_ts = middle, middle + args.slice_days * DAY_MS - 1
+    columns = ["close", "volume"]
+    expected = int(np.count_nonzero((rows["open_time"] >= start_ts) & (rows["open_time"] <= end_ts)))
+    print(f"{len(rows)} candles ({args.days} days), slice of {expected} candles x {len(columns)} columns")
+
+    workdir = tempfile.mkdtemp(prefix="archive-bench-")
+    results: Dict[str, Any] = {}
+    try:
+        for format in ["parquet", "arrow", "csv"]:
+            path = os.path.join(workdir, format)
+            if format == "csv":
+                path += ".csv"
+                export = lambda: df.to_csv(path)
+
+                def read_all():
+                    return pd.read_csv(path, index_col="timestamp", parse_dates=["timestamp"])
+
+                def read_slice():
+                    data = pd.read_csv(path, usecols=["timestamp"] + columns, index_col="timestamp", parse_dates=["timestamp"])
+                    return data.loc[pd.Timestamp(start_ts, unit="ms"):pd.Timestamp(end_ts, unit="ms")]
+            else:
+                def export():
+                    shutil.rmtree(path, ignore_errors=True)
+                    write_klines(rows, SYMBOL, "1m", path, format)
+
+                read_all = lambda: read_klines(SYMBOL, "1m", root=path)
+                read_slice = lambda: read_klines(SYMBOL, "1m", start_ts, end_ts, columns, path)
+
+            # Exports are slow enough (and CSV writes deterministic enough)
+            # for a single run
+            export_s = _best(export, 1)
+            sliced = read_slice()
+            if len(sliced) != expected or len(read_all()) != len(rows):
+                raise RuntimeError(f"{format}: read back {len(sliced)} of {expected} candles")
+            results[format] = {
+                "export_s": export_s,
+                "bytes": _size(path),
+                "read_all_s": _best(read_all, args.repeat),
+                "read_slice_s": _best(read_slice, args.repeat)
+            }
+            r = results[format]
+            print(f"{format:>8}  export {r['export_s']:7.2f}s  {r['bytes'] / 1e6:8.1f} MB  "
+                  f"read all {r['read_all_s']:7.3f}s  read slice {r['read_slice_s']:7.3f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "candles": len(rows),
+            "slice_candles": expected,
+            "columns": len(KLINE_COLUMNS),
+            "slice_columns": columns,
+            "results": results
+        }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+from src.data.backtest import parameter_grid, sweep
+from src.data.kline_decoder import KLINE_DTYPE
+
+# Throughput of MA-crossover parameter sweeps against the worker count:
+# python -m benchmarks.backtest --candles 1000000 --combinations 400 --workers 1,2,4,8
+#
+# Reports parameter sets per second and the projected time for --target
+# sets (10k by default) over the same candles.
+
+MINUTE_MS = 60_000
+
+def synthesize_rows(candles: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.zeros(candles, dtype=KLINE_DTYPE)
+    end = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+    rows["open_time"] = end - np.arange(candles)[::-1] * MINUTE_MS
+    rows["close_time"] = rows["open_time"] + MINUTE_MS - 1
+    rows["close"] = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.0008, candles)))
+    return rows
+
+def _noop(_):
+    return os.getpid()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark backtest parameter sweeps against the worker count")
+    parser.add_argument("--candles", type=int, default=1_000_000)
+    parser.add_argument("--combinations", type=int, default=400)
+    parser.add_argument("--target", type=int, default=10_000)
+    parser.add_argument("--workers", default=",".join(str(2 ** i) for i in range(4) if 2 ** i <= (os.cpu_count() or 1) * 2))
+    parser.add_argument("--output", default="backtest_scaling.json")
+    args = parser.parse_args(argv)
+
+    rows = synthesize_rows(args.candles)
+    side = int(np.ceil(np.sqrt(args.combinations)))
+    grid = parameter_grid(fast=range(5, 5 + 5 * side, 5), slow=range(50, 50 + 10 * side, 10))[:args.combinations]
+    results: Dict[str, Any] = {}
+    print(f"{len(grid)} MA crossover parameter sets over {args.candles} candles, {os.cpu_count()} CPUs")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+            list(pool.map(_noop, range(workers * 4)))
+        started = time.perf_counter()
+        sweep(rows, grid, interval="1m", workers=workers, pool=pool)
+        elapsed = time.perf_counter() - started
+        if pool is not None:
+            pool.shutdown()
+        rate = len(grid) / elapsed
+        results[str(workers)] = {
+            "seconds": elapsed,
+            "combinations_per_second": rate,
+            "projected_target_seconds": args.target / rate
+        }
+        print(f"{workers:3d} workers  {elapsed:7.2f}s  {rate:6.1f} sets/s  {args.target} sets in ~{args.target / rate / 60:.1f} min")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "candles": args.candles,
+            "combinations": len(grid),
+            "cpus": os.cpu_count(),
+            "results": results
+        }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+from src.data.cross_asset import CloseMatrix, cross_asset_stats
+
+# Scaling of cross_asset_stats with the number of worker processes:
+# python -m benchmarks.cross_asset --symbols 200 --days 365 --workers 1,2,4,8
+#
+# Closes are synthetic 1h candles from a one-factor model (every symbol
+# partly follows the first one), with a few symbols listed part way through.
+
+HOUR_MS = 3_600_000
+
+def synthesize_closes(symbols: int, days: int, seed: int = 42) -> CloseMatrix:
+    rng = np.random.default_rng(seed)
+    rows = days * 24
+    market = rng.normal(0, 0.01, rows)
+    betas = rng.uniform(0.5, 1.5, symbols)
+    betas[0] = 1.0
+    returns = market[:, None] * betas + rng.normal(0, 0.01, (rows, symbols))
+    returns[:, 0] = market
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    for column in rng.choice(np.arange(1, symbols), size=symbols // 10, replace=False):
+        closes[:rng.integers(0, rows // 2), column] = np.nan
+    end = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    times = end - np.arange(rows)[::-1] * HOUR_MS
+    names = ["BTCUSDT"] + [f"SYM{i:03d}USDT" for i in range(1, symbols)]
+    return CloseMatrix("1h", times, names, closes)
+
+def _noop(_):
+    return os.getpid()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cross-asset analytics against the worker count")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--window", type=int, default=24 * 30)
+    parser.add_argument("--step", type=int, default=24)
+    parser.add_argument("--workers", default=",".join(str(2 ** i) for i in range(4) if 2 ** i <= (os.cpu_count() or 1) * 2))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="cross_asset_scaling.json")
+    args = parser.parse_args(argv)
+
+    closes = synthesize_closes(args.symbols, args.days)
+    results: Dict[str, Any] = {}
+    baseline = None
+    print(f"{args.symbols} symbols x {len(closes.times)} candles, {os.cpu_count()} CPUs")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+            # Workers are started (and import numpy) before timing
+            list(pool.map(_noop, range(workers * 4)))
+            cross_asset_stats(closes, args.window, args.step, workers=workers, pool=pool)
+        times = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            stats = cross_asset_stats(closes, args.window, args.step, workers=workers, pool=pool)
+            times.append(time.perf_counter() - started)
+        if pool is not None:
+            pool.shutdown()
+        median = float(np.median(times))
+        baseline = baseline or median
+        results[str(workers)] = {
+            "median_s": median,
+            "min_s": float(min(times)),
+            "speedup": baseline / median,
+            "correlation_windows": len(stats.correlation_times)
+        }
+        print(f"{workers:3d} workers  {median:7.3f}s  x{baseline / median:.2f}")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "symbols": args.symbols,
+            "candles": len(closes.times),
+            "window": args.window,
+            "step": args.step,
+            "cpus": os.cpu_count(),
+            "results": results
+        }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
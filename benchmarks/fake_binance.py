@@ -0,0 +1,304 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from websockets.sync.server import serve
+from src.data.kline_store import INTERVAL_MS
+from src.data.resample import resample_klines
+
+MINUTE_MS = 60_000
+
+LISTEN_KEY = "fake-listen-key"
+WINDOW_MS = {"1h": 3_600_000, "4h": 4 * 3_600_000, "1d": 86_400_000, "7d": 7 * 86_400_000}
+
+def _kline_row(r) -> List:
+    return [
+        int(r["open_time"]), f"{r['open']:.8f}", f"{r['high']:.8f}", f"{r['low']:.8f}", f"{r['close']:.8f}",
+        f"{r['volume']:.8f}", int(r["close_time"]), f"{r['quote_asset_volume']:.8f}", int(r["number_of_trades"]),
+        f"{r['taker_buy_base']:.8f}", f"{r['taker_buy_quote']:.8f}", "0"
+    ]
+
+# Local stand-in for the public Binance REST and WebSocket APIs, replaying a
+# 1m fixture (see fixtures.py). The fixture is shifted in time so its last
+# candle is the currently open one; other intervals are aggregated from it
+# and tickers are computed over the matching window. Every REST response is
+# delayed by `latency` (+ up to `jitter`) seconds.
+class FakeBinance:
+    def __init__(
+        self,
+        fixture: Dict[str, np.ndarray],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        ws_interval: float = 1.0,
+        seed: int = 0,
+        account: Optional[Dict[str, Any]] = None,
+        account_changes: int = 3
+    ):
+        now_minute = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+        self.klines: Dict[str, np.ndarray] = {}
+        for symbol, rows in fixture.items():
+            shifted = rows.copy()
+            shift = now_minute - int(rows["open_time"][-1])
+            shifted["open_time"] += shift
+            shifted["close_time"] += shift
+            self.klines[symbol] = shifted
+        self.latency = latency
+        self.jitter = jitter
+        self.ws_interval = ws_interval
+        self.requests = 0
+        self.bytes_sent = 0
+        self.ws_messages = 0
+        self._rng = np.random.default_rng(seed)
+        self._resampled: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+        # fixtures.synthesize_account: balances served by /v3/account and
+        # changed account_changes at a time every ws_interval on /ws/<key>
+        self.balances: Dict[str, List[float]] = {}
+        self.static_tickers: Dict[str, Dict[str, Any]] = {}
+        self.account_update_time = 0
+        self.account_changes = account_changes
+        if account is not None:
+            self.balances = {b["asset"]: [float(b["free"]), float(b["locked"])] for b in account["balances"]}
+            self.static_tickers = {t["symbol"]: t for t in account["tickers"]}
+            self.account_update_time = int(account["updateTime"])
+        self._http: Optional[ThreadingHTTPServer] = None
+        self._ws = None
+
+    @property
+    def rest_url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_port}/api"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self._ws.socket.getsockname()[1]}"
+
+    def start(self) -> "FakeBinance":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; with Nagle's
+            # algorithm the body would wait for the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def do_PUT(self):
+                self._respond("PUT")
+
+            def do_DELETE(self):
+                self._respond("DELETE")
+
+            def _respond(self, method: str):
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                length = int(self.headers.get("Content-Length", 0))
+                if length:
+                    params.update({key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()})
+                status, body = fake.handle(url.path, params, method)
+                payload = json.dumps(body, separators=(",", ":")).encode()
+                fake._delay()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("X-MBX-USED-WEIGHT-1M", "1")
+                self.end_headers()
+                self.wfile.write(payload)
+                with fake._lock:
+                    fake.requests += 1
+                    fake.bytes_sent += len(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, name="fake-binance-rest", daemon=True).start()
+        self._ws = serve(self._stream, "127.0.0.1", 0)
+        threading.Thread(target=self._ws.serve_forever, name="fake-binance-ws", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        if self._ws is not None:
+            self._ws.shutdown()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.jitter * float(self._rng.random()))
+
+    def series(self, symbol: str, interval: str) -> np.ndarray:
+        base = self.klines[symbol]
+        if interval == "1m":
+            return base
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._resampled:
+                self._resampled[key] = resample_klines(base, interval)
+            return self._resampled[key]
+
+    def ticker(self, symbol: str, window_ms: int) -> Dict[str, Any]:
+        rows = self.klines[symbol]
+        now = int(time.time() * 1000)
+        rows = rows[(rows["open_time"] > now - window_ms) & (rows["open_time"] <= now)]
+        open_price, last_price = float(rows["open"][0]), float(rows["close"][-1])
+        volume = float(rows["volume"].sum())
+        quote_volume = float(rows["quote_asset_volume"].sum())
+        return {
+            "symbol": symbol,
+            "priceChange": f"{last_price - open_price:.8f}",
+            "priceChangePercent": f"{(last_price - open_price) / open_price * 100:.3f}",
+            "weightedAvgPrice": f"{quote_volume / volume:.8f}",
+            "openPrice": f"{open_price:.8f}",
+            "highPrice": f"{rows['high'].max():.8f}",
+            "lowPrice": f"{rows['low'].min():.8f}",
+            "lastPrice": f"{last_price:.8f}",
+            "volume": f"{volume:.8f}",
+            "quoteVolume": f"{quote_volume:.8f}",
+            "openTime": int(rows["open_time"][0]),
+            "closeTime": now,
+            "count": int(rows["number_of_trades"].sum())
+        }
+
+    def handle(self, path: str, params: Dict[str, str], method: str = "GET") -> Tuple[int, Any]:
+        endpoint = path[len("/api/"):] if path.startswith("/api/") else path.lstrip("/")
+        if endpoint == "v3/account":
+            # Signatures are not checked
+            with self._lock:
+                balances = [
+                    {"asset": asset, "free": f"{free:.8f}", "locked": f"{locked:.8f}"}
+                    for asset, (free, locked) in self.balances.items()
+                ]
+                return 200, {"accountType": "SPOT", "updateTime": self.account_update_time, "balances": balances}
+        if endpoint == "v3/userDataStream":
+            return 200, {"listenKey": LISTEN_KEY} if method == "POST" else {}
+        if endpoint in ("v3/ping", "v1/ping"):
+            return 200, {}
+        if endpoint in ("v3/time", "v1/time"):
+            return 200, {"serverTime": int(time.time() * 1000)}
+        if endpoint == "v3/klines":
+            return self._klines(params)
+        if endpoint == "v3/ticker/24hr":
+            if "symbol" in params:
+                if params["symbol"] not in self.klines:
+                    return 400, {"code": -1121, "msg": "Invalid symbol."}
+                return 200, self.ticker(params["symbol"], WINDOW_MS["1d"])
+            tickers = dict(self.static_tickers)
+            tickers.update((symbol, self.ticker(symbol, WINDOW_MS["1d"])) for symbol in self.klines)
+            return 200, list(tickers.values())
+        if endpoint == "v3/ticker":
+            symbols = json.loads(params.get("symbols", "[]")) or [params.get("symbol")]
+            if any(symbol not in self.klines and symbol not in self.static_tickers for symbol in symbols):
+                return 400, {"code": -1121, "msg": "Invalid symbol."}
+            window_ms = WINDOW_MS.get(params.get("windowSize", "1d"), WINDOW_MS["1d"])
+            # Static tickers are served for every window
+            return 200, [self.ticker(symbol, window_ms) if symbol in self.klines else self.static_tickers[symbol]
+                         for symbol in symbols]
+        return 404, {"code": -1, "msg": f"Unknown endpoint {path}"}
+
+    def _klines(self, params: Dict[str, str]) -> Tuple[int, Any]:
+        symbol, interval = params.get("symbol"), params.get("interval")
+        if symbol not in self.klines or interval not in INTERVAL_MS:
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        limit = min(int(params.get("limit", 500)), 1000)
+        rows = self.series(symbol, interval)
+        now = int(time.time() * 1000)
+        end = min(int(params.get("endTime", now)), now)
+        hi = int(np.searchsorted(rows["open_time"], end, side="right"))
+        if "startTime" in params:
+            lo = int(np.searchsorted(rows["open_time"], int(params["startTime"]), side="left"))
+            rows = rows[lo:min(hi, lo + limit)]
+        else:
+            rows = rows[max(hi - limit, 0):hi]
+        return 200, [_kline_row(r) for r in rows]
+
+    def _stream(self, connection):
+        # /stream?streams=btcusdt@kline_1m/btcusdt@ticker/...; every
+        # ws_interval the open candle and the 24h ticker of each are pushed.
+        if urlparse(connection.request.path).path == f"/ws/{LISTEN_KEY}":
+            return self._account_stream(connection)
+        query = parse_qs(urlparse(connection.request.path).query)
+        streams = query.get("streams", [""])[0].split("/")
+        try:
+            if not any(name.partition("@")[2] == "ticker" or "@kline_" in name for name in streams):
+                # Nothing this server replays (depth, trades): hold the
+                # connection until the client closes it, so shutdown can join
+                for _ in connection:
+                    pass
+                return
+            while True:
+                for name in streams:
+                    symbol_lower, _, kind = name.partition("@")
+                    symbol = symbol_lower.upper()
+                    if symbol not in self.klines:
+                        continue
+                    if kind == "ticker":
+                        ticker = self.ticker(symbol, WINDOW_MS["1d"])
+                        data = {
+                            "e": "24hrTicker", "s": symbol, "p": ticker["priceChange"],
+                            "P": ticker["priceChangePercent"], "w": ticker["weightedAvgPrice"],
+                            "o": ticker["openPrice"], "h": ticker["highPrice"], "l": ticker["lowPrice"],
+                            "c": ticker["lastPrice"], "v": ticker["volume"], "q": ticker["quoteVolume"],
+                            "O": ticker["openTime"], "C": ticker["closeTime"], "n": ticker["count"]
+                        }
+                    elif kind.startswith("kline_"):
+                        interval = kind[len("kline_"):]
+                        rows = self.series(symbol, interval)
+                        r = rows[-1]
+                        data = {"e": "kline", "s": symbol, "k": {
+                            "t": int(r["open_time"]), "T": int(r["close_time"]), "s": symbol, "i": interval,
+                            "o": f"{r['open']:.8f}", "c": f"{r['close']:.8f}", "h": f"{r['high']:.8f}",
+                            "l": f"{r['low']:.8f}", "v": f"{r['volume']:.8f}", "n": int(r["number_of_trades"]),
+                            "x": False, "q": f"{r['quote_asset_volume']:.8f}", "V": f"{r['taker_buy_base']:.8f}",
+                            "Q": f"{r['taker_buy_quote']:.8f}"
+                        }}
+                    else:
+                        continue
+                    connection.send(json.dumps({"stream": name, "data": data}))
+                    with self._lock:
+                        self.ws_messages += 1
+                time.sleep(self.ws_interval)
+        except Exception:
+            return
+
+    def _account_stream(self, connection):
+        # outboundAccountPosition events as Binance sends them: only the
+        # balances that changed, with their new totals
+        assets = list(self.balances)
+        if not assets:
+            for _ in connection:
+                pass
+            return
+        try:
+            while True:
+                time.sleep(self.ws_interval)
+                with self._lock:
+                    changed = []
+                    for i in self._rng.choice(len(assets), size=min(self.account_changes, len(assets)), replace=False):
+                        asset = assets[int(i)]
+                        free, locked = self.balances[asset]
+                        free = 0.0 if self._rng.random() < 0.1 else max(free, 1.0) * float(self._rng.uniform(0.5, 1.5))
+                        self.balances[asset] = [free, locked]
+                        changed.append({"a": asset, "f": f"{free:.8f}", "l": f"{locked:.8f}"})
+                    self.account_update_time = max(int(time.time() * 1000), self.account_update_time + 1)
+                    event = {"e": "outboundAccountPosition", "E": self.account_update_time,
+                             "u": self.account_update_time, "B": changed}
+                    self.ws_messages += 1
+                connection.send(json.dumps(event))
+        except Exception:
+            return
@@ -0,0 +1,183 @@
+import gzip
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from src.data.kline_decoder import KLINE_DTYPE, decode_klines
+from src.data.portfolio import EARN_PREFIX
+
+# A fixture is the 1m klines of a few symbols, stored as Binance returns
+# them (gzipped JSON arrays). Every other interval and the tickers are
+# derived from it by the fake server. Recorded fixtures need network
+# access once; synthetic ones are a seeded random walk and need nothing.
+
+MINUTE_MS = 60_000
+
+def synthesize(symbols: List[str], days: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n = days * 1440
+    end = int(time.time() * 1000) // MINUTE_MS * MINUTE_MS
+    open_time = end - np.arange(n)[::-1] * MINUTE_MS
+    fixture = {}
+    for i, symbol in enumerate(symbols):
+        start_price = 10.0 ** rng.uniform(-1, 4.8)
+        close = start_price * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+        rows = np.empty(n, dtype=KLINE_DTYPE)
+        rows["open_time"] = open_time
+        rows["close_time"] = open_time + MINUTE_MS - 1
+        rows["open"] = np.r_[start_price, close[:-1]]
+        rows["close"] = close
+        spread = np.abs(rng.normal(0, 0.0004, n)) * close
+        rows["high"] = np.maximum(rows["open"], close) + spread
+        rows["low"] = np.minimum(rows["open"], close) - spread
+        rows["volume"] = rng.gamma(2.0, 50.0, n) / start_price * 100
+        rows["quote_asset_volume"] = rows["volume"] * close
+        rows["number_of_trades"] = rng.integers(10, 2000, n)
+        rows["taker_buy_base"] = rows["volume"] * rng.uniform(0.3, 0.7, n)
+        rows["taker_buy_quote"] = rows["taker_buy_base"] * close
+        # Binance prices and volumes have 8 decimals at most
+        for name in ["open", "high", "low", "close", "volume", "quote_asset_volume", "taker_buy_base", "taker_buy_quote"]:
+            rows[name] = np.round(rows[name], 8)
+        fixture[symbol] = rows
+    return fixture
+
+def synthesize_depth(symbol: str, events: int, seed: int = 42, levels: int = 1000) -> List[Dict]:
+    # Order book recording in the format of DepthStream(record_path=...): a
+    # snapshot followed by depth diffs and aggregated trades around a random
+    # walk, with a few diffs buffered before the snapshot.
+    rng = np.random.default_rng(seed)
+    tick = 0.01
+    mid = 30_000.0
+    now = int(time.time() * 1000)
+    update_id = 1_000_000
+    trade_id = 1
+
+    def side(sign: int, count: int) -> List[List[str]]:
+        prices = mid + sign * tick * (1 + rng.integers(0, 2 * levels, count))
+        quantities = np.where(rng.random(count) < 0.3, 0.0, rng.gamma(1.5, 0.2, count))
+        return [[f"{p:.2f}", f"{q:.8f}"] for p, q in zip(prices, quantities)]
+
+    records = []
+    snapshot_at = 5
+    for i in range(events):
+        now += int(rng.integers(0, 20))
+        if i == snapshot_at:
+            records.append({"symbol": symbol, "snapshot": {
+                "lastUpdateId": update_id - 2,
+                "bids": [[f"{mid - tick * (k + 1):.2f}", f"{rng.gamma(1.5, 0.2):.8f}"] for k in range(levels)],
+                "asks": [[f"{mid + tick * (k + 1):.2f}", f"{rng.gamma(1.5, 0.2):.8f}"] for k in range(levels)]
+            }})
+        if rng.random() < 0.7:
+            mid = round(mid + tick * int(rng.integers(-3, 4)), 2)
+            count = int(rng.integers(1, 20))
+            first_id, update_id = update_id + 1, update_id + count
+            data = {"e": "depthUpdate", "E": now, "s": symbol, "U": first_id, "u": update_id,
+                    "b": side(-1, count), "a": side(1, count)}
+            records.append({"stream": f"{symbol.lower()}@depth@100ms", "data": data})
+        else:
+            buyer_maker = bool(rng.random() < 0.5)
+            price = mid - tick if buyer_maker else mid + tick
+            data = {"e": "aggTrade", "E": now, "s": symbol, "a": trade_id, "p": f"{price:.2f}",
+                    "q": f"{rng.gamma(1.2, 0.05):.8f}", "f": trade_id, "l": trade_id, "T": now, "m": buyer_maker}
+            trade_id += 1
+            records.append({"stream": f"{symbol.lower()}@aggTrade", "data": data})
+    return records
+
+def _ticker(rng: np.random.Generator, symbol: str, last: float, now: int) -> Dict[str, Any]:
+    open_price = last / (1 + rng.normal(0, 0.04))
+    return {
+        "symbol": symbol, "lastPrice": f"{last:.8f}", "openPrice": f"{open_price:.8f}",
+        "priceChange": f"{last - open_price:.8f}", "priceChangePercent": f"{(last / open_price - 1) * 100:.3f}",
+        "highPrice": f"{max(last, open_price) * 1.01:.8f}", "lowPrice": f"{min(last, open_price) * 0.99:.8f}",
+        "volume": "0", "quoteVolume": "0", "openTime": now - 86_400_000, "closeTime": now, "count": 0
+    }
+
+def synthesize_tickers(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    # Static 24h tickers of `count` made-up USDT pairs (S0000USDT, ...)
+    rng = np.random.default_rng(seed)
+    now = int(time.time() * 1000)
+    return [_ticker(rng, f"S{i:04d}USDT", 10.0 ** rng.uniform(-4, 3), now) for i in range(count)]
+
+def synthesize_account(assets: int = 300, held: float = 0.4, seed: int = 42) -> Dict[str, Any]:
+    # A spot account as GET /api/v3/account returns it (every asset, most of
+    # them at zero) plus static 24h tickers pricing it. Assets are priced
+    # through USDT pairs, some only through BTC, a fiat currency through the
+    # inverse USDT pair, Simple Earn positions (LD...) through the underlying
+    # asset, and a few not at all.
+    rng = np.random.default_rng(seed)
+    now = int(time.time() * 1000)
+
+    def ticker(symbol: str, last: float) -> Dict[str, Any]:
+        return _ticker(rng, symbol, last, now)
+
+    names = ["USDT", "BTC", "ETH", "BNB", "TRY"] + [f"T{i:03d}" for i in range(max(assets - 5, 0))]
+    tickers = [ticker("BTCUSDT", 30_000.0), ticker("ETHUSDT", 2_000.0), ticker("BNBUSDT", 300.0), ticker("USDTTRY", 32.0)]
+    for i, asset in enumerate(names[5:]):
+        price = 10.0 ** rng.uniform(-4, 3)
+        route = rng.random()
+        if route < 0.8:
+            tickers.append(ticker(f"{asset}USDT", price))
+        elif route < 0.95:
+            tickers.append(ticker(f"{asset}BTC", price / 30_000.0))
+        if i % 25 == 0:
+            names.append(f"{EARN_PREFIX}{asset}")
+
+    balances = []
+    for asset in names:
+        quantity = 10.0 ** rng.uniform(-3, 4) if asset in ("USDT", "BTC") or rng.random() < held else 0.0
+        locked = quantity * 0.1 if quantity and rng.random() < 0.2 else 0.0
+        balances.append({"asset": asset, "free": f"{quantity - locked:.8f}", "locked": f"{locked:.8f}"})
+    return {"updateTime": now, "balances": balances, "tickers": tickers}
+
+def record(symbols: List[str], days: int) -> Dict[str, np.ndarray]:
+    from src.api.binance_client import get_request_scheduler
+    scheduler = get_request_scheduler()
+    end_ts = int(time.time() * 1000)
+    fixture = {}
+    for symbol in symbols:
+        rows, cursor = [], end_ts - days * 86_400_000
+        while cursor < end_ts:
+            page = scheduler.get("v3/klines", {
+                "symbol": symbol, "interval": "1m", "startTime": cursor, "endTime": end_ts, "limit": 1000
+            }, weight=2)
+            if not page:
+                break
+            rows.extend(page)
+            cursor = page[-1][0] + 1
+        fixture[symbol] = decode_klines(rows)
+    return fixture
+
+def save(fixture: Dict[str, np.ndarray], path: str):
+    payload = {
+        symbol: [[
+            int(r["open_time"]), f"{r['open']:.8f}", f"{r['high']:.8f}", f"{r['low']:.8f}", f"{r['close']:.8f}",
+            f"{r['volume']:.8f}", int(r["close_time"]), f"{r['quote_asset_volume']:.8f}", int(r["number_of_trades"]),
+            f"{r['taker_buy_base']:.8f}", f"{r['taker_buy_quote']:.8f}", "0"
+        ] for r in rows]
+        for symbol, rows in fixture.items()
+    }
+    with gzip.open(path, "wt") as f:
+        json.dump(payload, f)
+
+def load(path: str) -> Dict[str, np.ndarray]:
+    with gzip.open(path, "rt") as f:
+        payload = json.load(f)
+    return {symbol: decode_klines(rows) for symbol, rows in payload.items()}
+
+if __name__ == "__main__":
+    import argparse
+    import config
+
+    parser = argparse.ArgumentParser(description="Record or synthesize a 1m kline fixture")
+    parser.add_argument("command", choices=["record", "synthesize"])
+    parser.add_argument("path")
+    parser.add_argument("--symbols", default=",".join(config.DEFAULT_SYMBOLS))
+    parser.add_argument("--days", type=int, default=35)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    symbols = args.symbols.split(",")
+    if args.command == "record":
+        save(record(symbols, args.days), args.path)
+    else:
+        save(synthesize(symbols, args.days, args.seed), args.path)
@@ -0,0 +1,82 @@
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+from benchmarks.fixtures import synthesize_account
+from src.data.portfolio import Portfolio
+
+# Portfolio valuation over a synthetic account:
+# python -m benchmarks.portfolio --assets 1000 --events 100000
+#
+# valuation_s  pricing every non-zero balance from one 24h ticker list
+# events/s     outboundAccountPosition events applied to the balances
+#
+# Also prints the request weight of an hour of refreshes, refetching the
+# account (weight 20) and the tickers (weight 80) each time against reading
+# the account once and following the user data stream.
+
+ACCOUNT_WEIGHT = 20
+TICKERS_WEIGHT = 80
+
+def _events(account: Dict[str, Any], count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    assets = [b["asset"] for b in account["balances"]]
+    update_time = account["updateTime"]
+    for i in range(count):
+        changed = rng.choice(len(assets), size=int(rng.integers(1, 4)), replace=False)
+        yield {
+            "e": "outboundAccountPosition",
+            "u": update_time + i + 1,
+            "B": [{"a": assets[j], "f": f"{rng.uniform(0, 100):.8f}", "l": "0.00000000"} for j in changed]
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark portfolio valuation and balance updates")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--held", type=float, default=0.4)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--refresh-seconds", type=float, default=60.0)
+    parser.add_argument("--output", default="portfolio.json")
+    args = parser.parse_args(argv)
+
+    account = synthesize_account(args.assets, args.held)
+    portfolio = Portfolio()
+    portfolio.load(account)
+    portfolio.update_prices(account["tickers"])
+
+    times = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        valuation = portfolio.valuation(account["tickers"])
+        times.append(time.perf_counter() - started)
+    valuation_s = float(np.median(times))
+    print(f"{len(portfolio)} of {args.assets} assets held, {len(valuation.unpriced)} unpriced: "
+          f"valuation {valuation_s * 1000:.2f} ms")
+
+    events = list(_events(account, args.events))
+    started = time.perf_counter()
+    applied = sum(portfolio.apply(event) for event in events)
+    apply_s = time.perf_counter() - started
+    print(f"{applied} events applied at {applied / apply_s:,.0f} events/s")
+
+    refreshes = 3600 / args.refresh_seconds
+    weights = {
+        "refetch": refreshes * (ACCOUNT_WEIGHT + TICKERS_WEIGHT),
+        "stream": ACCOUNT_WEIGHT + refreshes * TICKERS_WEIGHT
+    }
+    print(f"request weight per hour: refetch {weights['refetch']:.0f}, stream {weights['stream']:.0f}")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "assets": args.assets,
+            "held": len(portfolio),
+            "valuation_s": valuation_s,
+            "events_per_s": applied / apply_s,
+            "weight_per_hour": weights
+        }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+import argparse
+import json
+import logging
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import config
+
+# Offline benchmark suite: python -m benchmarks.run --output results.json
+#
+# Everything runs against benchmarks.fake_binance replaying a 1m fixture
+# (synthetic unless --fixture points to a recorded one), with a throwaway
+# kline store, so runs are reproducible and need neither network nor API
+# keys. Results are written as JSON; --compare reports changes against a
+# previous run.
+
+logger = logging.getLogger(__name__)
+
+def extend(rows: np.ndarray, count: int) -> np.ndarray:
+    # Repeats a fixture (shifted back in time) until it has `count` rows
+    span_ms = int(rows["open_time"][-1] - rows["open_time"][0]) + 60_000
+    copies = -(-count // len(rows))
+    parts = []
+    for i in range(copies - 1, -1, -1):
+        part = rows.copy()
+        part["open_time"] -= i * span_ms
+        part["close_time"] -= i * span_ms
+        parts.append(part)
+    return np.concatenate(parts)[-count:]
+
+def peak_memory(run: Callable[[], Any]) -> int:
+    # Peak bytes allocated while `run` executes (numpy reports its buffers
+    # to tracemalloc too)
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def arrow_bytes(df: pd.DataFrame) -> int:
+    # Size of a chart's data as Streamlit sends it (an Arrow IPC stream)
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+class Case:
+    def __init__(self, name: str, run: Callable[[], Optional[Dict[str, Any]]],
+                 setup: Optional[Callable[[], None]] = None, repeat: Optional[int] = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.repeat = repeat
+
+class Suite:
+    def __init__(self, fixture: Dict[str, np.ndarray], latency: float, jitter: float, windows: List[int]):
+        from benchmarks.fake_binance import FakeBinance
+
+        self.fixture = fixture
+        self.windows = windows
+        self.symbols = list(fixture)
+        self.symbol = self.symbols[0]
+        self.fake = FakeBinance(fixture, latency=latency, jitter=jitter, ws_interval=0.5).start()
+        self.store_root = tempfile.mkdtemp(prefix="kline-bench-")
+        config.KLINE_STORE_DIR = self.store_root
+        config.BINANCE_API_URL = self.fake.rest_url
+        config.BINANCE_WS_URL = self.fake.ws_url
+        self._stream = None
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+        self.fake.stop()
+        shutil.rmtree(self.store_root, ignore_errors=True)
+
+    def client(self, stream: bool = False):
+        from src.api.binance_client import BinanceAPI, RequestScheduler
+        from src.api.market_stream import MarketStream
+
+        scheduler = RequestScheduler(self.fake.rest_url, weight_limit=1_000_000, pool_size=config.BINANCE_POOL_SIZE)
+        if stream and self._stream is None:
+            self._stream = MarketStream(self.symbols, ["1m", "1h", "1d"], base_url=self.fake.ws_url)
+            self._stream.start()
+            deadline = time.time() + 10
+            while not self._stream.is_live and time.time() < deadline:
+                time.sleep(0.05)
+        return BinanceAPI(stream=self._stream if stream else None, scheduler=scheduler)
+
+    def fresh_store(self):
+        # New root -> new, empty stores and resamplers
+        from src.data import market_data
+
+        config.KLINE_STORE_DIR = tempfile.mkdtemp(dir=self.store_root)
+        market_data._moving_average_states.clear()
+        market_data._daily_series.clear()
+
+    def frame(self, rows: int) -> pd.DataFrame:
+        from src.data.kline_decoder import klines_frame
+        from src.data.market_data import calculate_moving_averages
+
+        return calculate_moving_averages(klines_frame(extend(self.fixture[self.symbol], rows)).copy())
+
+    def cases(self) -> List[Case]:
+        from src.data.alert_rules import RuleEngine
+        from src.data.indicators import BollingerBands, EMA, IndicatorEngine, MACD, RSI, SMA, VWAP
+        from src.data.kline_decoder import decode_klines_json, klines_frame
+        from src.data.market_data import (
+            calculate_moving_averages, fetch_candlesticks, get_market_info, get_market_overview
+        )
+        from src.data.resample import resample_klines
+        from benchmarks.fixtures import synthesize_tickers
+        from src.visualization.charts import candlestick_figure, plot_candlestick, plot_price_evolution
+        from src.visualization.downsampling import aggregate_ohlc, lttb
+        from src.visualization.live_charts import LiveCandlestickChart
+
+        cases: List[Case] = []
+        rest = self.client()
+        symbol = self.symbol
+        max_days = len(self.fixture[symbol]) // 1440
+
+        # fetch_candlesticks: cold = empty store, warm = only the tail is fetched
+        for days in [d for d in self.windows if d <= max_days]:
+            def fetch(days=days, interval="1m"):
+                end = datetime.now()
+                df = fetch_candlesticks(rest, symbol, interval, end - timedelta(days=days), end)
+                return {"rows": len(df)}
+            cases.append(Case(f"fetch_candlesticks[1m,{days}d,cold]", fetch, setup=self.fresh_store))
+            cases.append(Case(f"fetch_candlesticks[1m,{days}d,warm]", fetch))
+            cases.append(Case(f"fetch_candlesticks[1h,{days}d,resampled]",
+                              lambda days=days: fetch(days, "1h")))
+
+        def market_info(client):
+            return lambda: {"ok": get_market_info(client, symbol) is not None}
+        cases.append(Case("get_market_info[rest,cold]", market_info(rest), setup=self.fresh_store))
+        cases.append(Case("get_market_info[rest,warm]", market_info(rest)))
+        cases.append(Case("get_market_info[stream]", market_info(self.client(stream=True))))
+
+        # Overview of the fixture's symbols topped up with static tickers:
+        # one all-tickers request plus 1h/7d rolling windows in batches of 100
+        tickers = synthesize_tickers(500)
+        self.fake.static_tickers.update((ticker["symbol"], ticker) for ticker in tickers)
+        for count in (10, 100, 500):
+            symbols = (self.symbols + [ticker["symbol"] for ticker in tickers])[:count]
+            cases.append(Case(f"get_market_overview[{count}]",
+                              lambda symbols=symbols: {"symbols": len(get_market_overview(rest, symbols))}))
+
+        # Decoding klines: one page, and responses of 100k and 1M rows made of
+        # repeated pages. Peak memory is measured once, untimed.
+        page = rest.scheduler.get("v3/klines", {"symbol": symbol, "interval": "1m", "limit": 1000}, raw=True)
+        cases.append(Case("decode_klines_json[1000]", lambda: {"rows": len(decode_klines_json(page))}))
+        cases.append(Case("json_to_dataframe[1000]", lambda: {"rows": len(pd.DataFrame(json.loads(page)).astype(float))}))
+        page_rows = page.strip()[1:-1]
+        for rows in (100_000, 1_000_000):
+            payload = b"[" + b",".join([page_rows] * (rows // 1000)) + b"]"
+            decode = lambda payload=payload: klines_frame(decode_klines_json(payload))
+            stats = {"rows": rows, "payload_mb": len(payload) / 2**20, "peak_mb": peak_memory(decode) / 2**20}
+            cases.append(Case(f"decode_klines_json[{rows}]", lambda decode=decode, stats=stats: dict(stats, rows=len(decode())),
+                              repeat=3))
+            if rows <= 100_000:
+                # The old path; at 1M rows it needs several GB
+                to_frame = lambda payload=payload: pd.DataFrame(json.loads(payload)).astype(float)
+                baseline = {"payload_mb": len(payload) / 2**20, "peak_mb": peak_memory(to_frame) / 2**20}
+                cases.append(Case(f"json_to_dataframe[{rows}]",
+                                  lambda to_frame=to_frame, baseline=baseline: dict(baseline, rows=len(to_frame())),
+                                  repeat=3))
+
+        for rows in (10_000, 100_000):
+            base = extend(self.fixture[symbol], rows)
+            frame = klines_frame(base)
+
+            # The frame is copied untimed, fetch_candlesticks hands over a
+            # fresh one on every refresh
+            copies: Dict[int, pd.DataFrame] = {}
+
+            def copy_frame(frame=frame, rows=rows, copies=copies):
+                copies[rows] = frame.copy()
+
+            cases.append(Case(f"calculate_moving_averages[rolling,{rows}]",
+                              lambda rows=rows, copies=copies: {"rows": len(calculate_moving_averages(copies[rows]))},
+                              setup=copy_frame))
+
+            def refresh(rows=rows, copies=copies):
+                return {"rows": len(calculate_moving_averages(copies[rows], key=("BENCH", str(rows)), open_rows=1))}
+            cases.append(Case(f"calculate_moving_averages[incremental,{rows}]", refresh, setup=copy_frame))
+
+            cases.append(Case(f"resample_klines[1m->1h,{rows}]", lambda base=base: {"rows": len(resample_klines(base, "1h"))}))
+            cases.append(Case(f"aggregate_ohlc[{rows}]", lambda frame=frame: {"rows": len(aggregate_ohlc(frame, config.CHART_MAX_POINTS))}))
+            cases.append(Case(f"lttb[{rows}]", lambda frame=frame: {"rows": len(lttb(
+                frame.index.asi8, frame["close"].to_numpy(), config.CHART_MAX_POINTS))}))
+
+            df = self.frame(rows)
+            cases.append(Case(f"plot_candlestick[{rows}]", lambda df=df: plot_candlestick(df, symbol)))
+            # Figure JSON sent to the browser, downsampled to CHART_MAX_POINTS
+            # against every candle
+            full_bytes = len(candlestick_figure(df, symbol, max_points=len(df)).to_json())
+
+            def figure_json(df=df, full_bytes=full_bytes):
+                sent = len(candlestick_figure(df, symbol).to_json())
+                return {"figure_bytes": sent, "figure_bytes_full": full_bytes, "reduction": full_bytes / sent}
+            cases.append(Case(f"candlestick_figure_json[{rows}]", figure_json))
+            cases.append(Case(f"plot_price_evolution[{rows}]", lambda df=df: plot_price_evolution(df, symbol)))
+
+            class Sink:
+                def vega_lite_chart(self, data, spec, **kwargs):
+                    return self
+
+                def add_rows(self, data):
+                    pass
+
+            def live_chart(df=df):
+                # An hour of the dashboard's 60s refreshes on a sliding 1m
+                # window: every refresh a new candle opens and the window's
+                # first candle drops. Bytes are the Arrow payloads sent to
+                # the browser, against rebuilding the chart on every refresh.
+                chart = LiveCandlestickChart(symbol)
+                window_rows = len(df) - 60
+                streamed = rebuilt = 0
+                for refresh in range(60):
+                    window = df.iloc[refresh:refresh + window_rows].copy()
+                    window.iloc[-1, window.columns.get_loc("close")] *= 1 + 1e-4
+                    streamed += arrow_bytes(chart.render(Sink(), window))
+                    rebuilt += arrow_bytes(chart._rows(chart._history(window)))
+                return {"bytes_sent": streamed, "bytes_rebuilt": rebuilt,
+                        "reduction": rebuilt / streamed, "rebuilds": chart.rebuilds}
+            cases.append(Case(f"live_candlestick_chart[{rows}]", live_chart, repeat=3))
+
+        engine = IndicatorEngine({
+            "sma": SMA(20), "ema": EMA(span=20), "rsi": RSI(14), "macd": MACD(),
+            "bb": BollingerBands(20), "vwap": VWAP()
+        })
+        engine.initialize(klines_frame(self.fixture[symbol][-5000:]))
+        candle = {name: float(self.fixture[symbol][-1][name]) for name in ["open", "high", "low", "close", "volume"]}
+        cases.append(Case("indicator_engine_update[1000 ticks]",
+                          lambda: {"ticks": len([engine.update(candle, closed=False) for _ in range(1000)])}))
+
+        from benchmarks.fixtures import synthesize_depth
+        from src.data.order_book import replay
+        recording = synthesize_depth(symbol, 100_000)
+
+        def replay_depth():
+            depth = replay(recording)[symbol]
+            return {"events": len(recording), "synced": depth.book.synced, "levels": len(depth.book.bids)}
+        cases.append(Case("order_book_replay[100000 events]", replay_depth))
+
+        for count in (10_000, 100_000):
+            rules = RuleEngine()
+            rng = np.random.default_rng(0)
+            price = float(self.fixture[symbol]["close"][-1])
+            for threshold in price * rng.uniform(0.8, 1.2, count):
+                rules.add_price_rule(symbol, "bench@example.com", threshold)
+            rules.evaluate(symbol, {"price": price})
+            cases.append(Case(f"alert_rules_evaluate[{count}]",
+                              lambda rules=rules, price=price: {"fired": len(rules.evaluate(symbol, {"price": price * 0.9}))}))
+        return cases
+
+def measure(suite: Suite, case: Case, repeat: int) -> Dict[str, Any]:
+    times, requests, sent, extra = [], [], [], {}
+    for _ in range(case.repeat or repeat):
+        if case.setup is not None:
+            case.setup()
+        suite.fake.reset_counters()
+        started = time.perf_counter()
+        extra = case.run() or {}
+        times.append(time.perf_counter() - started)
+        requests.append(suite.fake.requests)
+        sent.append(suite.fake.bytes_sent)
+    times_ms = np.array(times) * 1000
+    return {
+        "runs": len(times),
+        "min_ms": float(times_ms.min()),
+        "median_ms": float(np.median(times_ms)),
+        "mean_ms": float(times_ms.mean()),
+        "p95_ms": float(np.percentile(times_ms, 95)),
+        "requests": float(np.mean(requests)),
+        "bytes": float(np.mean(sent)),
+        **extra
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    print(f"{'case':55} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:55} {'-':>10} {result['median_ms']:10.2f}")
+            continue
+        change = result["median_ms"] / previous["median_ms"] - 1 if previous["median_ms"] else 0.0
+        flag = " !" if change > threshold else ""
+        print(f"{name:55} {previous['median_ms']:10.2f} {result['median_ms']:10.2f} {change:+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    from benchmarks import fixtures
+
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--fixture", help="recorded fixture (benchmarks.fixtures), synthetic if omitted")
+    parser.add_argument("--symbols", default=",".join(config.DEFAULT_SYMBOLS))
+    parser.add_argument("--days", type=int, default=35, help="days of synthetic 1m data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--windows", default="1,7,30", help="fetch_candlesticks windows in days")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="only run cases containing this text")
+    parser.add_argument("--compare", help="previous results file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # Streamlit calls outside `streamlit run` only warn about the missing runtime
+    from streamlit import config as streamlit_config
+    streamlit_config.set_option("global.showWarningOnDirectExecution", False)
+
+    if args.fixture:
+        fixture = fixtures.load(args.fixture)
+    else:
+        fixture = fixtures.synthesize(args.symbols.split(","), args.days, args.seed)
+
+    suite = Suite(fixture, args.latency_ms / 1000, args.jitter_ms / 1000, [int(d) for d in args.windows.split(",")])
+    results: Dict[str, Any] = {}
+    try:
+        for case in suite.cases():
+            if args.filter not in case.name:
+                continue
+            results[case.name] = measure(suite, case, args.repeat)
+            result = results[case.name]
+            print(f"{case.name:55} {result['median_ms']:10.2f} ms  {result['requests']:6.0f} req", flush=True)
+    finally:
+        suite.close()
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "fixture": args.fixture or f"synthetic:{args.days}d:seed={args.seed}",
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "repeat": args.repeat
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(output, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
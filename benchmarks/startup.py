@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Cold start of the dashboard, each sample in a fresh interpreter:
+# python -m benchmarks.startup --repeat 5 --baseline HEAD~1
+#
+# import_s      importing app.py (what every fresh process pays before the
+#               script can render anything)
+# first_paint_s from interpreter start to the end of the first dashboard
+#               refresh, running app.py under Streamlit's AppTest against the
+#               fake Binance server with an empty kline store
+#
+# --baseline checks out another revision in a temporary git worktree and
+# measures it the same way, for a before/after comparison.
+
+IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+print(json.dumps({"import_s": time.perf_counter() - started}))
+"""
+
+# The app loops forever refreshing, so the probe watches the dashboard_refresh
+# span from a second thread and exits once the first refresh has completed
+PAINT_PROBE = """
+import json, os, sys, threading, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+
+timeout = float(os.environ["STARTUP_TIMEOUT"])
+app = AppTest.from_file("app.py", default_timeout=timeout)
+threading.Thread(target=app.run, daemon=True).start()
+while time.perf_counter() - started < timeout:
+    # The module may still be half imported by the script thread
+    registry = getattr(sys.modules.get("src.utils.metrics"), "_registry", None)
+    if registry is not None and any(s["span"] == "dashboard_refresh" and s["count"] for s in registry.span_stats()):
+        print(json.dumps({"first_paint_s": time.perf_counter() - started}))
+        sys.stdout.flush()
+        os._exit(0)
+    time.sleep(0.002)
+os._exit(1)
+"""
+
+def _probe(code: str, tree: str, env: Dict[str, str], timeout: float) -> Optional[Dict[str, float]]:
+    # Output goes to a file and the probe gets its own process group: the
+    # app leaves helper processes (the forkserver) that would otherwise keep
+    # a pipe open, and they are killed with it
+    store = tempfile.mkdtemp(prefix="startup-store-")
+    with tempfile.TemporaryFile(mode="w+") as output:
+        process = subprocess.Popen(
+            [sys.executable, "-c", code],
+            cwd=tree,
+            env={**env, "KLINE_STORE_DIR": store, "STARTUP_TIMEOUT": str(timeout)},
+            stdout=output,
+            stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+        try:
+            returncode = process.wait(timeout=timeout + 30)
+        except subprocess.TimeoutExpired:
+            returncode = None
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        shutil.rmtree(store, ignore_errors=True)
+        output.seek(0)
+        lines = output.read().splitlines()
+    results = [line for line in lines if line.startswith("{")]
+    if returncode != 0 or not results:
+        print(f"probe failed in {tree}: {lines[-1:]}")
+        return None
+    return json.loads(results[-1])
+
+def measure(tree: str, env: Dict[str, str], repeat: int, timeout: float) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {"import_s": [], "first_paint_s": []}
+    for _ in range(repeat):
+        for code in (IMPORT_PROBE, PAINT_PROBE):
+            result = _probe(code, tree, env, timeout)
+            for name, value in (result or {}).items():
+                samples[name].append(value)
+    return {
+        name: {"median": float(np.median(values)), "min": float(min(values)), "samples": values}
+        for name, values in samples.items() if values
+    }
+
+def main(argv=None):
+    from benchmarks.fake_binance import FakeBinance
+    from benchmarks.fixtures import synthesize
+    import config
+
+    parser = argparse.ArgumentParser(description="Benchmark dashboard import time and time to first paint")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", default="startup.json")
+    args = parser.parse_args(argv)
+
+    fake = FakeBinance(synthesize(config.DEFAULT_SYMBOLS, 3), latency=args.latency_ms / 1000).start()
+    env = {
+        **os.environ,
+        "BINANCE_API_URL": fake.rest_url,
+        "BINANCE_WS_URL": fake.ws_url,
+        "CROSS_ASSET_DAYS": "2",
+        "CROSS_ASSET_WINDOW": "24",
+        "METRICS_ENABLED": "true",
+        "METRICS_PORT": "0",
+        "METRICS_FILE": ""
+    }
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    trees = {"current": root}
+    worktree = None
+    if args.baseline:
+        worktree = tempfile.mkdtemp(prefix="startup-baseline-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline], cwd=root, check=True, capture_output=True)
+        trees = {"baseline": worktree, **trees}
+
+    results: Dict[str, Any] = {}
+    try:
+        for name, tree in trees.items():
+            results[name] = measure(tree, env, args.repeat, args.timeout)
+            line = "  ".join(f"{metric} {stats['median']:6.3f}s" for metric, stats in results[name].items())
+            print(f"{name:>9}  {line}")
+    finally:
+        fake.stop()
+        if worktree:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=root, capture_output=True)
+
+    if "baseline" in results:
+        for metric, stats in results["current"].items():
+            before = results["baseline"].get(metric)
+            if before:
+                print(f"{metric}: {before['median']:.3f}s -> {stats['median']:.3f}s ({stats['median'] / before['median'] - 1:+.0%})")
+
+    with open(args.output, "w") as f:
+        json.dump({"latency_ms": args.latency_ms, "baseline": args.baseline, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
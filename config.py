@@ -12,6 +12,13 @@ SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SENDER_EMAIL = os.getenv("SENDER_EMAIL", "")
 SENDER_PASSWORD = os.getenv("SENDER_PASSWORD", "")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+
+# Alert delivery
+ALERT_BATCH_SECONDS = float(os.getenv("ALERT_BATCH_SECONDS", 5))
+ALERT_COOLDOWN_SECONDS = float(os.getenv("ALERT_COOLDOWN_SECONDS", 900))
+ALERT_RETRY_SECONDS = float(os.getenv("ALERT_RETRY_SECONDS", 30))
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", 5))
 
 # Default symbols
 DEFAULT_SYMBOLS = [
@@ -29,3 +36,92 @@ SYMBOL_DATA = {
         "circulation_supply": 19_801_356
     }
 }
+
+# Local kline storage
+KLINE_STORE_DIR = os.getenv("KLINE_STORE_DIR", os.path.join("data", "klines"))
+
+# Interval every longer interval is aggregated from locally; empty to fetch
+# each interval from Binance separately
+RESAMPLE_BASE_INTERVAL = os.getenv("RESAMPLE_BASE_INTERVAL", "1m")
+# Base candles a view may download to be aggregated locally; a longer
+# interval whose range is further from the stored base history (e.g. a cold
+# year of weekly candles from 1m) is fetched from Binance as is instead
+RESAMPLE_MAX_FETCH = int(os.getenv("RESAMPLE_MAX_FETCH", 10_000))
+
+# Streaming market data
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443")
+STREAM_INTERVALS = INTERVALS
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", 1000))
+STREAM_STALE_SECONDS = float(os.getenv("STREAM_STALE_SECONDS", 30))
+
+# Order book and trades (depth diffs + aggTrade stream)
+DEPTH_STREAM = os.getenv("DEPTH_STREAM", "true").lower() == "true"
+DEPTH_UPDATE_SPEED = os.getenv("DEPTH_UPDATE_SPEED", "100ms")
+DEPTH_SNAPSHOT_LIMIT = int(os.getenv("DEPTH_SNAPSHOT_LIMIT", 1000))
+DEPTH_MAX_LEVELS = int(os.getenv("DEPTH_MAX_LEVELS", 1000))
+TRADE_BUFFER_SIZE = int(os.getenv("TRADE_BUFFER_SIZE", 100_000))
+
+# Account valuation: user data stream listen keys expire after 60 minutes
+# without a keepalive; without a stream the account is polled instead
+ACCOUNT_KEEPALIVE_SECONDS = float(os.getenv("ACCOUNT_KEEPALIVE_SECONDS", 30 * 60))
+ACCOUNT_POLL_SECONDS = float(os.getenv("ACCOUNT_POLL_SECONDS", 300))
+
+# REST request scheduling
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com/api")
+BINANCE_WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", 1200))
+BINANCE_POOL_SIZE = int(os.getenv("BINANCE_POOL_SIZE", 20))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", 4))
+# How long the measured offset to Binance's clock is trusted for signed requests
+SERVER_TIME_TTL = float(os.getenv("SERVER_TIME_TTL", 3600))
+
+# Charts: points per trace sent to the browser follow the chart's width in
+# device pixels as reported by the browser, clamped to [CHART_MIN_POINTS,
+# CHART_MAX_POINTS]; CHART_MAX_POINTS is also used until the first report
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 2000))
+CHART_MIN_POINTS = int(os.getenv("CHART_MIN_POINTS", 300))
+CHART_LINE_DOWNSAMPLING = os.getenv("CHART_LINE_DOWNSAMPLING", "lttb")
+# Send charts once and then only append/patch candles instead of rebuilding,
+# rebuilding anyway after CHART_REBUILD_ROWS appended rows
+CHART_STREAMING = os.getenv("CHART_STREAMING", "false").lower() == "true"
+CHART_REBUILD_ROWS = int(os.getenv("CHART_REBUILD_ROWS", 500))
+TABLE_PAGE_SIZE = int(os.getenv("TABLE_PAGE_SIZE", 100))
+
+# Shared data cache
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 512 * 1024 * 1024))
+CACHE_MIN_TTL = float(os.getenv("CACHE_MIN_TTL", 5))
+CACHE_MAX_TTL = float(os.getenv("CACHE_MAX_TTL", 60))
+MARKET_INFO_TTL = float(os.getenv("MARKET_INFO_TTL", 15))
+OVERVIEW_TTL = float(os.getenv("OVERVIEW_TTL", 30))
+
+# Cross-asset analytics and backtests: worker processes, rolling windows in
+# candles of CROSS_ASSET_INTERVAL
+ANALYTICS_WORKERS = int(os.getenv("ANALYTICS_WORKERS", os.cpu_count() or 1))
+CROSS_ASSET_INTERVAL = os.getenv("CROSS_ASSET_INTERVAL", "1h")
+CROSS_ASSET_DAYS = int(os.getenv("CROSS_ASSET_DAYS", 90))
+CROSS_ASSET_WINDOW = int(os.getenv("CROSS_ASSET_WINDOW", 24 * 30))
+# Fractions of traded notional: Binance's base spot fee, and assumed slippage
+BACKTEST_FEE = float(os.getenv("BACKTEST_FEE", 0.001))
+BACKTEST_SLIPPAGE = float(os.getenv("BACKTEST_SLIPPAGE", 0.0005))
+
+# Columnar candle archive (python -m src.data.archive): one Parquet ("parquet")
+# or Arrow IPC ("arrow") file per symbol, interval and UTC day
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join("data", "archive"))
+ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "parquet")
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_ROW_GROUP_SIZE = int(os.getenv("ARCHIVE_ROW_GROUP_SIZE", 65_536))
+
+# Background collector (python -m src.collector). With USE_COLLECTOR the
+# dashboard only reads what the collector has written to KLINE_STORE_DIR.
+USE_COLLECTOR = os.getenv("USE_COLLECTOR", "false").lower() == "true"
+COLLECTOR_INTERVALS = os.getenv("COLLECTOR_INTERVALS", RESAMPLE_BASE_INTERVAL or ",".join(INTERVALS)).split(",")
+COLLECTOR_HISTORY_DAYS = int(os.getenv("COLLECTOR_HISTORY_DAYS", 365))
+COLLECTOR_POLL_SECONDS = float(os.getenv("COLLECTOR_POLL_SECONDS", 5))
+COLLECTOR_TICKER_SECONDS = float(os.getenv("COLLECTOR_TICKER_SECONDS", 30))
+
+# Instrumentation: Prometheus text on METRICS_PORT (/metrics) and/or in
+# METRICS_FILE, 0/empty to disable either. The endpoint listens on
+# METRICS_HOST, local only unless set to e.g. 0.0.0.0
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_FILE = os.getenv("METRICS_FILE", "")
@@ -0,0 +1,144 @@
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+from websockets.sync.client import connect
+from src.api.binance_client import BinanceAPI, get_binance_api
+from src.data.portfolio import Portfolio
+from src.utils.metrics import get_metrics_registry
+import config
+
+logger = logging.getLogger(__name__)
+
+# User data stream of the configured account, keeping a Portfolio current
+# from its balance events instead of refetching the account. The account is
+# read over REST once per connection, after subscribing; events from before
+# that snapshot are dropped by the Portfolio. Without a stream (no listen
+# key could be created) the account is polled every ACCOUNT_POLL_SECONDS
+# and successive snapshots are diffed.
+class AccountStream:
+    def __init__(
+        self,
+        client: Optional[BinanceAPI] = None,
+        base_url: Optional[str] = None,
+        keepalive: float = config.ACCOUNT_KEEPALIVE_SECONDS,
+        poll_interval: float = config.ACCOUNT_POLL_SECONDS
+    ):
+        self.client = client or BinanceAPI()
+        self.base_url = (base_url or config.BINANCE_WS_URL).rstrip("/")
+        self.keepalive = keepalive
+        self.poll_interval = poll_interval
+        self.portfolio = Portfolio()
+        self.messages_received = 0
+        self.balance_changes = 0
+        self._needs_snapshot = True
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+
+    @property
+    def is_live(self) -> bool:
+        return self._ws is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.portfolio.snapshots > 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="account-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            listen_key = self.client.create_listen_key()
+            if listen_key is None:
+                self._snapshot()
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                with connect(f"{self.base_url}/ws/{listen_key}", open_timeout=10, close_timeout=2) as ws:
+                    self._ws = ws
+                    backoff = 1.0
+                    logger.info(f"Account stream connected to {self.base_url}")
+                    self._needs_snapshot = True
+                    self._listen(ws, listen_key)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"Account stream error: {str(e)}")
+            finally:
+                self._ws = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def _listen(self, ws, listen_key: str):
+        kept_alive, last_attempt = time.monotonic(), float("-inf")
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self._needs_snapshot and now - last_attempt >= 5.0:
+                # Retried every few seconds if the account can't be read
+                last_attempt = now
+                self._snapshot()
+            if now - kept_alive >= self.keepalive:
+                kept_alive = now
+                if not self.client.keepalive_listen_key(listen_key):
+                    return
+            try:
+                raw = ws.recv(timeout=1.0)
+            except TimeoutError:
+                continue
+            if not self.handle_message(raw):
+                return
+
+    def _snapshot(self):
+        account = self.client.get_account()
+        if account is None:
+            return
+        self.balance_changes += self.portfolio.load(account)
+        self._needs_snapshot = False
+
+    def handle_message(self, raw) -> bool:
+        # False once the listen key has expired and a new one is needed
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed account stream message")
+            return True
+        self.messages_received += 1
+        if event.get("e") == "listenKeyExpired":
+            logger.info("Account stream listen key expired, reconnecting")
+            return False
+        if self.portfolio.apply(event):
+            self.balance_changes += len(event.get("B", []))
+        return True
+
+    def metric_samples(self):
+        yield "account_messages_total", "counter", {}, self.messages_received
+        yield "account_snapshots_total", "counter", {}, self.portfolio.snapshots
+        yield "account_balance_changes_total", "counter", {}, self.balance_changes
+        yield "account_assets", "gauge", {}, len(self.portfolio)
+
+_stream: Optional[AccountStream] = None
+_stream_lock = threading.Lock()
+
+def get_account_stream() -> AccountStream:
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = AccountStream(get_binance_api())
+            _stream.start()
+            get_metrics_registry().register_collector(_stream.metric_samples)
+        return _stream
@@ -1,49 +1,396 @@
-from binance.client import Client
+from concurrent.futures import Future
+import hashlib
+import hmac
+import json
 import logging
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from urllib.parse import urlencode
+from typing import Optional, List, Dict, Any, Tuple
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from src.api.market_stream import MarketStream, get_market_stream
+from src.data.kline_decoder import decode_klines_json
+from src.utils.metrics import get_metrics_registry, inc, span, timed
 import config
 
+# python-binance takes most of a second to import (dateparser); only its
+# exception types are used, imported where they are raised
+
 logger = logging.getLogger(__name__)
 
-class BinanceAPI:
-    def __init__(self):
+class RateLimitError(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def acquire(self, tokens: float, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.refill_per_second
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def limit_to(self, tokens: float):
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, tokens)
+
+# Every REST call goes through one scheduler per process: a pooled
+# keep-alive session, a weight-based token bucket kept in sync with the
+# X-MBX-USED-WEIGHT-1M header, a hard stop while Binance answers 429/418,
+# and coalescing of identical public requests that are already in flight.
+class RequestScheduler:
+    def __init__(
+        self,
+        base_url: str,
+        weight_limit: int = 1200,
+        pool_size: int = 20,
+        timeout: float = 10.0,
+        max_wait: float = 30.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.weight_limit = weight_limit
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.bucket = TokenBucket(weight_limit, weight_limit / 60.0)
+        self.banned_until = 0.0
+        self.used_weight = 0
+        self.endpoint_stats: Dict[str, Dict[str, int]] = {}
+        self.coalesced = 0
+        self._in_flight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, weight: int = 1, raw: bool = False) -> Any:
+        params = params or {}
+        key = (path, tuple(sorted(params.items())), raw)
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
         try:
-            self.client = Client(config.BINANCE_API_KEY, config.BINANCE_API_SECRET)
+            result = self._send("GET", path, params, weight, raw)
+            future.set_result(result)
+            return result
         except Exception as e:
-            logger.error(f"Error initializing Binance client: {str(e)}")
-            raise e
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def send_keyed(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        weight: int = 1,
+        api_key: str = "",
+        api_secret: Optional[str] = None,
+        time_offset: float = 0.0
+    ) -> Any:
+        # Account endpoints, never coalesced: they carry the API key, and with
+        # api_secret are signed (HMAC-SHA256 of the query string, with a
+        # timestamp corrected by the server time offset)
+        params = dict(params or {})
+        if api_secret is not None:
+            params["timestamp"] = int(time.time() * 1000 + time_offset)
+            query = urlencode(params)
+            params["signature"] = hmac.new(api_secret.encode(), query.encode(), hashlib.sha256).hexdigest()
+        return self._send(method, path, params, weight, headers={"X-MBX-APIKEY": api_key})
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, Any],
+        weight: int,
+        raw: bool = False,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Any:
+        retry_after = self.banned_until - time.time()
+        if retry_after > 0:
+            raise RateLimitError(f"Rate limited, retrying in {retry_after:.0f}s", retry_after)
+        if not self.bucket.acquire(weight, self.max_wait):
+            raise RateLimitError(f"Request weight budget exhausted for {path}", self.max_wait)
+
+        with span("binance_http", path=path):
+            response = self.session.request(
+                method, f"{self.base_url}/{path}", params=params, headers=headers, timeout=self.timeout
+            )
+        self._account(path, weight, response)
+
+        if response.status_code in (418, 429):
+            retry_after = float(response.headers.get("Retry-After", 60))
+            self.banned_until = max(self.banned_until, time.time() + retry_after)
+            logger.warning(f"Binance returned {response.status_code} for {path}, backing off {retry_after:.0f}s")
+            raise RateLimitError(f"HTTP {response.status_code} from Binance", retry_after)
+        if not (200 <= response.status_code < 300):
+            from binance.exceptions import BinanceAPIException
+            raise BinanceAPIException(response, response.status_code, response.text)
+        if raw:
+            return response.content
+        try:
+            return response.json()
+        except ValueError:
+            from binance.exceptions import BinanceRequestException
+            raise BinanceRequestException(f"Invalid Response: {response.text}")
 
-    def get_account_info(self) -> Optional[List[Dict[str, Any]]]:
+    def _account(self, path: str, weight: int, response: requests.Response):
+        used = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        with self._lock:
+            stats = self.endpoint_stats.setdefault(path, {"requests": 0, "weight": 0, "bytes": 0})
+            stats["requests"] += 1
+            stats["weight"] += weight
+            stats["bytes"] += len(response.content)
+            if used is not None:
+                self.used_weight = int(used)
+        if used is not None:
+            self.bucket.limit_to(self.weight_limit - int(used))
+
+    def metric_samples(self):
+        with self._lock:
+            for path, stats in self.endpoint_stats.items():
+                yield "binance_requests_total", "counter", {"path": path}, stats["requests"]
+                yield "binance_request_weight_total", "counter", {"path": path}, stats["weight"]
+                yield "binance_response_bytes_total", "counter", {"path": path}, stats["bytes"]
+            yield "binance_coalesced_requests_total", "counter", {}, self.coalesced
+            yield "binance_used_weight", "gauge", {}, self.used_weight
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_request_scheduler() -> RequestScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(
+                config.BINANCE_API_URL,
+                weight_limit=config.BINANCE_WEIGHT_LIMIT,
+                pool_size=config.BINANCE_POOL_SIZE
+            )
+            get_metrics_registry().register_collector(_scheduler.metric_samples)
+        return _scheduler
+
+# Offset between Binance's clock and ours, measured once and reused by every
+# client for signed request timestamps (and recvWindow checks)
+_server_time: Tuple[float, float] = (0.0, 0.0)   # (offset ms, measured at)
+_server_time_lock = threading.Lock()
+
+def get_server_time_offset(scheduler: Optional[RequestScheduler] = None) -> float:
+    global _server_time
+    with _server_time_lock:
+        offset, measured_at = _server_time
+        if measured_at and time.monotonic() - measured_at < config.SERVER_TIME_TTL:
+            return offset
+        try:
+            sent = time.time() * 1000
+            server_time = (scheduler or get_request_scheduler()).get("v3/time", weight=1)["serverTime"]
+            received = time.time() * 1000
+            # Assume the server read its clock half way through the round trip
+            offset = server_time - (sent + received) / 2
+            _server_time = (offset, time.monotonic())
+        except Exception as e:
+            logger.error(f"Error fetching Binance server time: {str(e)}")
+        return offset
+
+class BinanceAPI:
+    read_only = False
+
+    def __init__(self, stream: Optional[MarketStream] = None, scheduler: Optional[RequestScheduler] = None):
+        self.stream = stream
+        self.scheduler = scheduler or get_request_scheduler()
+
+    def _send_keyed(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                    weight: int = 1, signed: bool = True) -> Any:
+        return self.scheduler.send_keyed(
+            method, path, params, weight,
+            api_key=config.BINANCE_API_KEY,
+            api_secret=config.BINANCE_API_SECRET if signed else None,
+            time_offset=get_server_time_offset(self.scheduler) if signed else 0.0
+        )
+
+    @timed()
+    def get_account(self) -> Optional[Dict[str, Any]]:
+        # The full account snapshot, including its updateTime
+        if not config.BINANCE_API_KEY:
+            # Nothing to sign with, don't spend a request finding that out
+            return None
         try:
-            account = self.client.get_account()
-            return account['balances']
+            return self._send_keyed("GET", "v3/account", weight=20)
         except Exception as e:
             logger.error(f"Error fetching account info: {str(e)}")
             return None
+
+    def create_listen_key(self) -> Optional[str]:
+        # User data stream key, valid for 60 minutes unless kept alive
+        if not config.BINANCE_API_KEY:
+            return None
+        try:
+            return self._send_keyed("POST", "v3/userDataStream", weight=2, signed=False)["listenKey"]
+        except Exception as e:
+            logger.error(f"Error creating user data stream: {str(e)}")
+            return None
+
+    def keepalive_listen_key(self, listen_key: str) -> bool:
+        try:
+            self._send_keyed("PUT", "v3/userDataStream", {"listenKey": listen_key}, weight=2, signed=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error keeping user data stream alive: {str(e)}")
+            return False
     
+    @timed()
     def get_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
+        if self.stream is not None:
+            ticker = self.stream.get_ticker(symbol)
+            if ticker is not None:
+                inc("stream_served_total", method="get_ticker")
+                return ticker
         try:
-            return self.client.get_ticker(symbol=symbol)
+            return self.scheduler.get("v3/ticker/24hr", {"symbol": symbol}, weight=2)
         except Exception as e:
             logger.error(f"Error fetching ticker for {symbol}: {str(e)}")
             return None
     
+    @timed()
+    def get_tickers(self) -> List[Dict[str, Any]]:
+        try:
+            return self.scheduler.get("v3/ticker/24hr", weight=80)
+        except Exception as e:
+            logger.error(f"Error fetching tickers: {str(e)}")
+            return []
+
+    @timed()
+    def get_rolling_window_tickers(self, symbols: List[str], window_size: str) -> List[Dict[str, Any]]:
+        # The rolling window endpoint accepts at most 100 symbols per request
+        tickers = []
+        try:
+            for i in range(0, len(symbols), 100):
+                batch = json.dumps(symbols[i:i + 100], separators=(",", ":"))
+                weight = min(4 * len(symbols[i:i + 100]), 200)
+                tickers.extend(self.scheduler.get("v3/ticker", {"symbols": batch, "windowSize": window_size}, weight=weight))
+            return tickers
+        except Exception as e:
+            logger.error(f"Error fetching {window_size} rolling window tickers: {str(e)}")
+            return []
+
+    @timed()
+    def get_order_book(self, symbol: str, limit: int = 1000) -> Optional[Dict[str, Any]]:
+        weight = 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+        try:
+            return self.scheduler.get("v3/depth", {"symbol": symbol, "limit": limit}, weight=weight)
+        except Exception as e:
+            logger.error(f"Error fetching order book for {symbol}: {str(e)}")
+            return None
+
+    @timed()
     def get_klines(self, symbol: str, interval: str, limit: int) -> List:
+        if self.stream is not None:
+            klines = self.stream.get_klines(symbol, interval, limit)
+            if klines:
+                inc("stream_served_total", method="get_klines")
+                return klines
         try:
-            return self.client.get_klines(symbol=symbol, interval=interval, limit=limit)
+            klines = self.scheduler.get(
+                "v3/klines",
+                {"symbol": symbol, "interval": interval, "limit": limit},
+                weight=2
+            )
+            if self.stream is not None:
+                gap = self.stream.seed_klines(symbol, interval, klines)
+                if gap is not None:
+                    # Closed candles between the page and the first streamed
+                    # one (e.g. right after a reconnect)
+                    missing = self.scheduler.get(
+                        "v3/klines",
+                        {"symbol": symbol, "interval": interval, "startTime": gap[0], "endTime": gap[1], "limit": 1000},
+                        weight=2
+                    )
+                    self.stream.seed_klines(symbol, interval, klines + missing)
+            return klines
         except Exception as e:
             logger.error(f"Error fetching klines for {symbol} at {interval}: {str(e)}")
             return []
     
-    def get_historical_klines(self, symbol: str, interval: str, start_str: str, end_str: str, limit: int) -> List:
+    @timed()
+    def get_klines_array(self, symbol: str, interval: str, start_ts: int, end_ts: int, limit: int = 1000) -> Optional[np.ndarray]:
         try:
-            return self.client.get_historical_klines(
-                symbol=symbol,
-                interval=interval,
-                start_str=start_str,
-                end_str=end_str,
-                limit=limit
+            raw = self.scheduler.get(
+                "v3/klines",
+                {"symbol": symbol, "interval": interval, "startTime": start_ts, "endTime": end_ts, "limit": limit},
+                weight=2,
+                raw=True
             )
+            return decode_klines_json(raw)
+        except Exception as e:
+            logger.error(f"Error fetching klines page for {symbol} at {interval}: {str(e)}")
+            return None
+
+    @timed()
+    def get_historical_klines(self, symbol: str, interval: str, start_str: str, end_str: str, limit: int) -> List:
+        if self.stream is not None:
+            klines = self.stream.get_klines_since(symbol, interval, int(start_str), int(end_str))
+            if klines is not None:
+                inc("stream_served_total", method="get_historical_klines")
+                return klines
+        try:
+            start_ts, end_ts = int(start_str), int(end_str)
+            klines = []
+            while start_ts <= end_ts:
+                batch = self.scheduler.get(
+                    "v3/klines",
+                    {"symbol": symbol, "interval": interval, "startTime": start_ts, "endTime": end_ts, "limit": limit},
+                    weight=2
+                )
+                klines.extend(batch)
+                if len(batch) < limit:
+                    break
+                start_ts = batch[-1][0] + 1
+            return klines
         except Exception as e:
             logger.error(f"Error fetching historical klines: {str(e)}")
             return []
+
+_api: Optional[BinanceAPI] = None
+_api_lock = threading.Lock()
+
+def get_binance_api() -> BinanceAPI:
+    # One client for every dashboard session and rerun, backed by the market
+    # stream; constructing it makes no request
+    global _api
+    with _api_lock:
+        if _api is None:
+            _api = BinanceAPI(stream=get_market_stream())
+        return _api
@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from websockets.sync.client import connect
+from src.api.binance_client import BinanceAPI
+from src.data.order_book import MarketDepth
+from src.utils.metrics import get_metrics_registry
+import config
+
+logger = logging.getLogger(__name__)
+
+# Combined depth diff + aggregated trade stream for a set of symbols, keeping
+# one MarketDepth per symbol. Snapshots are fetched over REST whenever a book
+# is out of sync (at start, after a gap or a reconnect). With record_path,
+# every message and snapshot is appended to a JSON lines file that
+# src.data.order_book.replay can play back.
+class DepthStream:
+    def __init__(
+        self,
+        symbols: List[str],
+        client: Optional[BinanceAPI] = None,
+        base_url: Optional[str] = None,
+        snapshot_limit: int = config.DEPTH_SNAPSHOT_LIMIT,
+        speed: str = config.DEPTH_UPDATE_SPEED,
+        record_path: Optional[str] = None,
+        stale_after: float = config.STREAM_STALE_SECONDS
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.client = client or BinanceAPI()
+        self.base_url = (base_url or config.BINANCE_WS_URL).rstrip("/")
+        self.snapshot_limit = snapshot_limit
+        self.speed = speed
+        self.record_path = record_path
+        self.stale_after = stale_after
+        self.depths: Dict[str, MarketDepth] = {symbol: MarketDepth(symbol) for symbol in self.symbols}
+        self.last_message_time = 0.0
+        self.messages_received = 0
+        self.snapshots = 0
+        self._snapshot_times: Dict[str, float] = {}
+        self._record = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+
+    @property
+    def url(self) -> str:
+        # 1000ms is the stream's default and has no suffix
+        depth = "depth@100ms" if self.speed == "100ms" else "depth"
+        streams = []
+        for symbol in self.symbols:
+            streams.extend([f"{symbol.lower()}@{depth}", f"{symbol.lower()}@aggTrade"])
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    @property
+    def is_live(self) -> bool:
+        return self._ws is not None and time.time() - self.last_message_time < self.stale_after
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.record_path and self._record is None:
+            self._record = open(self.record_path, "a")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="depth-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with connect(self.url, open_timeout=10, close_timeout=2, max_size=2 ** 22) as ws:
+                    self._ws = ws
+                    backoff = 1.0
+                    with self._lock:
+                        for depth in self.depths.values():
+                            depth.reset()
+                    logger.info(f"Depth stream connected to {self.base_url}")
+                    for raw in ws:
+                        self.handle_message(raw)
+                        self._sync()
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"Depth stream error: {str(e)}")
+            finally:
+                self._ws = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def handle_message(self, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed depth stream message")
+            return
+        data = message.get("data", message)
+        depth = self.depths.get(data.get("s"))
+        if depth is not None:
+            with self._lock:
+                depth.on_event(data)
+        if self._record is not None:
+            self._record.write(raw if isinstance(raw, str) else raw.decode())
+            self._record.write("\n")
+        self.last_message_time = time.time()
+        self.messages_received += 1
+
+    def _sync(self):
+        # At most one snapshot per symbol per second, the endpoint is heavy
+        now = time.monotonic()
+        for symbol, depth in self.depths.items():
+            if not depth.needs_snapshot or now - self._snapshot_times.get(symbol, float("-inf")) < 1.0:
+                continue
+            self._snapshot_times[symbol] = now
+            snapshot = self.client.get_order_book(symbol, self.snapshot_limit)
+            if snapshot is None:
+                continue
+            self.snapshots += 1
+            if self._record is not None:
+                self._record.write(json.dumps({"symbol": symbol, "snapshot": snapshot}) + "\n")
+            with self._lock:
+                if depth.load_snapshot(snapshot):
+                    logger.info(f"{symbol} order book synced at update {snapshot['lastUpdateId']}")
+
+    def summary(self, symbol: str, levels: int = 10) -> Optional[Dict[str, Any]]:
+        depth = self.depths.get(symbol.upper())
+        if depth is None or not self.is_live:
+            return None
+        with self._lock:
+            return depth.summary(levels)
+
+    def metric_samples(self):
+        yield "depth_messages_total", "counter", {}, self.messages_received
+        yield "depth_snapshots_total", "counter", {}, self.snapshots
+        with self._lock:
+            for symbol, depth in self.depths.items():
+                yield "depth_book_synced", "gauge", {"symbol": symbol}, int(depth.book.synced)
+                yield "depth_book_resyncs_total", "counter", {"symbol": symbol}, depth.book.resyncs
+                yield "depth_trades_total", "counter", {"symbol": symbol}, depth.trades.count
+
+_stream: Optional[DepthStream] = None
+_stream_lock = threading.Lock()
+
+def get_depth_stream() -> DepthStream:
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = DepthStream(config.DEFAULT_SYMBOLS)
+            _stream.start()
+            get_metrics_registry().register_collector(_stream.metric_samples)
+        return _stream
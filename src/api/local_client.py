@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+from src.data.kline_store import get_kline_store
+from src.data.resample import get_resampler, is_resampled
+import config
+
+logger = logging.getLogger(__name__)
+
+TICKERS_FILE = "tickers.json"
+TICKER_WINDOWS = ["1h", "1d", "7d"]
+
+def write_shared_tickers(tickers: Dict[str, List[Dict[str, Any]]], root: Optional[str] = None):
+    root = root or config.KLINE_STORE_DIR
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, TICKERS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(tickers, f)
+    os.replace(path + ".tmp", path)
+
+# Read-only stand-in for BinanceAPI that serves everything from the local
+# store filled by the collector (python -m src.collector), so dashboards
+# never call Binance themselves.
+class LocalStoreClient:
+    read_only = True
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or config.KLINE_STORE_DIR
+        self.stream = None
+        self._tickers: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._tickers_mtime = 0.0
+
+    def _load_tickers(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        path = os.path.join(self.root, TICKERS_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime != self._tickers_mtime:
+                with open(path) as f:
+                    windows = json.load(f)
+                self._tickers = {
+                    window: {t['symbol']: t for t in tickers} for window, tickers in windows.items()
+                }
+                self._tickers_mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading shared tickers: {str(e)}")
+        return self._tickers
+
+    def _rows(self, symbol: str, interval: str, start_ts: Optional[int] = None,
+              end_ts: Optional[int] = None) -> np.ndarray:
+        # Intervals longer than the base interval are aggregated from the
+        # base store, the same way fetch_candlesticks reads them, since the
+        # collector only stores the base by default
+        source = config.RESAMPLE_BASE_INTERVAL if is_resampled(interval) else interval
+        store = get_kline_store(symbol, source, self.root)
+        store.refresh()
+        open_rows = store.read_open()
+        if source != interval:
+            resampler = get_resampler(store, interval)
+            resampler.update(open_rows)
+            return resampler.read(start_ts, end_ts)
+        if start_ts is not None:
+            open_rows = open_rows[open_rows["open_time"] >= start_ts]
+        if end_ts is not None:
+            open_rows = open_rows[open_rows["open_time"] <= end_ts]
+        return store.read(start_ts, end_ts, tail=open_rows)
+
+    def get_account(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    def get_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
+        return self._load_tickers().get("1d", {}).get(symbol)
+
+    def get_tickers(self) -> List[Dict[str, Any]]:
+        return list(self._load_tickers().get("1d", {}).values())
+
+    def get_rolling_window_tickers(self, symbols: List[str], window_size: str) -> List[Dict[str, Any]]:
+        tickers = self._load_tickers().get(window_size, {})
+        return [tickers[s] for s in symbols if s in tickers]
+
+    def get_order_book(self, symbol: str, limit: int = 1000) -> Optional[Dict[str, Any]]:
+        return None
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> List:
+        return self._rows(symbol, interval)[-limit:].tolist()
+
+    def get_klines_array(self, symbol: str, interval: str, start_ts: int, end_ts: int, limit: int = 1000) -> Optional[np.ndarray]:
+        return self._rows(symbol, interval, start_ts, end_ts)[:limit]
+
+    def get_historical_klines(self, symbol: str, interval: str, start_str: str, end_str: str, limit: int) -> List:
+        return self._rows(symbol, interval, int(start_str), int(end_str)).tolist()
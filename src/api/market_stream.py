@@ -0,0 +1,241 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, Deque, Tuple
+
+from websockets.sync.client import connect
+from src.utils.metrics import get_metrics_registry
+import config
+
+logger = logging.getLogger(__name__)
+
+TICKER_FIELDS = {
+    "s": "symbol",
+    "p": "priceChange",
+    "P": "priceChangePercent",
+    "w": "weightedAvgPrice",
+    "x": "prevClosePrice",
+    "c": "lastPrice",
+    "Q": "lastQty",
+    "b": "bidPrice",
+    "B": "bidQty",
+    "a": "askPrice",
+    "A": "askQty",
+    "o": "openPrice",
+    "h": "highPrice",
+    "l": "lowPrice",
+    "v": "volume",
+    "q": "quoteVolume",
+    "O": "openTime",
+    "C": "closeTime",
+    "F": "firstId",
+    "L": "lastId",
+    "n": "count",
+}
+
+# One combined kline+ticker stream for a set of symbols. Candles and tickers
+# are kept in the same shape the REST endpoints return so BinanceAPI can serve
+# them transparently.
+class MarketStream:
+    def __init__(
+        self,
+        symbols: List[str],
+        intervals: List[str],
+        buffer_size: int = 1000,
+        base_url: Optional[str] = None,
+        stale_after: float = 30.0,
+        record_path: Optional[str] = None
+    ):
+        self.symbols = [s.upper() for s in symbols]
+        self.intervals = list(intervals)
+        self.buffer_size = buffer_size
+        self.base_url = (base_url or config.BINANCE_WS_URL).rstrip("/")
+        self.stale_after = stale_after
+        self.record_path = record_path
+        self.last_message_time = 0.0
+        self.messages_received = 0
+        self._klines: Dict[Tuple[str, str], Deque[List]] = {}
+        self._tickers: Dict[str, Dict[str, Any]] = {}
+        self._record = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+
+    @property
+    def url(self) -> str:
+        streams = []
+        for symbol in self.symbols:
+            streams.extend(f"{symbol.lower()}@kline_{interval}" for interval in self.intervals)
+            streams.append(f"{symbol.lower()}@ticker")
+        return f"{self.base_url}/stream?streams={'/'.join(streams)}"
+
+    @property
+    def is_live(self) -> bool:
+        return self._ws is not None and time.time() - self.last_message_time < self.stale_after
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.record_path and self._record is None:
+            self._record = open(self.record_path, "a")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with connect(self.url, open_timeout=10, close_timeout=2, max_size=2 ** 22) as ws:
+                    self._ws = ws
+                    backoff = 1.0
+                    # Candles missed while disconnected would leave silent
+                    # gaps, buffers are rebuilt from REST seeds instead.
+                    with self._lock:
+                        self._klines.clear()
+                    logger.info(f"Market stream connected to {self.base_url}")
+                    for raw in ws:
+                        self.handle_message(raw)
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.error(f"Market stream error: {str(e)}")
+            finally:
+                self._ws = None
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def handle_message(self, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.warning("Ignoring malformed stream message")
+            return
+        data = message.get("data", message)
+        event = data.get("e")
+        if event == "kline":
+            self._on_kline(data["k"])
+        elif event == "24hrTicker":
+            self._on_ticker(data)
+        if self._record is not None:
+            self._record.write(raw if isinstance(raw, str) else raw.decode())
+            self._record.write("\n")
+        self.last_message_time = time.time()
+        self.messages_received += 1
+
+    def _on_kline(self, k: Dict[str, Any]):
+        row = [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"], "0"]
+        key = (k["s"], k["i"])
+        with self._lock:
+            buffer = self._klines.setdefault(key, deque(maxlen=self.buffer_size))
+            if buffer and buffer[-1][0] == row[0]:
+                buffer[-1] = row
+            elif not buffer or buffer[-1][0] < row[0]:
+                buffer.append(row)
+
+    def _on_ticker(self, data: Dict[str, Any]):
+        ticker = {name: data[field] for field, name in TICKER_FIELDS.items() if field in data}
+        with self._lock:
+            self._tickers[ticker["symbol"]] = ticker
+
+    def seed_klines(self, symbol: str, interval: str, rows: List) -> Optional[Tuple[int, int]]:
+        # Merges REST rows in front of the streamed candles. If candles are
+        # missing between the last seeded and the first streamed one, the
+        # buffer is left as it was and the missing (start, end) open time
+        # range is returned, to be fetched and seeded along with `rows`.
+        key = (symbol.upper(), interval)
+        with self._lock:
+            streamed = self._klines.get(key, ())
+            if rows and streamed:
+                last_seeded = max(rows, key=lambda row: row[0])
+                first_streamed = streamed[0]
+                if int(last_seeded[6]) + 1 < first_streamed[0]:
+                    return int(last_seeded[6]) + 1, int(first_streamed[0]) - 1
+            merged = {row[0]: row for row in rows}
+            merged.update({row[0]: row for row in streamed})
+            ordered = [merged[t] for t in sorted(merged)]
+            self._klines[key] = deque(ordered, maxlen=self.buffer_size)
+            return None
+
+    def get_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
+        if not self.is_live:
+            return None
+        with self._lock:
+            ticker = self._tickers.get(symbol.upper())
+            return dict(ticker) if ticker else None
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> List:
+        if not self.is_live:
+            return []
+        with self._lock:
+            buffer = self._klines.get((symbol.upper(), interval))
+            if not buffer or len(buffer) < limit:
+                return []
+            return [list(row) for row in list(buffer)[-limit:]]
+
+    def get_klines_since(self, symbol: str, interval: str, start_ts: int, end_ts: int) -> Optional[List]:
+        # Only answers when the buffer reaches back to start_ts, otherwise the
+        # caller cannot tell a gap from a quiet market.
+        if not self.is_live:
+            return None
+        with self._lock:
+            buffer = self._klines.get((symbol.upper(), interval))
+            if not buffer or buffer[0][0] > start_ts:
+                return None
+            return [list(row) for row in buffer if start_ts <= row[0] <= end_ts]
+
+    def metric_samples(self):
+        yield "stream_messages_total", "counter", {}, self.messages_received
+        yield "stream_live", "gauge", {}, int(self.is_live)
+
+_stream: Optional[MarketStream] = None
+_stream_lock = threading.Lock()
+
+def get_market_stream() -> MarketStream:
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = MarketStream(
+                config.DEFAULT_SYMBOLS,
+                config.STREAM_INTERVALS,
+                buffer_size=config.STREAM_BUFFER_SIZE,
+                stale_after=config.STREAM_STALE_SECONDS
+            )
+            _stream.start()
+            get_metrics_registry().register_collector(_stream.metric_samples)
+        return _stream
+
+def main(argv=None):
+    # python -m src.api.market_stream record RECORDING --symbols BTCUSDT --intervals 1m --seconds 60
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record the combined kline and ticker stream")
+    parser.add_argument("command", choices=["record"])
+    parser.add_argument("recording")
+    parser.add_argument("--symbols", default="BTCUSDT")
+    parser.add_argument("--intervals", default="1m")
+    parser.add_argument("--seconds", type=float, default=60)
+    args = parser.parse_args(argv)
+
+    stream = MarketStream(args.symbols.split(","), args.intervals.split(","), record_path=args.recording)
+    stream.start()
+    try:
+        time.sleep(args.seconds)
+    finally:
+        stream.stop()
+
+if __name__ == "__main__":
+    main()
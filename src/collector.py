@@ -0,0 +1,166 @@
+import argparse
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from src.api.binance_client import BinanceAPI
+from src.api.local_client import TICKER_WINDOWS, write_shared_tickers
+from src.api.market_stream import MarketStream
+from src.data.market_data import DAY_MS, ingest_candlesticks
+from src.utils.metrics import export_metrics, get_metrics_registry, span, start_metrics_server
+import config
+
+logger = logging.getLogger(__name__)
+
+# Keeps the local kline store and the shared tickers file up to date for a
+# set of symbols/intervals, independently of how many dashboards are open.
+# Dashboards started with USE_COLLECTOR=true only read what it writes.
+class Collector:
+    def __init__(
+        self,
+        client: BinanceAPI,
+        symbols: List[str],
+        intervals: List[str],
+        history_days: int = 365,
+        poll_seconds: float = 5.0,
+        ticker_seconds: float = 30.0,
+        max_workers: int = 4
+    ):
+        self.client = client
+        self.symbols = [s.upper() for s in symbols]
+        self.intervals = list(intervals)
+        self.history_days = history_days
+        self.poll_seconds = poll_seconds
+        self.ticker_seconds = ticker_seconds
+        self.max_workers = max_workers
+        self.candles = 0
+        self.passes = 0
+        self.started_at = time.monotonic()
+        self._stop = threading.Event()
+        self._tickers_at = float("-inf")
+
+    @property
+    def pairs(self) -> List[Tuple[str, str]]:
+        return [(symbol, interval) for symbol in self.symbols for interval in self.intervals]
+
+    @property
+    def candles_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.candles / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        self._stop.set()
+
+    def _ingest(self, pair: Tuple[str, str]) -> int:
+        symbol, interval = pair
+        if self._stop.is_set():
+            return 0
+        start_ts = int(time.time() * 1000) - self.history_days * DAY_MS
+        try:
+            return ingest_candlesticks(self.client, symbol, interval, start_ts)
+        except Exception as e:
+            logger.error(f"Error collecting {symbol} {interval} klines: {str(e)}")
+            return 0
+
+    def collect_klines(self) -> int:
+        # The first pass backfills history_days for every pair, later passes
+        # only fetch what closed since (mostly served by the WebSocket).
+        started = time.monotonic()
+        with span("collector_pass"), \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector") as executor:
+            added = sum(executor.map(self._ingest, self.pairs))
+        self.candles += added
+        self.passes += 1
+        elapsed = time.monotonic() - started
+        if added:
+            logger.info(
+                f"Collected {added} candles in {elapsed:.2f}s ({added / elapsed:.0f} candles/s, "
+                f"{self.candles_per_second:.1f} candles/s overall)"
+            )
+        return added
+
+    def collect_tickers(self):
+        try:
+            tickers = {"1d": [t for t in self.client.get_tickers() if t['symbol'] in self.symbols]}
+            symbols = [t['symbol'] for t in tickers["1d"]]
+            for window in TICKER_WINDOWS:
+                if window not in tickers:
+                    tickers[window] = self.client.get_rolling_window_tickers(symbols, window)
+            write_shared_tickers(tickers)
+            self._tickers_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error collecting tickers: {str(e)}")
+
+    def metric_samples(self):
+        yield "collector_candles_total", "counter", {}, self.candles
+        yield "collector_passes_total", "counter", {}, self.passes
+        yield "collector_candles_per_second", "gauge", {}, self.candles_per_second
+
+    def run(self):
+        logger.info(
+            f"Collecting {', '.join(self.intervals)} klines for {', '.join(self.symbols)} "
+            f"into {config.KLINE_STORE_DIR}"
+        )
+        while not self._stop.is_set():
+            if time.monotonic() - self._tickers_at >= self.ticker_seconds:
+                self.collect_tickers()
+            self.collect_klines()
+            export_metrics()
+            self._stop.wait(self.poll_seconds)
+        logger.info(f"Collector stopped after {self.passes} passes, {self.candles} candles collected")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect Binance klines and tickers into the local store")
+    parser.add_argument("--symbols", default=",".join(config.DEFAULT_SYMBOLS),
+                        help="comma-separated symbols")
+    parser.add_argument("--intervals", default=",".join(config.COLLECTOR_INTERVALS),
+                        help="comma-separated kline intervals")
+    parser.add_argument("--history-days", type=int, default=config.COLLECTOR_HISTORY_DAYS)
+    parser.add_argument("--poll-seconds", type=float, default=config.COLLECTOR_POLL_SECONDS)
+    parser.add_argument("--ticker-seconds", type=float, default=config.COLLECTOR_TICKER_SECONDS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    intervals = [i.strip() for i in args.intervals.split(",") if i.strip()]
+
+    stream = MarketStream(
+        symbols,
+        intervals,
+        buffer_size=config.STREAM_BUFFER_SIZE,
+        stale_after=config.STREAM_STALE_SECONDS
+    )
+    stream.start()
+    collector = Collector(
+        BinanceAPI(stream=stream),
+        symbols,
+        intervals,
+        history_days=args.history_days,
+        poll_seconds=args.poll_seconds,
+        ticker_seconds=args.ticker_seconds,
+        max_workers=config.BACKFILL_WORKERS
+    )
+
+    def shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, finishing current pass")
+        collector.stop()
+
+    get_metrics_registry().register_collector(collector.metric_samples)
+    start_metrics_server(config.METRICS_PORT)
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        collector.run()
+    finally:
+        stream.stop()
+
+if __name__ == "__main__":
+    main()
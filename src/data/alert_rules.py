@@ -0,0 +1,154 @@
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set
+
+import numpy as np
+import pandas as pd
+from src.api.binance_client import BinanceAPI
+from src.data.market_data import get_price_change_for_interval
+import config
+
+MA_PERIODS = [20, 50, 200]
+
+# Every rule compares one market feature of its symbol either against a fixed
+# threshold or against a second feature (MA crossovers).
+FEATURES = ["price"] + [f"change_{interval}" for interval in config.INTERVALS] + [f"MA_{p}" for p in MA_PERIODS]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+ABOVE = 1
+BELOW = -1
+
+class AlertRule(NamedTuple):
+    rule_id: int
+    symbol: str
+    subscriber: str
+    feature: str
+    direction: int
+    threshold: float
+    reference: Optional[str]
+
+# Rules of one symbol stored column-wise. Additions and removals are
+# buffered and folded into the arrays on the next evaluation.
+class _RuleBlock:
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.feature = np.empty(0, dtype=np.int16)
+        self.reference = np.empty(0, dtype=np.int16)
+        self.direction = np.empty(0, dtype=np.int8)
+        self.threshold = np.empty(0, dtype=np.float64)
+        self.state = np.empty(0, dtype=bool)
+        self.pending: List[AlertRule] = []
+        self.removed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.pending) - len(self.removed)
+
+    def _flush(self):
+        if self.removed:
+            keep = ~np.isin(self.ids, np.fromiter(self.removed, dtype=np.int64))
+            for name in ("ids", "feature", "reference", "direction", "threshold", "state"):
+                setattr(self, name, getattr(self, name)[keep])
+            self.removed.clear()
+        if self.pending:
+            rules = self.pending
+            self.ids = np.concatenate([self.ids, [r.rule_id for r in rules]]).astype(np.int64)
+            self.feature = np.concatenate([self.feature, [FEATURE_INDEX[r.feature] for r in rules]]).astype(np.int16)
+            self.reference = np.concatenate(
+                [self.reference, [FEATURE_INDEX[r.reference] if r.reference else -1 for r in rules]]
+            ).astype(np.int16)
+            self.direction = np.concatenate([self.direction, [r.direction for r in rules]]).astype(np.int8)
+            self.threshold = np.concatenate([self.threshold, [r.threshold for r in rules]]).astype(np.float64)
+            self.state = np.concatenate([self.state, np.zeros(len(rules), dtype=bool)])
+            self.pending = []
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+        self._flush()
+        lhs = values[self.feature]
+        rhs = np.where(self.reference >= 0, values[self.reference], self.threshold)
+        valid = ~(np.isnan(lhs) | np.isnan(rhs))
+        condition = np.where(self.direction > 0, lhs > rhs, lhs <= rhs) & valid
+        # Edge-triggered: only rules whose condition just became true fire.
+        # Missing data keeps the previous state instead of re-arming.
+        fired = condition & ~self.state
+        self.state = np.where(valid, condition, self.state)
+        return self.ids[fired]
+
+    def rearm(self, rule_id: int):
+        self._flush()
+        self.state[self.ids == rule_id] = False
+
+class RuleEngine:
+    def __init__(self):
+        self.rules: Dict[int, AlertRule] = {}
+        self._blocks: Dict[str, _RuleBlock] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def _add(self, symbol: str, subscriber: str, feature: str, direction: int,
+             threshold: float = np.nan, reference: Optional[str] = None) -> int:
+        with self._lock:
+            rule = AlertRule(self._next_id, symbol, subscriber, feature, direction, float(threshold), reference)
+            self._next_id += 1
+            self.rules[rule.rule_id] = rule
+            self._blocks.setdefault(symbol, _RuleBlock()).pending.append(rule)
+            return rule.rule_id
+
+    def add_price_rule(self, symbol: str, subscriber: str, threshold: float, direction: int = BELOW) -> int:
+        return self._add(symbol, subscriber, "price", direction, threshold)
+
+    def add_change_rule(self, symbol: str, subscriber: str, interval: str, threshold_pct: float,
+                        direction: int = ABOVE) -> int:
+        return self._add(symbol, subscriber, f"change_{interval}", direction, threshold_pct)
+
+    def add_crossover_rule(self, symbol: str, subscriber: str, fast: int, slow: int, direction: int = ABOVE) -> int:
+        return self._add(symbol, subscriber, f"MA_{fast}", direction, reference=f"MA_{slow}")
+
+    def remove(self, rule_id: int):
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return
+            block = self._blocks[rule.symbol]
+            pending = [r for r in block.pending if r.rule_id != rule_id]
+            if len(pending) == len(block.pending):
+                block.removed.add(rule_id)
+            block.pending = pending
+
+    def rearm(self, rule_id: int):
+        # Lets a rule fire again on the next evaluation its condition holds,
+        # e.g. when the alert it fired could not be delivered
+        with self._lock:
+            rule = self.rules.get(rule_id)
+            if rule is not None:
+                self._blocks[rule.symbol].rearm(rule_id)
+
+    def required_features(self, symbol: str) -> Set[str]:
+        with self._lock:
+            block = self._blocks.get(symbol)
+            if block is None:
+                return set()
+            block._flush()
+            used = np.union1d(block.feature, block.reference[block.reference >= 0])
+            return {FEATURES[i] for i in used}
+
+    def evaluate(self, symbol: str, features: Dict[str, float]) -> List[AlertRule]:
+        values = np.full(len(FEATURES), np.nan)
+        for name, value in features.items():
+            if name in FEATURE_INDEX and value is not None:
+                values[FEATURE_INDEX[name]] = value
+        with self._lock:
+            block = self._blocks.get(symbol)
+            if block is None or len(block) == 0:
+                return []
+            fired = block.evaluate(values)
+            return [self.rules[rule_id] for rule_id in fired.tolist()]
+
+def get_alert_features(client: BinanceAPI, symbol: str, df: pd.DataFrame, required: Set[str]) -> Dict[str, float]:
+    # Only what at least one rule of the symbol looks at is computed, price
+    # changes being the ones that cost a request.
+    features = {"price": float(df['close'].iloc[-1])}
+    for name in required:
+        if name.startswith("MA_") and name in df.columns:
+            features[name] = float(df[name].iloc[-1])
+        elif name.startswith("change_"):
+            features[name] = get_price_change_for_interval(client, symbol, name[len("change_"):])
+    return features
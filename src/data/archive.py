@@ -0,0 +1,255 @@
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from src.data.kline_decoder import KLINE_COLUMNS, KLINE_DTYPE, timestamp_index
+from src.utils.metrics import timed
+import config
+
+logger = logging.getLogger(__name__)
+
+# Columnar archive of closed candles, one directory per symbol, interval and
+# UTC day, readable by any Parquet/Arrow tool:
+#
+#   ARCHIVE_DIR/symbol=BTCUSDT/interval=1m/date=2024-01-05/part-0.parquet
+#
+# Reads only open the day directories overlapping the requested range, and
+# within those Parquet row groups are skipped from their open_time
+# statistics, so a one-month slice of a multi-year archive touches about a
+# month of data. Only the requested columns are decoded. Arrow IPC files
+# ("arrow" format) are faster to decode but carry no statistics, so they are
+# only pruned by day.
+
+DAY_MS = 86_400_000
+FORMATS = ["parquet", "arrow"]
+
+ARCHIVE_SCHEMA = pa.schema([(name, pa.from_numpy_dtype(np.dtype(dtype))) for name, dtype in KLINE_COLUMNS])
+
+def _day(ts: int) -> str:
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+def _series_path(root: str, symbol: str, interval: str) -> str:
+    return os.path.join(root, f"symbol={symbol.upper()}", f"interval={interval}")
+
+def _as_rows(data: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+    # fetch_candlesticks frames (timestamp index, moving averages) or raw
+    # kline arrays; only the kline columns are archived
+    if isinstance(data, np.ndarray):
+        return data
+    rows = np.empty(len(data), dtype=KLINE_DTYPE)
+    rows["open_time"] = data.index.values.astype("datetime64[ms]").view("i8")
+    for name, _ in KLINE_COLUMNS[1:]:
+        rows[name] = data[name].to_numpy()
+    return rows
+
+def _day_files(root: str, symbol: str, interval: str, start_ts: Optional[int], end_ts: Optional[int]) -> List[str]:
+    # Partition pruning by directory name, before anything is opened
+    base = _series_path(root, symbol, interval)
+    try:
+        days = sorted(name for name in os.listdir(base) if name.startswith("date=") and not name.endswith(".tmp"))
+    except FileNotFoundError:
+        return []
+    first = f"date={_day(start_ts)}" if start_ts is not None else None
+    last = f"date={_day(end_ts)}" if end_ts is not None else None
+    files = []
+    for day in days:
+        if (first and day < first) or (last and day > last):
+            continue
+        path = os.path.join(base, day)
+        files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if not name.startswith("."))
+    return files
+
+def _format_of(path: str) -> str:
+    return "arrow" if path.endswith(".arrow") else "parquet"
+
+def scan_klines(
+    symbol: str,
+    interval: str,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+    root: Optional[str] = None
+) -> ds.Scanner:
+    # Lazy scan of the candles opened within [start_ts, end_ts]: nothing is
+    # read until the scanner's batches or table are asked for
+    root = root or config.ARCHIVE_DIR
+    files = _day_files(root, symbol, interval, start_ts, end_ts)
+    by_format = {}
+    for path in files:
+        by_format.setdefault(_format_of(path), []).append(path)
+    if len(by_format) > 1:
+        # Days exported in different formats
+        dataset = ds.dataset([ds.dataset(paths, schema=ARCHIVE_SCHEMA, format=f) for f, paths in by_format.items()])
+    else:
+        format, paths = next(iter(by_format.items()), ("parquet", []))
+        dataset = ds.dataset(paths, schema=ARCHIVE_SCHEMA, format=format)
+    predicate = None
+    if start_ts is not None:
+        predicate = ds.field("open_time") >= start_ts
+    if end_ts is not None:
+        upper = ds.field("open_time") <= end_ts
+        predicate = upper if predicate is None else predicate & upper
+    return dataset.scanner(columns=list(columns) if columns else None, filter=predicate)
+
+def iter_klines(
+    symbol: str,
+    interval: str,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+    root: Optional[str] = None
+) -> Iterator[pa.RecordBatch]:
+    # Batch by batch, for exports larger than memory
+    yield from scan_klines(symbol, interval, start_ts, end_ts, columns, root).to_batches()
+
+@timed()
+def read_klines(
+    symbol: str,
+    interval: str,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    columns: Optional[Sequence[str]] = None,
+    root: Optional[str] = None
+) -> pd.DataFrame:
+    # Same layout as klines_frame (timestamp index), restricted to `columns`
+    wanted = [name for name in (columns or [name for name, _ in KLINE_COLUMNS[1:]]) if name != "open_time"]
+    table = scan_klines(symbol, interval, start_ts, end_ts, ["open_time"] + wanted, root).to_table()
+    order = np.argsort(table.column("open_time").to_numpy(), kind="stable")
+    index = timestamp_index(table.column("open_time").to_numpy()[order])
+    return pd.DataFrame({name: table.column(name).to_numpy()[order] for name in wanted}, index=index)
+
+def read_kline_array(
+    symbol: str,
+    interval: str,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    root: Optional[str] = None
+) -> np.ndarray:
+    table = scan_klines(symbol, interval, start_ts, end_ts, root=root).to_table()
+    rows = np.empty(table.num_rows, dtype=KLINE_DTYPE)
+    for name, _ in KLINE_COLUMNS:
+        rows[name] = table.column(name).to_numpy()
+    return np.sort(rows, order="open_time")
+
+@timed()
+def write_klines(
+    data: Union[np.ndarray, pd.DataFrame],
+    symbol: str,
+    interval: str,
+    root: Optional[str] = None,
+    format: Optional[str] = None
+) -> int:
+    # Rows are merged into the days already archived (rows being written win
+    # on equal open_time), and each touched day is rewritten as one file.
+    root = root or config.ARCHIVE_DIR
+    format = format or config.ARCHIVE_FORMAT
+    if format not in FORMATS:
+        raise ValueError(f"Unknown archive format {format!r}, expected one of {FORMATS}")
+    rows = _as_rows(data)
+    if len(rows) == 0:
+        return 0
+    rows = np.sort(rows, order="open_time")
+
+    first_day = int(rows["open_time"][0]) // DAY_MS * DAY_MS
+    last_day = int(rows["open_time"][-1]) // DAY_MS * DAY_MS
+    existing = read_kline_array(symbol, interval, first_day, last_day + DAY_MS - 1, root)
+    if len(existing):
+        merged = np.concatenate([rows, existing])
+        _, keep = np.unique(merged["open_time"], return_index=True)
+        rows = merged[keep]
+
+    base = _series_path(root, symbol, interval)
+    if format == "parquet":
+        file_format = ds.ParquetFileFormat()
+        file_options = file_format.make_write_options(compression=config.ARCHIVE_COMPRESSION)
+    else:
+        file_format = ds.IpcFileFormat()
+        file_options = None
+    bounds = np.flatnonzero(np.diff(rows["open_time"] // DAY_MS)) + 1
+    for part in np.split(rows, bounds):
+        day_path = os.path.join(base, f"date={_day(int(part['open_time'][0]))}")
+        table = pa.table({name: part[name] for name, _ in KLINE_COLUMNS}, schema=ARCHIVE_SCHEMA)
+        tmp_path = day_path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        ds.write_dataset(
+            table,
+            tmp_path,
+            format=file_format,
+            file_options=file_options,
+            basename_template=f"part-{{i}}.{format}",
+            max_rows_per_group=config.ARCHIVE_ROW_GROUP_SIZE,
+            min_rows_per_group=min(config.ARCHIVE_ROW_GROUP_SIZE, len(part))
+        )
+        # Readers see either the old day or the new one, never a mix
+        shutil.rmtree(day_path, ignore_errors=True)
+        os.replace(tmp_path, day_path)
+    return len(rows)
+
+def main(argv=None):
+    # python -m src.data.archive export --symbols BTCUSDT,ETHUSDT --interval 1m --days 365
+    # python -m src.data.archive import --symbols BTCUSDT --interval 1m
+    # python -m src.data.archive read --symbols BTCUSDT --interval 1m --start 2024-01-01 --end 2024-02-01 --columns close,volume
+    import argparse
+    import time
+    from src.api.binance_client import BinanceAPI
+    from src.api.local_client import LocalStoreClient
+    from src.data.kline_store import get_kline_store
+    from src.data.market_data import fetch_kline_array
+
+    def timestamp(text: Optional[str]) -> Optional[int]:
+        if not text:
+            return None
+        return int(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+    parser = argparse.ArgumentParser(description="Export candles to, or import them from, the columnar archive")
+    parser.add_argument("command", choices=["export", "import", "read"])
+    parser.add_argument("--symbols", default=",".join(config.DEFAULT_SYMBOLS))
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--days", type=int, default=365, help="history to export")
+    parser.add_argument("--start", help="YYYY-MM-DD (UTC), import/read only")
+    parser.add_argument("--end", help="YYYY-MM-DD (UTC), import/read only")
+    parser.add_argument("--columns", help="comma separated, read only")
+    parser.add_argument("--format", choices=FORMATS, default=config.ARCHIVE_FORMAT)
+    parser.add_argument("--root", default=config.ARCHIVE_DIR)
+    parser.add_argument("--fetch", action="store_true", help="bring the store up to date from Binance before exporting")
+    args = parser.parse_args(argv)
+
+    start_ts, end_ts = timestamp(args.start), timestamp(args.end)
+    for symbol in args.symbols.split(","):
+        started = time.perf_counter()
+        if args.command == "export":
+            client = BinanceAPI() if args.fetch else LocalStoreClient()
+            now_ts = int(time.time() * 1000)
+            rows = fetch_kline_array(client, symbol, args.interval, now_ts - args.days * DAY_MS, now_ts)
+            if rows is None or len(rows) == 0:
+                print(f"{symbol}: no stored {args.interval} candles")
+                continue
+            # The still-open candle is left out, it changes until it closes
+            written = write_klines(rows[rows["close_time"] < now_ts], symbol, args.interval, args.root, args.format)
+            print(f"{symbol}: {written} candles exported in {time.perf_counter() - started:.2f}s")
+        elif args.command == "import":
+            # Into the local store, before its first or after its last candle
+            # (gaps in between are not filled); fetches then only request
+            # what neither covers
+            rows = read_kline_array(symbol, args.interval, start_ts, end_ts, args.root)
+            store = get_kline_store(symbol, args.interval)
+            with store.lock:
+                store.refresh()
+                added = store.prepend(rows) + store.append(rows)
+                if len(rows) and added:
+                    store.mark_covered_from(int(rows["open_time"][0]))
+            print(f"{symbol}: {added} of {len(rows)} archived candles added to the store")
+        else:
+            columns = args.columns.split(",") if args.columns else None
+            df = read_klines(symbol, args.interval, start_ts, end_ts, columns, args.root)
+            print(f"{symbol}: {len(df)} candles in {time.perf_counter() - started:.3f}s")
+            print(df.tail().to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from src.api.binance_client import BinanceAPI
+from src.data.kline_decoder import KLINE_DTYPE
+from src.data.kline_store import INTERVAL_MS
+import config
+
+logger = logging.getLogger(__name__)
+
+# Splits [start_ts, end_ts] into one-page chunks and fetches them with bounded
+# concurrency; the scheduler behind BinanceAPI keeps the pace within the
+# rate limit. Every chunk owns a fixed slot of one preallocated buffer, so
+# pieces can land in any order and are compacted in place as soon as all
+# chunks before them have arrived.
+#
+# A job can be run again after an interruption or failed chunks and only
+# fetches what is missing. Only the contiguous prefix of finished chunks is
+# ever handed out, so callers never see a hole in the series.
+class BackfillJob:
+    def __init__(
+        self,
+        client: BinanceAPI,
+        symbol: str,
+        interval: str,
+        start_ts: int,
+        end_ts: int,
+        chunk_size: int = 1000,
+        max_workers: Optional[int] = None
+    ):
+        self.client = client
+        self.symbol = symbol
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or config.BACKFILL_WORKERS
+        step = INTERVAL_MS[interval] * chunk_size
+        self.chunks: List[Tuple[int, int]] = [
+            (chunk_start, min(chunk_start + step - 1, end_ts))
+            for chunk_start in range(start_ts, end_ts + 1, step)
+        ]
+        self.buffer = np.empty(len(self.chunks) * chunk_size, dtype=KLINE_DTYPE)
+        self.counts = np.zeros(len(self.chunks), dtype=np.int64)
+        self.done = np.zeros(len(self.chunks), dtype=bool)
+        self._compacted = 0
+        self._write = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def completed(self) -> int:
+        return int(self.done.sum())
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.done.all())
+
+    def _prefix_length(self) -> int:
+        pending = np.flatnonzero(~self.done)
+        return int(pending[0]) if len(pending) else self.total
+
+    def _fetch_chunk(self, i: int) -> bool:
+        chunk_start, chunk_end = self.chunks[i]
+        arr = self.client.get_klines_array(self.symbol, self.interval, chunk_start, chunk_end, self.chunk_size)
+        if arr is None:
+            return False
+        arr = arr[:self.chunk_size]
+        offset = i * self.chunk_size
+        self.buffer[offset:offset + len(arr)] = arr
+        self.counts[i] = len(arr)
+        return True
+
+    def _compact(self, last: int) -> np.ndarray:
+        # Moves finished chunks up to `last` to the front of the buffer in
+        # order, skipping candles that overlap the previous chunk, and
+        # returns the newly compacted rows.
+        first_row = self._write
+        for i in range(self._compacted, last):
+            read = i * self.chunk_size
+            count = int(self.counts[i])
+            skip = 0
+            if self._write:
+                last_open_time = self.buffer["open_time"][self._write - 1]
+                skip = int(np.searchsorted(self.buffer["open_time"][read:read + count], last_open_time, side="right"))
+            kept = count - skip
+            if read + skip != self._write:
+                self.buffer[self._write:self._write + kept] = self.buffer[read + skip:read + count]
+            self._write += kept
+        self._compacted = max(self._compacted, last)
+        return self.buffer[first_row:self._write]
+
+    def run(
+        self,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_rows: Optional[Callable[[np.ndarray], None]] = None
+    ) -> np.ndarray:
+        pending = np.flatnonzero(~self.done)
+        if len(pending):
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="backfill") as executor:
+                futures = {executor.submit(self._fetch_chunk, int(i)): int(i) for i in pending}
+                for future in as_completed(futures):
+                    if future.result():
+                        self.done[futures[future]] = True
+                    if on_progress is not None:
+                        on_progress(self.completed, self.total)
+                    prefix = self._prefix_length()
+                    if prefix > self._compacted:
+                        rows = self._compact(prefix)
+                        if on_rows is not None and len(rows):
+                            on_rows(rows)
+
+        if not self.complete:
+            logger.warning(
+                f"Backfill for {self.symbol} at {self.interval} incomplete: {self.completed}/{self.total} chunks"
+            )
+        self._compact(self._prefix_length())
+        return self.buffer[:self._write]
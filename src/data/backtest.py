@@ -0,0 +1,273 @@
+import itertools
+import logging
+from concurrent.futures import Executor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from src.data.kline_decoder import timestamp_index
+from src.data.kline_store import INTERVAL_MS
+from src.data.market_data import DAY_MS
+from src.utils.metrics import timed
+from src.utils.parallel import ArraySpec, SharedArrays, attached, get_process_pool
+import config
+
+logger = logging.getLogger(__name__)
+
+# Backtests over kline arrays. A strategy maps the close series to the
+# position held after each close (1 long, -1 short, 0 flat, fractions allowed)
+# in one vectorized pass; positions take effect on the next candle, so a
+# signal never trades on the close that produced it. Every position change
+# pays fee + slippage (fractions of the traded notional).
+#
+# Custom strategies are plain functions strategy(close, **params) -> positions.
+# For sweeps they must be importable (defined at module level), since they
+# run in worker processes.
+
+STATS = ["total_return", "annual_return", "volatility", "sharpe", "max_drawdown", "trades", "exposure", "costs"]
+
+class BacktestResult(NamedTuple):
+    positions: np.ndarray
+    returns: np.ndarray     # per candle, after costs
+    equity: pd.Series
+    drawdown: pd.Series
+    trades: pd.DataFrame
+    stats: Dict[str, float]
+
+# Prefix sums and candle returns of the last close series seen; a sweep asks
+# for them once per parameter set
+_series_cache: Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]] = (None, None, None)
+
+def _prepared(close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    global _series_cache
+    cached, prefix, candle_returns = _series_cache
+    if cached is not close:
+        # Sums relative to the first close keep window differences accurate
+        # over millions of candles
+        prefix = np.empty(len(close) + 1)
+        prefix[0] = 0.0
+        np.cumsum(close - close[0], out=prefix[1:])
+        candle_returns = np.empty(len(close))
+        candle_returns[:1] = 0.0
+        np.divide(close[1:], close[:-1], out=candle_returns[1:])
+        candle_returns[1:] -= 1
+        _series_cache = (close, prefix, candle_returns)
+    return prefix, candle_returns
+
+def sma(close: np.ndarray, period: int) -> np.ndarray:
+    prefix, _ = _prepared(close)
+    n = len(close)
+    values = np.full(n, np.nan)
+    if period <= n:
+        values[period - 1:] = (prefix[period:] - prefix[:n + 1 - period]) / period + close[0]
+    return values
+
+def ma_crossover(close: np.ndarray, fast: int = 20, slow: int = 50, allow_short: bool = False) -> np.ndarray:
+    # Long while the fast SMA is above the slow one, short (or flat) below.
+    # Window sums are compared directly: fast_sum / fast > slow_sum / slow.
+    prefix, _ = _prepared(close)
+    n = len(close)
+    start = max(fast, slow)
+    positions = np.zeros(n)
+    if start <= n:
+        fast_sum = prefix[start:] - prefix[start - fast:n + 1 - fast]
+        slow_sum = prefix[start:] - prefix[start - slow:n + 1 - slow]
+        above = fast_sum * slow > slow_sum * fast
+        positions[start - 1:] = 2.0 * above - 1.0 if allow_short else above
+    return positions
+
+def periods_per_year(interval: str) -> float:
+    return 365 * DAY_MS / INTERVAL_MS[interval]
+
+def strategy_returns(close: np.ndarray, positions: np.ndarray, cost: float) -> Tuple[np.ndarray, np.ndarray]:
+    # Per-candle returns after costs, and the turnover they were charged for
+    _, candle_returns = _prepared(close)
+    turnover = np.abs(np.diff(positions, prepend=0.0))
+    returns = np.empty(len(close))
+    returns[:1] = 0.0
+    np.multiply(positions[:-1], candle_returns[1:], out=returns[1:])
+    returns -= turnover * cost
+    return returns, turnover
+
+def summarize(returns: np.ndarray, positions: np.ndarray, turnover: np.ndarray, cost: float, annualization: float) -> np.ndarray:
+    # STATS for one run, as an array so sweeps can store them column-wise
+    if len(returns) == 0:
+        return np.array([0.0, np.nan, np.nan, np.nan, 0.0, 0, 0.0, 0.0])
+    equity = np.cumprod(returns + 1)
+    drawdown = (equity / np.maximum.accumulate(equity)).min() - 1
+    total = equity[-1] - 1
+    std = returns.std(ddof=1) if len(returns) > 1 else np.nan
+    years = len(returns) / annualization
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        return np.array([
+            total,
+            (1 + total) ** (1 / years) - 1 if total > -1 else -1.0,
+            std * np.sqrt(annualization),
+            returns.mean() / std * np.sqrt(annualization) if std > 0 else np.nan,
+            drawdown,
+            np.count_nonzero(positions[np.flatnonzero(turnover)]),
+            np.count_nonzero(positions) / len(positions),
+            turnover.sum() * cost
+        ])
+
+def trade_list(times: np.ndarray, close: np.ndarray, positions: np.ndarray, fee: float, slippage: float) -> pd.DataFrame:
+    # One row per run of a constant non-zero position, entered and exited at
+    # the close of the candles where the position changes; the last trade
+    # may still be open.
+    changes = np.flatnonzero(np.diff(positions, prepend=0.0) != 0)
+    entries = changes[positions[changes] != 0]
+    following = np.searchsorted(changes, entries, side="right")
+    is_open = following >= len(changes)
+    exits = np.where(is_open, len(close) - 1, changes[np.minimum(following, len(changes) - 1)] if len(changes) else 0)
+    size = positions[entries]
+    direction = np.sign(size)
+    entry_price = close[entries] * (1 + direction * slippage)
+    exit_price = close[exits] * (1 - direction * slippage)
+    gross = direction * (exit_price / entry_price - 1)
+    return pd.DataFrame({
+        'entry_time': pd.to_datetime(times[entries], unit='ms'),
+        'exit_time': pd.to_datetime(times[exits], unit='ms'),
+        'position': size,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'return': np.abs(size) * (gross - 2 * fee),
+        'candles': exits - entries,
+        'open': is_open
+    })
+
+@timed()
+def backtest(
+    rows: np.ndarray,
+    strategy: Callable[..., np.ndarray] = ma_crossover,
+    interval: str = "1h",
+    fee: float = config.BACKTEST_FEE,
+    slippage: float = config.BACKTEST_SLIPPAGE,
+    **params
+) -> BacktestResult:
+    close = np.ascontiguousarray(rows["close"], dtype=np.float64)
+    positions = np.asarray(strategy(close, **params), dtype=np.float64)
+    returns, turnover = strategy_returns(close, positions, fee + slippage)
+    index = timestamp_index(rows["open_time"])
+    equity = pd.Series(np.cumprod(1 + returns), index=index, name="equity")
+    annualization = periods_per_year(interval)
+    return BacktestResult(
+        positions,
+        returns,
+        equity,
+        equity / equity.cummax() - 1,
+        trade_list(rows["open_time"], close, positions, fee, slippage),
+        dict(zip(STATS, summarize(returns, positions, turnover, fee + slippage, annualization).tolist()))
+    )
+
+def _run_grid(close: np.ndarray, strategy, grid: List[Dict[str, Any]], cost: float, annualization: float) -> np.ndarray:
+    out = np.empty((len(grid), len(STATS)))
+    for i, params in enumerate(grid):
+        positions = np.asarray(strategy(close, **params), dtype=np.float64)
+        returns, turnover = strategy_returns(close, positions, cost)
+        out[i] = summarize(returns, positions, turnover, cost, annualization)
+    return out
+
+def _sweep_task(close_spec: ArraySpec, out_spec: ArraySpec, strategy, grid, offset: int, cost: float, annualization: float):
+    with attached(close_spec, out_spec) as (close, out):
+        out[offset:offset + len(grid)] = _run_grid(close, strategy, grid, cost, annualization)
+
+def parameter_grid(**values: Sequence) -> List[Dict[str, Any]]:
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+@timed()
+def sweep(
+    rows: np.ndarray,
+    grid: List[Dict[str, Any]],
+    strategy: Callable[..., np.ndarray] = ma_crossover,
+    interval: str = "1h",
+    fee: float = config.BACKTEST_FEE,
+    slippage: float = config.BACKTEST_SLIPPAGE,
+    workers: int = config.ANALYTICS_WORKERS,
+    pool: Optional[Executor] = None,
+    chunk: int = 16
+) -> pd.DataFrame:
+    # STATS for every parameter set in `grid`, one row each. Chunks of the
+    # grid run on the process pool against the close series in shared memory.
+    close = np.ascontiguousarray(rows["close"], dtype=np.float64)
+    cost = fee + slippage
+    annualization = periods_per_year(interval)
+    chunks = [(i, grid[i:i + chunk]) for i in range(0, len(grid), chunk)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        stats = _run_grid(close, strategy, grid, cost, annualization)
+    else:
+        pool = pool or get_process_pool()
+        with SharedArrays() as shared:
+            _, close_spec = shared.share(close)
+            shared_stats, stats_spec = shared.create((len(grid), len(STATS)), np.float64, fill=np.nan)
+            futures = [
+                pool.submit(_sweep_task, close_spec, stats_spec, strategy, part, offset, cost, annualization)
+                for offset, part in chunks
+            ]
+            wait(futures)
+            for future in futures:
+                future.result()
+            stats = shared_stats.copy()
+            del shared_stats
+
+    return pd.concat([pd.DataFrame(grid), pd.DataFrame(stats, columns=STATS)], axis=1)
+
+def main(argv=None):
+    # python -m src.data.backtest --symbol BTCUSDT --interval 1h --days 365 --fast 20 --slow 50
+    # python -m src.data.backtest --sweep --fast 5:100:5 --slow 20:300:10
+    import argparse
+    import time
+    from src.api.binance_client import BinanceAPI
+    from src.api.local_client import LocalStoreClient
+    from src.data.market_data import fetch_kline_array
+
+    def values(text: str) -> List[int]:
+        if ":" in text:
+            start, stop, step = (int(part) for part in text.split(":"))
+            return list(range(start, stop + 1, step))
+        return [int(part) for part in text.split(",")]
+
+    parser = argparse.ArgumentParser(description="Backtest MA crossovers over stored candles")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--interval", default="1h")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--fast", default="20", help="period, list (5,10) or range (5:100:5)")
+    parser.add_argument("--slow", default="50")
+    parser.add_argument("--short", action="store_true", help="short below the slow MA instead of going flat")
+    parser.add_argument("--fee", type=float, default=config.BACKTEST_FEE)
+    parser.add_argument("--slippage", type=float, default=config.BACKTEST_SLIPPAGE)
+    parser.add_argument("--sweep", action="store_true")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--fetch", action="store_true", help="bring the store up to date from Binance first")
+    args = parser.parse_args(argv)
+
+    client = BinanceAPI() if args.fetch else LocalStoreClient()
+    end_ts = int(time.time() * 1000)
+    rows = fetch_kline_array(client, args.symbol, args.interval, end_ts - args.days * DAY_MS, end_ts)
+    if rows is None or len(rows) == 0:
+        print(f"No stored {args.interval} candles for {args.symbol}, run with --fetch or start the collector")
+        return
+
+    if args.sweep:
+        grid = [
+            params for params in parameter_grid(fast=values(args.fast), slow=values(args.slow), allow_short=[args.short])
+            if params["fast"] < params["slow"]
+        ]
+        started = time.perf_counter()
+        results = sweep(rows, grid, interval=args.interval, fee=args.fee, slippage=args.slippage)
+        elapsed = time.perf_counter() - started
+        print(f"{len(grid)} parameter sets over {len(rows)} candles in {elapsed:.1f}s")
+        print(results.sort_values("sharpe", ascending=False).head(args.top).to_string(index=False))
+        return
+
+    result = backtest(
+        rows, ma_crossover, args.interval, args.fee, args.slippage,
+        fast=values(args.fast)[0], slow=values(args.slow)[0], allow_short=args.short
+    )
+    for name, value in result.stats.items():
+        print(f"{name:>14}: {value:.4f}")
+    print(result.trades.tail(args.top).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
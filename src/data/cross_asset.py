@@ -0,0 +1,209 @@
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from src.api.binance_client import BinanceAPI
+from src.data.kline_decoder import timestamp_index
+from src.data.kline_store import INTERVAL_MS
+from src.data.market_data import fetch_kline_array
+from src.utils.metrics import timed
+from src.utils.parallel import ArraySpec, SharedArrays, attached, get_process_pool
+import config
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_SYMBOL = "BTCUSDT"
+YEAR_MS = 365 * 86_400_000
+
+# Upper bound on the window data one correlation block stacks at once
+BLOCK_BYTES = 32 * 1024 * 1024
+# Symbols per beta/volatility block
+COLUMN_BLOCK = 32
+# Smaller inputs (candles x symbols) are not worth starting the pool for
+PARALLEL_MIN_CELLS = 500_000
+
+class CloseMatrix(NamedTuple):
+    interval: str
+    times: np.ndarray       # open_time (ms) of every row
+    symbols: List[str]
+    closes: np.ndarray      # (times, symbols), NaN where a symbol has no candle
+
+class CrossAssetStats(NamedTuple):
+    symbols: List[str]
+    correlation_times: np.ndarray   # open_time of the last candle of each window
+    correlation: np.ndarray         # (windows, symbols, symbols)
+    beta: pd.DataFrame              # rolling beta against the benchmark symbol
+    volatility: pd.DataFrame        # rolling annualized volatility of log returns
+
+def align_closes(series: Dict[str, np.ndarray], interval: str) -> CloseMatrix:
+    # The shared index is the union of every symbol's candles, so a symbol
+    # listed later or missing candles shows up as NaN rather than shifting
+    # the others.
+    symbols = [symbol for symbol, rows in series.items() if len(rows)]
+    if not symbols:
+        return CloseMatrix(interval, np.empty(0, dtype=np.int64), [], np.empty((0, 0)))
+    times = np.unique(np.concatenate([series[symbol]["open_time"] for symbol in symbols]))
+    closes = np.full((len(times), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        rows = series[symbol]
+        closes[np.searchsorted(times, rows["open_time"]), j] = rows["close"]
+    return CloseMatrix(interval, times, symbols, closes)
+
+@timed()
+def load_closes(
+    client: BinanceAPI,
+    symbols: List[str],
+    interval: str,
+    start_ts: int,
+    end_ts: int,
+    max_workers: int = config.BACKFILL_WORKERS,
+    native: bool = False
+) -> CloseMatrix:
+    def load(symbol: str):
+        rows = fetch_kline_array(client, symbol, interval, start_ts, end_ts, native=native)
+        return symbol, rows if rows is not None else np.empty(0)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cross-asset") as executor:
+        series = dict(executor.map(load, symbols))
+    return align_closes(series, interval)
+
+def correlation_block(returns: np.ndarray, window: int, ends: np.ndarray) -> np.ndarray:
+    # Correlation matrices of the windows ending at rows `ends`, as one
+    # batched matrix product. A symbol with any gap in a window gets NaN
+    # correlations for that window.
+    x = sliding_window_view(returns, window, axis=0)[ends - window + 1]
+    valid = ~np.isnan(x).any(axis=2)
+    x = x - x.mean(axis=2, keepdims=True)
+    x[~valid] = 0.0
+    cov = x @ x.transpose(0, 2, 1)
+    std = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / (std[:, :, None] * std[:, None, :])
+    corr[~(valid[:, :, None] & valid[:, None, :])] = np.nan
+    return corr
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    total = np.cumsum(x, axis=0)
+    out = np.full_like(total, np.nan)
+    if len(x) >= window:
+        out[window - 1] = total[window - 1]
+        out[window:] = total[window:] - total[:-window]
+    return out
+
+def beta_volatility_block(returns: np.ndarray, benchmark: Optional[np.ndarray], window: int, periods_per_year: float):
+    # Rolling moments from cumulative sums, O(rows) per symbol whatever the
+    # window. Columns are demeaned first to keep the differences of the
+    # cumulative sums accurate. Only complete windows get a value.
+    valid = ~np.isnan(returns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / valid.sum(axis=0)
+    x = np.where(valid, returns - mean, 0.0)
+    complete = _rolling_sum(valid.astype(np.float64), window) == window
+    sum_x = _rolling_sum(x, window)
+    var_x = (_rolling_sum(x * x, window) - sum_x ** 2 / window) / (window - 1)
+    volatility = np.where(complete, np.sqrt(np.maximum(var_x, 0.0) * periods_per_year), np.nan)
+
+    if benchmark is None:
+        return np.full_like(volatility, np.nan), volatility
+    benchmark_valid = ~np.isnan(benchmark)
+    y = np.where(benchmark_valid, benchmark - benchmark[benchmark_valid].mean(), 0.0)[:, None]
+    complete &= (_rolling_sum(benchmark_valid.astype(np.float64), window) == window)[:, None]
+    sum_y = _rolling_sum(y, window)
+    cov = _rolling_sum(x * y, window) - sum_x * sum_y / window
+    var_y = _rolling_sum(y * y, window) - sum_y ** 2 / window
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = np.where(complete, cov / var_y, np.nan)
+    return beta, volatility
+
+def _correlation_task(returns_spec: ArraySpec, out_spec: ArraySpec, window: int, ends: np.ndarray, offset: int):
+    with attached(returns_spec, out_spec) as (returns, out):
+        out[offset:offset + len(ends)] = correlation_block(returns, window, ends)
+
+def _beta_volatility_task(
+    returns_spec: ArraySpec,
+    beta_spec: ArraySpec,
+    volatility_spec: ArraySpec,
+    start: int,
+    stop: int,
+    benchmark_column: Optional[int],
+    window: int,
+    periods_per_year: float
+):
+    with attached(returns_spec, beta_spec, volatility_spec) as (returns, beta, volatility):
+        benchmark = returns[:, benchmark_column] if benchmark_column is not None else None
+        beta[:, start:stop], volatility[:, start:stop] = beta_volatility_block(
+            returns[:, start:stop], benchmark, window, periods_per_year
+        )
+
+@timed()
+def cross_asset_stats(
+    closes: CloseMatrix,
+    window: int = config.CROSS_ASSET_WINDOW,
+    step: int = 24,
+    benchmark: str = BENCHMARK_SYMBOL,
+    workers: int = config.ANALYTICS_WORKERS,
+    pool: Optional[Executor] = None
+) -> CrossAssetStats:
+    # Correlation matrices every `step` candles over `window` candles of log
+    # returns, plus rolling beta and volatility on every candle. The work is
+    # split into blocks of windows (correlation) and of symbols (beta and
+    # volatility); with more than one worker the blocks run on a process
+    # pool reading the returns from shared memory.
+    returns = np.diff(np.log(closes.closes), axis=0)
+    times = closes.times[1:]
+    rows, columns = returns.shape
+    # The most recent window always ends on the last candle
+    ends = np.arange(rows - 1, window - 2, -step)[::-1] if rows >= window else np.empty(0, dtype=np.int64)
+    benchmark_column = closes.symbols.index(benchmark) if benchmark in closes.symbols else None
+    if benchmark_column is None:
+        logger.warning(f"{benchmark} not among the loaded symbols, beta is unavailable")
+    periods_per_year = YEAR_MS / INTERVAL_MS[closes.interval]
+
+    per_window = columns * window * 8 + 2 * columns * columns * 8
+    block = max(1, BLOCK_BYTES // max(per_window, 1))
+    window_blocks = [(i, ends[i:i + block]) for i in range(0, len(ends), block)]
+    column_blocks = [(i, min(i + COLUMN_BLOCK, columns)) for i in range(0, columns, COLUMN_BLOCK)]
+
+    if workers <= 1 or returns.size < PARALLEL_MIN_CELLS or len(window_blocks) + len(column_blocks) <= 1:
+        correlation = np.empty((len(ends), columns, columns))
+        for offset, block_ends in window_blocks:
+            correlation[offset:offset + len(block_ends)] = correlation_block(returns, window, block_ends)
+        beta, volatility = np.empty_like(returns), np.empty_like(returns)
+        benchmark_returns = returns[:, benchmark_column] if benchmark_column is not None else None
+        for start, stop in column_blocks:
+            beta[:, start:stop], volatility[:, start:stop] = beta_volatility_block(
+                returns[:, start:stop], benchmark_returns, window, periods_per_year
+            )
+    else:
+        pool = pool or get_process_pool()
+        with SharedArrays() as shared:
+            _, returns_spec = shared.share(returns)
+            shared_correlation, correlation_spec = shared.create((len(ends), columns, columns), np.float64)
+            shared_beta, beta_spec = shared.create(returns.shape, np.float64)
+            shared_volatility, volatility_spec = shared.create(returns.shape, np.float64)
+            futures = [
+                pool.submit(_correlation_task, returns_spec, correlation_spec, window, block_ends, offset)
+                for offset, block_ends in window_blocks
+            ] + [
+                pool.submit(_beta_volatility_task, returns_spec, beta_spec, volatility_spec,
+                            start, stop, benchmark_column, window, periods_per_year)
+                for start, stop in column_blocks
+            ]
+            wait(futures)
+            for future in futures:
+                future.result()
+            correlation = shared_correlation.copy()
+            beta, volatility = shared_beta.copy(), shared_volatility.copy()
+            del shared_correlation, shared_beta, shared_volatility
+
+    index = timestamp_index(times)
+    return CrossAssetStats(
+        closes.symbols,
+        times[ends],
+        correlation,
+        pd.DataFrame(beta, index=index, columns=closes.symbols),
+        pd.DataFrame(volatility, index=index, columns=closes.symbols)
+    )
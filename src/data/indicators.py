@@ -0,0 +1,250 @@
+import math
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Streaming technical indicators. Each one keeps O(1) state per update and
+# reproduces the pandas formula it is named after:
+#
+#   SMA             close.rolling(period).mean()
+#   EMA             close.ewm(span=span, adjust=False).mean()
+#   RSI             ewm(alpha=1/period, min_periods=period, adjust=False) of gains/losses
+#   MACD            EMA(fast) - EMA(slow), signal = EMA(signal) of MACD
+#   BollingerBands  SMA +/- num_std * close.rolling(period).std()
+#   VWAP            (typical_price * volume).cumsum() / volume.cumsum()
+#
+# `initialize` computes the whole series in one vectorized pass and leaves
+# the state positioned after the last value. `update` feeds one candle;
+# with closed=False it only previews the value for the still-open candle
+# without committing it, so the open candle can be revised any number of
+# times.
+
+class SMA:
+    inputs = ("close",)
+    outputs = ("",)
+
+    def __init__(self, period: int):
+        self.period = period
+        self._window: deque = deque(maxlen=period)
+        self._sum = 0.0
+        self._compensation = 0.0
+
+    def _add(self, value: float):
+        # Kahan summation keeps the running sum from drifting over
+        # millions of add/remove pairs.
+        y = value - self._compensation
+        t = self._sum + y
+        self._compensation = (t - self._sum) - y
+        self._sum = t
+
+    def initialize(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=float)
+        self._window = deque(values[-self.period:].tolist(), maxlen=self.period)
+        self._sum = math.fsum(self._window)
+        self._compensation = 0.0
+        return pd.Series(values).rolling(window=self.period).mean().to_numpy()
+
+    def update(self, value: float, closed: bool = True) -> float:
+        full = len(self._window) == self.period
+        if not closed:
+            if len(self._window) + (0 if full else 1) < self.period:
+                return math.nan
+            return (self._sum + value - (self._window[0] if full else 0.0)) / self.period
+        if full:
+            self._add(-self._window[0])
+        self._window.append(value)
+        self._add(value)
+        return self._sum / self.period if len(self._window) == self.period else math.nan
+
+class EMA:
+    inputs = ("close",)
+    outputs = ("",)
+
+    def __init__(self, span: Optional[int] = None, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.value: Optional[float] = None
+
+    def initialize(self, values: np.ndarray) -> np.ndarray:
+        result = pd.Series(np.asarray(values, dtype=float)).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()
+        self.value = float(result[-1]) if len(result) else None
+        return result
+
+    def update(self, value: float, closed: bool = True) -> float:
+        new_value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        if closed:
+            self.value = new_value
+        return new_value
+
+class RSI:
+    inputs = ("close",)
+    outputs = ("",)
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.alpha = 1.0 / period
+        self.previous: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+
+    @staticmethod
+    def _rsi(avg_gain: float, avg_loss: float) -> float:
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else math.nan
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def initialize(self, values: np.ndarray) -> np.ndarray:
+        close = pd.Series(np.asarray(values, dtype=float))
+        delta = close.diff()
+        avg_gain = delta.clip(lower=0).ewm(alpha=self.alpha, adjust=False).mean()
+        avg_loss = (-delta.clip(upper=0)).ewm(alpha=self.alpha, adjust=False).mean()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = (100.0 - 100.0 / (1.0 + avg_gain / avg_loss)).to_numpy()
+        result[:self.period] = np.nan
+        self.previous = float(close.iloc[-1]) if len(close) else None
+        self.count = max(len(close) - 1, 0)
+        if self.count:
+            self.avg_gain = float(avg_gain.iloc[-1])
+            self.avg_loss = float(avg_loss.iloc[-1])
+        return result
+
+    def update(self, value: float, closed: bool = True) -> float:
+        if self.previous is None:
+            if closed:
+                self.previous = value
+            return math.nan
+        delta = value - self.previous
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if self.count == 0:
+            avg_gain, avg_loss = gain, loss
+        else:
+            avg_gain = self.avg_gain + self.alpha * (gain - self.avg_gain)
+            avg_loss = self.avg_loss + self.alpha * (loss - self.avg_loss)
+        count = self.count + 1
+        if closed:
+            self.previous, self.avg_gain, self.avg_loss, self.count = value, avg_gain, avg_loss, count
+        return self._rsi(avg_gain, avg_loss) if count >= self.period else math.nan
+
+class MACD:
+    inputs = ("close",)
+    outputs = ("macd", "signal", "hist")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(span=fast)
+        self.slow = EMA(span=slow)
+        self.signal = EMA(span=signal)
+
+    def initialize(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        macd = self.fast.initialize(values) - self.slow.initialize(values)
+        signal = self.signal.initialize(macd)
+        return macd, signal, macd - signal
+
+    def update(self, value: float, closed: bool = True) -> Tuple[float, float, float]:
+        macd = self.fast.update(value, closed) - self.slow.update(value, closed)
+        signal = self.signal.update(macd, closed)
+        return macd, signal, macd - signal
+
+# The window's variance is kept with Welford's update for a sliding window
+# (the entering value replaces the leaving one around the moving mean),
+# which is O(1) per candle and doesn't cancel out like a plain sum of
+# squares.
+class BollingerBands:
+    inputs = ("close",)
+    outputs = ("mid", "upper", "lower")
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        self.period = period
+        self.num_std = num_std
+        self.sma = SMA(period)
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _step(self, value: float) -> Tuple[float, float]:
+        # (mean, m2) of the window with `value` added, and the oldest value
+        # dropped once the window is full
+        window = self.sma._window
+        if len(window) == self.period:
+            oldest = window[0]
+            mean = self._mean + (value - oldest) / self.period
+            m2 = self._m2 + (value - oldest) * (value - mean + oldest - self._mean)
+        else:
+            mean = self._mean + (value - self._mean) / (len(window) + 1)
+            m2 = self._m2 + (value - self._mean) * (value - mean)
+        return mean, max(m2, 0.0)
+
+    def _bands(self, mid: float, m2: float) -> Tuple[float, float, float]:
+        if math.isnan(mid):
+            return mid, mid, mid
+        std = math.sqrt(m2 / (self.period - 1))
+        return mid, mid + self.num_std * std, mid - self.num_std * std
+
+    def initialize(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        values = np.asarray(values, dtype=float)
+        mid = self.sma.initialize(values)
+        window = values[-self.period:]
+        self._mean = float(window.mean()) if len(window) else 0.0
+        self._m2 = float(((window - self._mean) ** 2).sum())
+        std = pd.Series(values).rolling(window=self.period).std().to_numpy()
+        return mid, mid + self.num_std * std, mid - self.num_std * std
+
+    def update(self, value: float, closed: bool = True) -> Tuple[float, float, float]:
+        mean, m2 = self._step(value)
+        mid = self.sma.update(value, closed)
+        if closed:
+            self._mean, self._m2 = mean, m2
+        return self._bands(mid, m2)
+
+class VWAP:
+    inputs = ("high", "low", "close", "volume")
+    outputs = ("",)
+
+    def __init__(self):
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def initialize(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        volume = np.asarray(volume, dtype=float)
+        typical_price = (np.asarray(high, dtype=float) + np.asarray(low, dtype=float) + np.asarray(close, dtype=float)) / 3
+        cumulative_pv = np.cumsum(typical_price * volume)
+        cumulative_volume = np.cumsum(volume)
+        if len(volume):
+            self.price_volume = float(cumulative_pv[-1])
+            self.volume = float(cumulative_volume[-1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return cumulative_pv / cumulative_volume
+
+    def update(self, high: float, low: float, close: float, volume: float, closed: bool = True) -> float:
+        price_volume = self.price_volume + (high + low + close) / 3 * volume
+        total_volume = self.volume + volume
+        if closed:
+            self.price_volume, self.volume = price_volume, total_volume
+        return price_volume / total_volume if total_volume else math.nan
+
+# Runs a named set of indicators over one candle series.
+class IndicatorEngine:
+    def __init__(self, indicators: Dict[str, object]):
+        self.indicators = indicators
+
+    @staticmethod
+    def _columns(name: str, indicator) -> List[str]:
+        return [f"{name}_{output}" if output else name for output in indicator.outputs]
+
+    def initialize(self, df: pd.DataFrame) -> pd.DataFrame:
+        columns = {}
+        for name, indicator in self.indicators.items():
+            result = indicator.initialize(*(df[column].to_numpy() for column in indicator.inputs))
+            if len(indicator.outputs) == 1:
+                result = (result,)
+            columns.update(zip(self._columns(name, indicator), result))
+        return pd.DataFrame(columns, index=df.index)
+
+    def update(self, candle: Dict[str, float], closed: bool = True) -> Dict[str, float]:
+        values = {}
+        for name, indicator in self.indicators.items():
+            result = indicator.update(*(float(candle[column]) for column in indicator.inputs), closed=closed)
+            if len(indicator.outputs) == 1:
+                result = (result,)
+            values.update(zip(self._columns(name, indicator), result))
+        return values
@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from src.data.kline_decoder import KLINE_COLUMNS, KLINE_DTYPE
+import config
+
+logger = logging.getLogger(__name__)
+
+# "1M" has no fixed length, 31 days is used as an upper bound
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 3_600_000,
+    "2h": 2 * 3_600_000,
+    "4h": 4 * 3_600_000,
+    "6h": 6 * 3_600_000,
+    "8h": 8 * 3_600_000,
+    "12h": 12 * 3_600_000,
+    "1d": 86_400_000,
+    "3d": 3 * 86_400_000,
+    "1w": 7 * 86_400_000,
+    "1M": 31 * 86_400_000,
+}
+
+# Append-only columnar storage for one symbol/interval. Every column lives in
+# its own raw little-endian file so it can be memory-mapped directly, and only
+# closed candles are ever written.
+class KlineStore:
+    def __init__(self, root: str, symbol: str, interval: str):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.path = os.path.join(root, self.symbol, interval)
+        self.lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+        self._meta = self._load_meta()
+        self._length = self._complete_rows()
+        self._repaired = False
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self._meta_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self):
+        tmp_path = self._meta_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self._meta_path())
+
+    def _complete_rows(self) -> int:
+        # Rows present in every column. The writer appends one column after
+        # another, so other processes can see columns of unequal length.
+        lengths = []
+        for name, dtype in KLINE_COLUMNS:
+            column_path = self._column_path(name)
+            size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+            lengths.append(size // np.dtype(dtype).itemsize)
+        return min(lengths)
+
+    def _repair(self):
+        # A crash between column writes leaves columns of unequal length.
+        # Before its first write, the writer truncates them all back to the
+        # last complete row; readers never do, it would cut rows out from
+        # under an append in progress.
+        if self._repaired:
+            return
+        self._length = self._complete_rows()
+        for name, dtype in KLINE_COLUMNS:
+            column_path = self._column_path(name)
+            expected = self._length * np.dtype(dtype).itemsize
+            if not os.path.exists(column_path):
+                open(column_path, "wb").close()
+            elif os.path.getsize(column_path) != expected:
+                logger.warning(f"Truncating {column_path} to {self._length} rows")
+                with open(column_path, "r+b") as f:
+                    f.truncate(expected)
+        self._repaired = True
+
+    def refresh(self):
+        # Picks up rows appended by another process (e.g. the collector).
+        with self.lock:
+            self._length = self._complete_rows()
+            self._meta = self._load_meta()
+
+    def write_open(self, rows: np.ndarray):
+        # The still-open candle is kept outside the append-only columns and
+        # replaced wholesale on every update.
+        tmp_path = os.path.join(self.path, "open.tmp.npy")
+        np.save(tmp_path, rows.astype(KLINE_DTYPE))
+        os.replace(tmp_path, os.path.join(self.path, "open.npy"))
+
+    def read_open(self) -> np.ndarray:
+        try:
+            rows = np.load(os.path.join(self.path, "open.npy"))
+        except (OSError, ValueError):
+            return np.empty(0, dtype=KLINE_DTYPE)
+        # The writer may have closed and appended the candle since
+        if self._length:
+            rows = rows[rows["open_time"] > self.last_open_time]
+        return rows
+
+    def column(self, name: str) -> np.ndarray:
+        dtype = dict(KLINE_COLUMNS)[name]
+        if self._length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(self._length,))
+
+    @property
+    def covered_from(self) -> Optional[int]:
+        return self._meta.get("covered_from")
+
+    @property
+    def first_open_time(self) -> Optional[int]:
+        return int(self.column("open_time")[0]) if self._length else None
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        return int(self.column("open_time")[-1]) if self._length else None
+
+    @property
+    def last_close_time(self) -> Optional[int]:
+        return int(self.column("close_time")[-1]) if self._length else None
+
+    def mark_covered_from(self, start_ts: int):
+        with self.lock:
+            if self.covered_from is None or start_ts < self.covered_from:
+                self._meta["covered_from"] = int(start_ts)
+                self._save_meta()
+
+    def _bounds(self, start_ts: Optional[int], end_ts: Optional[int]) -> Tuple[int, int]:
+        open_times = self.column("open_time")
+        lo = int(np.searchsorted(open_times, start_ts, side="left")) if start_ts is not None else 0
+        hi = int(np.searchsorted(open_times, end_ts, side="right")) if end_ts is not None else self._length
+        return lo, hi
+
+    def read(
+        self,
+        start_ts: Optional[int] = None,
+        end_ts: Optional[int] = None,
+        tail: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        # `tail` rows (e.g. the still-open candle) are placed after the stored
+        # ones in the same allocation.
+        with self.lock:
+            lo, hi = self._bounds(start_ts, end_ts)
+            count = max(hi - lo, 0)
+            extra = len(tail) if tail is not None else 0
+            out = np.empty(count + extra, dtype=KLINE_DTYPE)
+            for name, _ in KLINE_COLUMNS:
+                out[name][:count] = self.column(name)[lo:hi]
+            if extra:
+                out[count:] = tail
+            return out
+
+    def append(self, rows: np.ndarray) -> int:
+        with self.lock:
+            self._repair()
+            if self._length:
+                rows = rows[rows["open_time"] > self.last_open_time]
+            if len(rows) == 0:
+                return 0
+            for name, _ in KLINE_COLUMNS:
+                with open(self._column_path(name), "ab") as f:
+                    f.write(np.ascontiguousarray(rows[name]).tobytes())
+            self._length += len(rows)
+            return len(rows)
+
+    def prepend(self, rows: np.ndarray) -> int:
+        # Extending the store backwards cannot be done in place, the columns
+        # are rewritten once and atomically swapped in.
+        with self.lock:
+            self._repair()
+            if self._length:
+                rows = rows[rows["open_time"] < self.first_open_time]
+            if len(rows) == 0:
+                return 0
+            for name, _ in KLINE_COLUMNS:
+                with open(self._column_path(name) + ".tmp", "wb") as f:
+                    f.write(np.ascontiguousarray(rows[name]).tobytes())
+                    f.write(np.ascontiguousarray(self.column(name)).tobytes())
+            for name, _ in KLINE_COLUMNS:
+                os.replace(self._column_path(name) + ".tmp", self._column_path(name))
+            self._length += len(rows)
+            return len(rows)
+
+_stores: Dict[Tuple[str, str, str], KlineStore] = {}
+_stores_lock = threading.Lock()
+
+def get_kline_store(symbol: str, interval: str, root: Optional[str] = None) -> KlineStore:
+    root = root or config.KLINE_STORE_DIR
+    key = (os.path.abspath(root), symbol.upper(), interval)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = KlineStore(root, symbol, interval)
+        return _stores[key]
@@ -1,22 +1,94 @@
+import numpy as np
 import pandas as pd
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any
+from typing import Optional, Callable, Dict, List, Any, Tuple
 import logging
 from src.api.binance_client import BinanceAPI
+from src.data.backfill import BackfillJob
+from src.data.indicators import SMA
+from src.data.kline_decoder import decode_klines, klines_frame
+from src.data.kline_store import INTERVAL_MS, KlineStore, get_kline_store
+from src.data.resample import get_resampler, is_resampled
+from src.utils.metrics import timed
 import config
 
 logger = logging.getLogger(__name__)
 
+DAY_MS = 86_400_000
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="market-data")
+
+# Daily candles shared by every caller of get_market_info for a symbol. The
+# full history is only downloaded once, afterwards each refresh pulls the
+# last two candles and folds newly closed ones into a running max.
+class _DailySeries:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.closed_closes: deque = deque(maxlen=7)
+        self.closed_high_max = float("-inf")
+        self.last_closed_open_time: Optional[int] = None
+        self.open_close: Optional[float] = None
+        self.open_high = float("-inf")
+
+    def _fold(self, klines: List):
+        now_ts = int(time.time() * 1000)
+        for k in klines:
+            if k[6] >= now_ts:
+                self.open_close = float(k[4])
+                self.open_high = float(k[2])
+            elif self.last_closed_open_time is None or k[0] > self.last_closed_open_time:
+                self.closed_closes.append(float(k[4]))
+                self.closed_high_max = max(self.closed_high_max, float(k[2]))
+                self.last_closed_open_time = k[0]
+
+    def refresh(self, client: BinanceAPI, symbol: str):
+        with self.lock:
+            if self.last_closed_open_time is not None:
+                recent = client.get_klines(symbol=symbol, interval="1d", limit=2)
+                if recent and recent[0][0] <= self.last_closed_open_time + DAY_MS:
+                    self._fold(recent)
+                    return
+            self._reset()
+            self._fold(client.get_klines(symbol=symbol, interval="1d", limit=1000))
+
+    @property
+    def price_change_7d(self) -> float:
+        reference = self.closed_closes[0]
+        return ((self.open_close - reference) / reference) * 100
+
+    @property
+    def all_time_high(self) -> float:
+        return max(self.closed_high_max, self.open_high)
+
+_daily_series: Dict[str, _DailySeries] = {}
+
+@timed()
 def get_market_info(client: BinanceAPI, symbol: str) -> Optional[Dict[str, Any]]:
     try:
-        stats = client.get_ticker(symbol=symbol)
-        
-        klines_1h = client.get_klines(symbol=symbol, interval=client.client.KLINE_INTERVAL_1HOUR, limit=2)
-        klines_7d = client.get_klines(symbol=symbol, interval=client.client.KLINE_INTERVAL_1DAY, limit=8)
-        klines_all = client.get_klines(symbol=symbol, interval=client.client.KLINE_INTERVAL_1DAY, limit=1000)
+        daily = _daily_series.get(symbol) or _daily_series.setdefault(symbol, _DailySeries())
+        stats_future = _executor.submit(client.get_ticker, symbol=symbol)
+        klines_1h_future = _executor.submit(client.get_klines, symbol=symbol, interval="1h", limit=2)
+        daily_future = _executor.submit(daily.refresh, client, symbol)
+
+        stats = stats_future.result()
+        klines_1h = klines_1h_future.result()
+        daily_future.result()
+
+        if stats is None or len(klines_1h) < 2 or daily.open_close is None or not daily.closed_closes:
+            logger.warning(f"Incomplete market data for {symbol}, skipping market info")
+            return None
         
         price_change_1h = ((float(klines_1h[-1][4]) - float(klines_1h[-2][4])) / float(klines_1h[-2][4])) * 100
-        price_change_7d = ((float(klines_7d[-1][4]) - float(klines_7d[0][4])) / float(klines_7d[0][4])) * 100
+        with daily.lock:
+            price_change_7d = daily.price_change_7d
+            all_time_high = daily.all_time_high
         
         current_price = float(stats['lastPrice'])
         
@@ -39,30 +111,82 @@ def get_market_info(client: BinanceAPI, symbol: str) -> Optional[Dict[str, Any]]
             'market_cap': market_cap,
             'circulation_supply': circulation_supply,
             'max_supply': max_supply,
-            'all_time_high': max([float(k[2]) for k in klines_all])
+            'all_time_high': all_time_high
         }
     except Exception as e:
         logger.error(f"Error fetching market info: {str(e)}")
         return None
 
+OVERVIEW_WINDOWS = ["1h", "24h", "7d"]
+
+@timed()
+def get_market_overview(client: BinanceAPI, symbols: List[str]) -> Optional[pd.DataFrame]:
+    try:
+        # Unknown symbols make the rolling window endpoint reject the whole
+        # batch, so they are dropped using the all-tickers snapshot first.
+        tickers_24h = {t['symbol']: t for t in client.get_tickers()}
+        symbols = [s for s in symbols if s in tickers_24h]
+
+        rolling_1h = _executor.submit(client.get_rolling_window_tickers, symbols, "1h")
+        rolling_7d = _executor.submit(client.get_rolling_window_tickers, symbols, "7d")
+        windows = [
+            {t['symbol']: t for t in rolling_1h.result()},
+            tickers_24h,
+            {t['symbol']: t for t in rolling_7d.result()}
+        ]
+
+        # (symbol, window, [open, last]) so every change is computed in one pass
+        prices = np.full((len(symbols), len(windows), 2), np.nan)
+        for i, symbol in enumerate(symbols):
+            for j, tickers in enumerate(windows):
+                ticker = tickers.get(symbol)
+                if ticker is not None:
+                    prices[i, j, 0] = float(ticker['openPrice'])
+                    prices[i, j, 1] = float(ticker['lastPrice'])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = (prices[:, :, 1] - prices[:, :, 0]) / prices[:, :, 0] * 100
+
+        overview = pd.DataFrame(
+            {
+                'last_price': prices[:, 1, 1],
+                'low_24h': [float(tickers_24h[s]['lowPrice']) for s in symbols],
+                'high_24h': [float(tickers_24h[s]['highPrice']) for s in symbols],
+                'volume_24h': [float(tickers_24h[s]['quoteVolume']) for s in symbols],
+            },
+            index=pd.Index(symbols, name='symbol')
+        )
+        for j, window in enumerate(OVERVIEW_WINDOWS):
+            overview[f'price_change_{window}'] = changes[:, j]
+        return overview
+    except Exception as e:
+        logger.error(f"Error fetching market overview: {str(e)}")
+        return None
+
 def get_price_change_for_interval(client: BinanceAPI, symbol: str, interval: str) -> float:
     interval_mapping = {
-        "1m": (client.client.KLINE_INTERVAL_1MINUTE, 2),
-        "5m": (client.client.KLINE_INTERVAL_5MINUTE, 2),
-        "15m": (client.client.KLINE_INTERVAL_15MINUTE, 2),
-        "30m": (client.client.KLINE_INTERVAL_30MINUTE, 2),
-        "1h": (client.client.KLINE_INTERVAL_1HOUR, 2),
-        "4h": (client.client.KLINE_INTERVAL_4HOUR, 2),
-        "1d": (client.client.KLINE_INTERVAL_1DAY, 2),
-        "1w": (client.client.KLINE_INTERVAL_1DAY, 8),
-        "1M": (client.client.KLINE_INTERVAL_1DAY, 31)
+        "1m": ("1m", 2),
+        "5m": ("5m", 2),
+        "15m": ("15m", 2),
+        "30m": ("30m", 2),
+        "1h": ("1h", 2),
+        "4h": ("4h", 2),
+        "1d": ("1d", 2),
+        "1w": ("1d", 8),
+        "1M": ("1d", 31)
     }
 
     if interval not in interval_mapping:
         return 0.0
 
     interval_str, limit = interval_mapping[interval]
-    klines = client.get_klines(symbol=symbol, interval=interval_str, limit=limit)
+    if is_resampled(interval_str):
+        now_ts = int(time.time() * 1000)
+        start_ts = now_ts - limit * INTERVAL_MS[interval_str]
+        rows, _ = _read_candles(client, symbol, interval_str, start_ts, now_ts, now_ts)
+        klines = rows[-limit:].tolist()
+    else:
+        klines = client.get_klines(symbol=symbol, interval=interval_str, limit=limit)
     
     if len(klines) < 2:
         return 0.0
@@ -71,12 +195,14 @@ def get_price_change_for_interval(client: BinanceAPI, symbol: str, interval: str
     previous_price = float(klines[0][4])
     return ((current_price - previous_price) / previous_price) * 100
 
+@timed()
 def fetch_candlesticks(
     client: BinanceAPI,
     symbol: str,
     interval: str = "15m",
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None
 ) -> Optional[pd.DataFrame]:
     try:
         interval_time_map = {
@@ -91,9 +217,117 @@ def fetch_candlesticks(
             else:  # 1M
                 start_date = end_date - timedelta(days=weeks_or_months * 30)
 
-        start_ts = int(start_date.timestamp() * 1000) if start_date else None
-        end_ts = int(end_date.timestamp() * 1000) if end_date else None
+        now_ts = int(time.time() * 1000)
+        start_ts = int(start_date.timestamp() * 1000) if start_date else 0
+        end_ts = int(end_date.timestamp() * 1000) if end_date else now_ts
+
+        rows, open_rows = _read_candles(client, symbol, interval, start_ts, end_ts, now_ts, progress_callback)
+        df = klines_frame(rows)
         
+        return calculate_moving_averages(df, key=(symbol, interval), open_rows=open_rows)
+    
+    except Exception as e:
+        logger.error(f"Error fetching candlestick data: {str(e)}")
+        return None
+
+@timed()
+def fetch_kline_array(
+    client: BinanceAPI,
+    symbol: str,
+    interval: str,
+    start_ts: int,
+    end_ts: int,
+    native: bool = False
+) -> Optional[np.ndarray]:
+    # The candles fetch_candlesticks would return, as a raw kline array
+    # without building a frame or moving averages. native=True fetches
+    # longer intervals from Binance instead of aggregating the base store.
+    try:
+        rows, _ = _read_candles(client, symbol, interval, start_ts, end_ts, int(time.time() * 1000), native=native)
+        return rows
+    except Exception as e:
+        logger.error(f"Error fetching {symbol} {interval} klines: {str(e)}")
+        return None
+
+def _missing_candles(store: KlineStore, start_ts: int, end_ts: int) -> int:
+    # How many candles _sync_kline_store would have to download
+    step = INTERVAL_MS[store.interval]
+    with store.lock:
+        store.refresh()
+        if len(store) == 0:
+            return (end_ts - start_ts) // step
+        missing = 0
+        if start_ts < store.first_open_time and (store.covered_from is None or start_ts < store.covered_from):
+            missing += (store.first_open_time - start_ts) // step
+        if end_ts > store.last_close_time:
+            missing += (end_ts - store.last_close_time) // step
+        return missing
+
+def _source_interval(client: BinanceAPI, symbol: str, interval: str, start_ts: int, end_ts: int) -> str:
+    # Longer intervals are aggregated from the base store when it holds the
+    # range or is at most RESAMPLE_MAX_FETCH candles short of it, and are
+    # fetched natively otherwise. The collector keeps the base store current
+    # for read-only dashboards.
+    if not is_resampled(interval):
+        return interval
+    base = config.RESAMPLE_BASE_INTERVAL
+    if client.read_only:
+        return base
+    missing = _missing_candles(get_kline_store(symbol, base), start_ts, end_ts)
+    return base if missing <= config.RESAMPLE_MAX_FETCH else interval
+
+def _read_candles(
+    client: BinanceAPI,
+    symbol: str,
+    interval: str,
+    start_ts: int,
+    end_ts: int,
+    now_ts: int,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    native: bool = False
+) -> Tuple[np.ndarray, int]:
+    # Returns the candles opened within [start_ts, end_ts] and how many of
+    # them, at the end, are still open. Intervals longer than the base
+    # interval are aggregated from the base store, so switching between
+    # them only reads local data, unless native is set (read-only clients
+    # always read what the collector stored).
+    if native and not client.read_only:
+        source = interval
+    else:
+        source = _source_interval(client, symbol, interval, start_ts, end_ts)
+    store = get_kline_store(symbol, source)
+    if client.read_only:
+        # The collector owns the store, only pick up what it has written
+        store.refresh()
+        open_rows = store.read_open()
+    else:
+        open_rows = _sync_kline_store(
+            client, store, symbol, source, start_ts, end_ts, now_ts, progress_callback
+        )
+
+    if source != interval:
+        resampler = get_resampler(store, interval)
+        resampler.update(open_rows)
+        rows = resampler.read(start_ts, end_ts)
+        if len(store) == 0:
+            return rows, len(rows)
+        return rows, int(np.count_nonzero(rows["close_time"] > store.last_close_time))
+
+    open_rows = open_rows[(open_rows["open_time"] >= start_ts) & (open_rows["open_time"] <= end_ts)]
+    return store.read(start_ts, end_ts, tail=open_rows), len(open_rows)
+
+def _fetch_kline_range(
+    client: BinanceAPI,
+    symbol: str,
+    interval: str,
+    start_ts: int,
+    end_ts: int,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    on_rows: Optional[Callable[[np.ndarray], None]] = None
+) -> Tuple[np.ndarray, bool]:
+    # Also returns whether the whole range was fetched; a failed backfill
+    # chunk leaves only the candles before it
+    if (end_ts - start_ts) // INTERVAL_MS[interval] < 1000:
         data = client.get_historical_klines(
             symbol=symbol,
             interval=interval,
@@ -101,27 +335,188 @@ def fetch_candlesticks(
             end_str=str(end_ts),
             limit=1000
         )
-        
-        columns = [
-            "timestamp", "open", "high", "low", "close", "volume",
-            "close_time", "quote_asset_volume", "number_of_trades",
-            "taker_buy_base", "taker_buy_quote", "ignore"
-        ]
-        
-        df = pd.DataFrame(data, columns=columns)
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-        df.set_index("timestamp", inplace=True)
-        
-        numeric_cols = ["open", "high", "low", "close", "volume"]
-        df[numeric_cols] = df[numeric_cols].astype(float)
-        
-        return calculate_moving_averages(df)
-    
-    except Exception as e:
-        logger.error(f"Error fetching candlestick data: {str(e)}")
-        return None
+        return decode_klines(data), True
+
+    job = BackfillJob(client, symbol, interval, start_ts, end_ts)
+    rows = job.run(on_progress=progress_callback, on_rows=on_rows)
+    return rows, job.complete
+
+def _sync_kline_store(
+    client: BinanceAPI,
+    store: KlineStore,
+    symbol: str,
+    interval: str,
+    start_ts: int,
+    end_ts: int,
+    now_ts: int,
+    progress_callback: Optional[Callable[[int, int], None]] = None
+) -> np.ndarray:
+    # Only the ranges missing from disk are requested: the head before the
+    # first stored candle and the tail after the last stored close_time.
+    # Closed candles are persisted, the still-open candle is returned as is.
+    # Long tails are persisted chunk by chunk while backfilling, so an
+    # interrupted refresh resumes from where it stopped.
+    def persist(rows: np.ndarray):
+        store.append(rows[rows["close_time"] < now_ts])
+
+    with store.lock:
+        store.refresh()
+        if len(store) == 0:
+            def persist_from_start(rows: np.ndarray):
+                persist(rows)
+                store.mark_covered_from(start_ts)
+
+            fetched, _ = _fetch_kline_range(
+                client, symbol, interval, start_ts, end_ts, progress_callback, persist_from_start
+            )
+            if len(fetched):
+                store.mark_covered_from(start_ts)
+        else:
+            if start_ts < store.first_open_time and (store.covered_from is None or start_ts < store.covered_from):
+                head, complete = _fetch_kline_range(
+                    client, symbol, interval, start_ts, store.first_open_time - 1, progress_callback
+                )
+                head = head[head["close_time"] < now_ts]
+                # A partial head would leave a hole before the stored
+                # candles, and marking it covered would keep it there; it is
+                # dropped and the next refresh retries
+                if len(head) and (complete or int(head["close_time"][-1]) + 1 >= store.first_open_time):
+                    store.prepend(head)
+                    store.mark_covered_from(start_ts)
+                elif len(head):
+                    logger.warning(f"Incomplete history for {symbol} at {interval}, not extending the store")
+            if end_ts > store.last_close_time:
+                fetched, _ = _fetch_kline_range(
+                    client, symbol, interval, store.last_close_time + 1, end_ts, progress_callback, persist
+                )
+            else:
+                fetched = decode_klines([])
+
+        persist(fetched)
+        return fetched[fetched["close_time"] >= now_ts]
+
+def ingest_candlesticks(
+    client: BinanceAPI,
+    symbol: str,
+    interval: str,
+    start_ts: int,
+    end_ts: Optional[int] = None
+) -> int:
+    # Brings the local store up to date without building a frame, and
+    # publishes the open candle for readers in other processes. Returns the
+    # number of closed candles added.
+    now_ts = int(time.time() * 1000)
+    store = get_kline_store(symbol, interval)
+    before = len(store)
+    open_rows = _sync_kline_store(client, store, symbol, interval, start_ts, end_ts or now_ts, now_ts)
+    store.write_open(open_rows)
+    return len(store) - before
+
+# Moving averages of the closed candles of one symbol/interval, kept between
+# refreshes. A refresh only feeds the candles that closed since the last one
+# through the incremental SMA state; the still-open candle is previewed.
+# A rolling mean only looks back `period` rows, so values computed for an
+# earlier window stay valid for any later window starting at the same row
+# or after it.
+#
+# Times and values live in preallocated buffers: newly closed candles are
+# written after the last row and a window that moved forward only advances
+# the start, so a refresh copies nothing but the frame's own columns.
+class _MovingAverageState:
+    def __init__(self, periods: List[int]):
+        self.lock = threading.Lock()
+        self.periods = periods
+        self.smas = {period: SMA(period) for period in periods}
+        self._times = np.empty(0, dtype=np.int64)
+        self._values = np.empty((len(periods), 0))
+        self._start = 0
+        self._end = 0
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times[self._start:self._end]
+
+    def _reserve(self, count: int):
+        # Room for `count` more rows after the last one, moving the live rows
+        # to the front (and growing) only when the tail is used up
+        length = self._end - self._start
+        if self._end + count <= len(self._times):
+            return
+        capacity = max(len(self._times), 2 * (length + count), 1024)
+        times = np.empty(capacity, dtype=np.int64)
+        values = np.empty((len(self.periods), capacity))
+        times[:length] = self._times[self._start:self._end]
+        values[:, :length] = self._values[:, self._start:self._end]
+        self._times, self._values = times, values
+        self._start, self._end = 0, length
+
+    def _initialize(self, times: np.ndarray, closes: np.ndarray):
+        self._start = self._end = 0
+        self._reserve(len(times))
+        self._times[:len(times)] = times
+        for i, period in enumerate(self.periods):
+            self._values[i, :len(times)] = self.smas[period].initialize(closes)
+        self._end = len(times)
+
+    def _extend(self, times: np.ndarray, closes: np.ndarray) -> bool:
+        known = self.times
+        if not len(known) or not len(times) or times[0] < known[0]:
+            return False
+        last = int(np.searchsorted(times, known[-1]))
+        if last >= len(times) or times[last] != known[-1]:
+            return False
+        new_closes = closes[last + 1:]
+        count = len(new_closes)
+        if count:
+            self._reserve(count)
+            end = self._end
+            self._times[end:end + count] = times[last + 1:]
+            for i, period in enumerate(self.periods):
+                sma, row = self.smas[period], self._values[i]
+                for j, close in enumerate(new_closes.tolist()):
+                    row[end + j] = sma.update(close)
+            self._end += count
+        return True
+
+    def apply(self, df: pd.DataFrame, open_rows: int):
+        closed = len(df) - open_rows
+        times = df.index.asi8[:closed]
+        closes = df['close'].to_numpy()
+        if not self._extend(times, closes[:closed]):
+            self._initialize(times, closes[:closed])
+
+        lo = int(np.searchsorted(self.times, times[0])) if closed else len(self.times)
+        if len(self.times) - lo != closed:
+            self._initialize(times, closes[:closed])
+            lo = 0
+        # Nothing before the current window is needed again
+        self._start += lo
+        for i, period in enumerate(self.periods):
+            column = np.empty(len(df))
+            column[:closed] = self._values[i, self._start:self._end]
+            column[:period - 1] = np.nan
+            for j in range(closed, len(df)):
+                column[j] = self.smas[period].update(closes[j], closed=False) if j >= period - 1 else np.nan
+            df[f'MA_{period}'] = column
+
+_moving_average_states: Dict[Tuple, _MovingAverageState] = {}
+
+@timed()
+def calculate_moving_averages(
+    df: pd.DataFrame,
+    periods: List[int] = [20, 50, 200],
+    key: Optional[Tuple[str, str]] = None,
+    open_rows: int = 0
+) -> pd.DataFrame:
+    if key is None:
+        for period in periods:
+            df[f'MA_{period}'] = df['close'].rolling(window=period).mean()
+        return df
 
-def calculate_moving_averages(df: pd.DataFrame, periods: List[int] = [20, 50, 200]) -> pd.DataFrame:
-    for period in periods:
-        df[f'MA_{period}'] = df['close'].rolling(window=period).mean()
+    state_key = (*key, tuple(periods))
+    state = _moving_average_states.get(state_key) or _moving_average_states.setdefault(
+        state_key, _MovingAverageState(list(periods))
+    )
+    with state.lock:
+        state.apply(df, open_rows)
     return df
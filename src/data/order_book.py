@@ -0,0 +1,349 @@
+import gzip
+import json
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sortedcontainers import SortedList
+import config
+
+logger = logging.getLogger(__name__)
+
+TRADE_DTYPE = np.dtype([
+    ("trade_id", "<i8"),
+    ("time", "<i8"),
+    ("price", "<f8"),
+    ("quantity", "<f8"),
+    ("buyer_maker", "?"),
+])
+
+# Trade windows reported by MarketDepth.summary
+TRADE_WINDOWS_MS = {"10s": 10_000, "1m": 60_000, "5m": 300_000}
+
+class _BookSide:
+    # Price levels of one side, best first. Bid prices are stored negated so
+    # both sides sort ascending. Quantity changes are dict writes; only a new
+    # or emptied level touches the SortedList of prices, in O(log n). At most
+    # max_levels levels are kept; once deeper ones have been dropped the side
+    # is `truncated`, and when it has thinned below half of max_levels the
+    # levels that should now be visible are unknown, so the book asks for a
+    # new snapshot.
+    __slots__ = ("sign", "max_levels", "keys", "quantities", "truncated")
+
+    def __init__(self, sign: int, max_levels: int):
+        self.sign = sign
+        self.max_levels = max_levels
+        self.keys = SortedList()
+        self.quantities: Dict[float, float] = {}
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return len(self.quantities)
+
+    @property
+    def depleted(self) -> bool:
+        return self.truncated and len(self.quantities) < self.max_levels // 2
+
+    def clear(self):
+        self.keys.clear()
+        self.quantities.clear()
+        self.truncated = False
+
+    def set(self, price: float, quantity: float):
+        key = self.sign * price
+        quantities = self.quantities
+        if key in quantities:
+            if quantity == 0.0:
+                del quantities[key]
+                self.keys.remove(key)
+            else:
+                quantities[key] = quantity
+            return
+        if quantity == 0.0:
+            return
+        if len(quantities) >= self.max_levels:
+            self.truncated = True
+            if key > self.keys[-1]:
+                return
+            del quantities[self.keys.pop()]
+        self.keys.add(key)
+        quantities[key] = quantity
+
+    def best(self) -> Tuple[float, float]:
+        if not self.quantities:
+            return math.nan, 0.0
+        key = self.keys[0]
+        return self.sign * key, self.quantities[key]
+
+    def top(self, levels: int) -> np.ndarray:
+        # (price, quantity) rows, best first
+        keys = list(self.keys.islice(0, levels))
+        rows = np.empty((len(keys), 2))
+        rows[:, 0] = keys
+        rows[:, 0] *= self.sign
+        rows[:, 1] = [self.quantities[key] for key in keys]
+        return rows
+
+# Local copy of one symbol's order book kept in sync with depth diffs. A diff
+# that does not continue from last_update_id means updates were missed, and
+# the book stays out of sync until the next snapshot. So does a side that
+# has run short of levels after dropping deeper ones.
+class OrderBook:
+    __slots__ = ("symbol", "bids", "asks", "last_update_id", "synced", "updates", "resyncs")
+
+    def __init__(self, symbol: str, max_levels: int = config.DEPTH_MAX_LEVELS):
+        self.symbol = symbol.upper()
+        self.bids = _BookSide(-1, max_levels)
+        self.asks = _BookSide(1, max_levels)
+        self.last_update_id = 0
+        self.synced = False
+        self.updates = 0
+        self.resyncs = 0
+
+    def apply_snapshot(self, last_update_id: int, bids: Iterable, asks: Iterable):
+        self.bids.clear()
+        self.asks.clear()
+        for price, quantity in bids:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity in asks:
+            self.asks.set(float(price), float(quantity))
+        self.last_update_id = last_update_id
+        self.synced = True
+
+    def apply_diff(self, first_id: int, final_id: int, bids: Iterable, asks: Iterable) -> bool:
+        if not self.synced:
+            return False
+        if final_id <= self.last_update_id:
+            return True
+        if first_id > self.last_update_id + 1:
+            logger.warning(
+                f"{self.symbol} order book gap: expected update {self.last_update_id + 1}, got {first_id}"
+            )
+            self.synced = False
+            self.resyncs += 1
+            return False
+        for price, quantity in bids:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity in asks:
+            self.asks.set(float(price), float(quantity))
+        self.last_update_id = final_id
+        self.updates += 1
+        if self.bids.depleted or self.asks.depleted:
+            logger.warning(f"{self.symbol} order book ran short of levels beyond the ones dropped, resyncing")
+            self.synced = False
+            self.resyncs += 1
+        return True
+
+    def spread(self) -> float:
+        return self.asks.best()[0] - self.bids.best()[0]
+
+    def mid(self) -> float:
+        return (self.asks.best()[0] + self.bids.best()[0]) / 2
+
+    def imbalance(self, levels: int = 10) -> float:
+        # (bid - ask) / (bid + ask) quantity over the top levels, in [-1, 1]
+        bid = self.bids.top(levels)[:, 1].sum()
+        ask = self.asks.top(levels)[:, 1].sum()
+        return float((bid - ask) / (bid + ask)) if bid + ask else math.nan
+
+# The most recent `capacity` aggregated trades of one symbol, column-wise in a
+# preallocated structured array. Appends overwrite the oldest row, so memory
+# is fixed no matter how busy the market is.
+class TradeBuffer:
+    __slots__ = ("capacity", "count", "last_trade_id", "_rows")
+
+    def __init__(self, capacity: int = config.TRADE_BUFFER_SIZE):
+        self.capacity = capacity
+        self.count = 0
+        self.last_trade_id = -1
+        self._rows = np.zeros(capacity, dtype=TRADE_DTYPE)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, trade_id: int, time_ms: int, price: float, quantity: float, buyer_maker: bool) -> bool:
+        # Replayed/duplicate trades after a reconnect are skipped
+        if trade_id <= self.last_trade_id:
+            return False
+        self._rows[self.count % self.capacity] = (trade_id, time_ms, price, quantity, buyer_maker)
+        self.count += 1
+        self.last_trade_id = trade_id
+        return True
+
+    def extend(self, rows: np.ndarray) -> int:
+        rows = rows[rows["trade_id"] > self.last_trade_id][-self.capacity:]
+        if len(rows) == 0:
+            return 0
+        self._rows[(self.count + np.arange(len(rows))) % self.capacity] = rows
+        self.count += len(rows)
+        self.last_trade_id = int(rows["trade_id"][-1])
+        return len(rows)
+
+    def _segments(self) -> List[np.ndarray]:
+        # Oldest to newest, as views
+        if self.count <= self.capacity:
+            return [self._rows[:self.count]]
+        split = self.count % self.capacity
+        return [self._rows[split:], self._rows[:split]]
+
+    def since(self, start_ms: int) -> np.ndarray:
+        parts = [part[np.searchsorted(part["time"], start_ms, side="left"):] for part in self._segments()]
+        return parts[0].copy() if len(parts) == 1 else np.concatenate(parts)
+
+    def stats(self, start_ms: int) -> Dict[str, float]:
+        trades = self.since(start_ms)
+        volume = float(trades["quantity"].sum())
+        quote_volume = float(np.dot(trades["price"], trades["quantity"]))
+        # buyer_maker means the taker sold
+        buy_volume = float(trades["quantity"][~trades["buyer_maker"]].sum())
+        return {
+            "trades": len(trades),
+            "volume": volume,
+            "vwap": quote_volume / volume if volume else math.nan,
+            "buy_ratio": buy_volume / volume if volume else math.nan
+        }
+
+# Order book and recent trades of one symbol, fed from the combined
+# depthUpdate/aggTrade stream. Diffs that arrive while the book is out of
+# sync are buffered and replayed on top of the next REST snapshot, following
+# Binance's procedure for managing a local order book.
+class MarketDepth:
+    __slots__ = ("symbol", "book", "trades", "pending", "events")
+
+    def __init__(
+        self,
+        symbol: str,
+        max_levels: int = config.DEPTH_MAX_LEVELS,
+        trade_capacity: int = config.TRADE_BUFFER_SIZE,
+        pending_size: int = 1000
+    ):
+        self.symbol = symbol.upper()
+        self.book = OrderBook(symbol, max_levels)
+        self.trades = TradeBuffer(trade_capacity)
+        self.pending: Deque[Tuple[int, int, List, List]] = deque(maxlen=pending_size)
+        self.events = 0
+
+    @property
+    def needs_snapshot(self) -> bool:
+        # Only once a diff is buffered can a snapshot be checked for overlap
+        return not self.book.synced and len(self.pending) > 0
+
+    def reset(self):
+        # After a reconnect nothing guarantees continuity with the old book
+        self.book.synced = False
+        self.pending.clear()
+
+    def on_event(self, data: Dict[str, Any]):
+        event = data.get("e")
+        if event == "depthUpdate":
+            if not self.book.apply_diff(data["U"], data["u"], data["b"], data["a"]):
+                self.pending.append((data["U"], data["u"], data["b"], data["a"]))
+        elif event == "aggTrade":
+            self.trades.append(data["a"], data["T"], float(data["p"]), float(data["q"]), data["m"])
+        else:
+            return
+        self.events += 1
+
+    def load_snapshot(self, snapshot: Dict[str, Any]) -> bool:
+        # False when the snapshot predates the oldest buffered diff and a
+        # newer one is needed
+        last_update_id = snapshot["lastUpdateId"]
+        pending = [diff for diff in self.pending if diff[1] > last_update_id]
+        if pending and pending[0][0] > last_update_id + 1:
+            return False
+        self.book.apply_snapshot(last_update_id, snapshot["bids"], snapshot["asks"])
+        self.pending.clear()
+        for first_id, final_id, bids, asks in pending:
+            if not self.book.apply_diff(first_id, final_id, bids, asks):
+                return False
+        return True
+
+    def summary(self, levels: int = 10, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        book = self.book
+        bids, asks = book.bids.top(levels), book.asks.top(levels)
+        best_bid, best_ask = book.bids.best()[0], book.asks.best()[0]
+        mid = (best_bid + best_ask) / 2
+        summary = {
+            "symbol": self.symbol,
+            "synced": book.synced,
+            "last_update_id": book.last_update_id,
+            "best_bid": best_bid,
+            "best_ask": best_ask,
+            "mid": mid,
+            "spread": best_ask - best_bid,
+            "spread_bps": (best_ask - best_bid) / mid * 10_000 if mid else math.nan,
+            "bid_depth": float(np.dot(bids[:, 0], bids[:, 1])),
+            "ask_depth": float(np.dot(asks[:, 0], asks[:, 1])),
+            "imbalance": book.imbalance(levels)
+        }
+        for window, window_ms in TRADE_WINDOWS_MS.items():
+            for name, value in self.trades.stats(now_ms - window_ms).items():
+                summary[f"{name}_{window}"] = value
+        return summary
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def replay(records: Iterable[Dict[str, Any]], depths: Optional[Dict[str, MarketDepth]] = None) -> Dict[str, MarketDepth]:
+    # Records as written by DepthStream(record_path=...): combined stream
+    # messages and {"symbol", "snapshot"} entries in the order received, so a
+    # replay goes through exactly the same updates and resyncs as the
+    # original session.
+    depths = depths if depths is not None else {}
+    for record in records:
+        data = record.get("data", record)
+        symbol = record["symbol"] if "snapshot" in record else data.get("s")
+        if not symbol:
+            continue
+        depth = depths.get(symbol)
+        if depth is None:
+            depth = depths[symbol] = MarketDepth(symbol)
+        if "snapshot" in record:
+            depth.load_snapshot(record["snapshot"])
+        else:
+            depth.on_event(data)
+    return depths
+
+def main(argv=None):
+    # python -m src.data.order_book record RECORDING --symbols BTCUSDT --seconds 60
+    # python -m src.data.order_book replay RECORDING
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record or replay order book and trade streams")
+    parser.add_argument("command", choices=["record", "replay"])
+    parser.add_argument("recording")
+    parser.add_argument("--symbols", default="BTCUSDT")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--levels", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from src.api.depth_stream import DepthStream
+        stream = DepthStream(args.symbols.split(","), record_path=args.recording)
+        stream.start()
+        try:
+            time.sleep(args.seconds)
+        finally:
+            stream.stop()
+        return
+
+    records = list(read_recording(args.recording))
+    started = time.perf_counter()
+    depths = replay(records)
+    elapsed = time.perf_counter() - started
+    print(f"{len(records)} records in {elapsed:.3f}s ({len(records) / elapsed:,.0f} records/s)")
+    # Trade windows end at the last recorded event, not at the wall clock
+    now_ms = max((record.get("data", record).get("E", 0) for record in records), default=0)
+    for depth in depths.values():
+        print(json.dumps(depth.summary(args.levels, now_ms), indent=2))
+
+if __name__ == "__main__":
+    main()
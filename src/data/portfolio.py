@@ -0,0 +1,195 @@
+import logging
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Account balances valued in USDT from one 24h ticker list (every symbol's
+# last and open price), so pricing a few hundred assets costs one request.
+# An asset is priced, in order, from its USDT pair, the inverse pair (USDT
+# quoted in a fiat currency), or through BTC/ETH/BNB. Simple Earn positions
+# (LD<asset>) are priced as the underlying asset.
+#
+# Balances are kept up to date from account update events (user data
+# stream) or by diffing account snapshots, so the account endpoint is only
+# read at start and on resync.
+
+QUOTE_ASSET = "USDT"
+BRIDGE_ASSETS = ["BTC", "ETH", "BNB"]
+EARN_PREFIX = "LD"
+
+HOLDING_COLUMNS = [
+    "asset", "free", "locked", "quantity", "price", "value", "weight",
+    "change_24h", "change_24h_pct", "avg_cost", "pnl", "pnl_pct"
+]
+
+class PortfolioValuation(NamedTuple):
+    total_value: float
+    change_24h: float       # value change of the current holdings over 24h
+    pnl: float              # against the average cost tracked since the session started
+    holdings: pd.DataFrame  # HOLDING_COLUMNS, one row per non-zero balance, largest first
+    unpriced: List[str]     # held assets with no route to USDT
+
+def ticker_prices(tickers: List[Dict[str, Any]]) -> Dict[str, Tuple[float, float]]:
+    # symbol -> (last price, price 24h ago)
+    prices = {}
+    for ticker in tickers:
+        last, open_price = float(ticker["lastPrice"]), float(ticker["openPrice"])
+        if last > 0 and open_price > 0:
+            prices[ticker["symbol"]] = (last, open_price)
+    return prices
+
+def asset_price(asset: str, prices: Dict[str, Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+    if asset == QUOTE_ASSET:
+        return 1.0, 1.0
+    direct = prices.get(asset + QUOTE_ASSET)
+    if direct is not None:
+        return direct
+    inverse = prices.get(QUOTE_ASSET + asset)
+    if inverse is not None:
+        return 1 / inverse[0], 1 / inverse[1]
+    for bridge in BRIDGE_ASSETS:
+        pair, bridge_price = prices.get(asset + bridge), prices.get(bridge + QUOTE_ASSET)
+        if pair is not None and bridge_price is not None:
+            return pair[0] * bridge_price[0], pair[1] * bridge_price[1]
+    # Checked last: some listed assets start with LD themselves (LDO)
+    if asset.startswith(EARN_PREFIX) and len(asset) > len(EARN_PREFIX):
+        return asset_price(asset[len(EARN_PREFIX):], prices)
+    return None
+
+def _amount(value: Any) -> float:
+    return float(value) if value is not None else 0.0
+
+# Non-zero balances of one account. load() takes a full account snapshot
+# (GET /api/v3/account), apply() an outboundAccountPosition event carrying
+# only the balances that changed. The average cost of each asset is tracked
+# from those balance changes since the session started, valued at the last
+# price seen through update_prices() (balances held at start, or changed
+# before the asset was ever priced, cost their first price). valuation()
+# only reads this state.
+class Portfolio:
+    def __init__(self):
+        self.balances: Dict[str, Tuple[float, float]] = {}
+        self.update_time = 0
+        self.snapshots = 0
+        self.events = 0
+        self._prices: Dict[str, float] = {}                # asset -> last USDT price seen
+        self._cost: Dict[str, Tuple[float, float]] = {}    # asset -> (quantity, total cost)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.balances)
+
+    def load(self, account: Dict[str, Any]) -> int:
+        # Returns how many balances changed since the previous snapshot
+        balances = {}
+        for balance in account.get("balances", []):
+            free, locked = _amount(balance.get("free")), _amount(balance.get("locked"))
+            if free or locked:
+                balances[balance["asset"]] = (free, locked)
+        with self._lock:
+            changed = [asset for asset in balances.keys() | self.balances.keys()
+                       if balances.get(asset) != self.balances.get(asset)]
+            self.balances = balances
+            self.update_time = int(account.get("updateTime", 0))
+            self.snapshots += 1
+            self._update_cost(changed)
+        return len(changed)
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        # Events older than the loaded snapshot are already reflected in it
+        if event.get("e") != "outboundAccountPosition":
+            return False
+        with self._lock:
+            if int(event.get("u", 0)) <= self.update_time:
+                return False
+            for balance in event.get("B", []):
+                free, locked = _amount(balance.get("f")), _amount(balance.get("l"))
+                if free or locked:
+                    self.balances[balance["a"]] = (free, locked)
+                else:
+                    self.balances.pop(balance["a"], None)
+            self.update_time = int(event["u"])
+            self.events += 1
+            self._update_cost([balance["a"] for balance in event.get("B", [])])
+        return True
+
+    def update_prices(self, tickers: List[Dict[str, Any]]):
+        # Remembers the held assets' prices for costing later balance changes
+        prices = ticker_prices(tickers)
+        with self._lock:
+            for asset in self.balances:
+                price = asset_price(asset, prices)
+                if price is not None:
+                    self._prices[asset] = price[0]
+            self._update_cost([asset for asset in self.balances if asset not in self._cost])
+
+    @timed()
+    def valuation(self, tickers: List[Dict[str, Any]]) -> PortfolioValuation:
+        prices = ticker_prices(tickers)
+        with self._lock:
+            assets = sorted(self.balances)
+            free = np.array([self.balances[asset][0] for asset in assets], dtype=np.float64)
+            locked = np.array([self.balances[asset][1] for asset in assets], dtype=np.float64)
+            quantity = free + locked
+            last, open_price = np.full(len(assets), np.nan), np.full(len(assets), np.nan)
+            for i, asset in enumerate(assets):
+                price = asset_price(asset, prices)
+                if price is not None:
+                    last[i], open_price[i] = price
+            cost = np.array([self._cost.get(asset, (0.0, np.nan))[1] for asset in assets], dtype=np.float64)
+
+        value = quantity * last
+        priced = ~np.isnan(value)
+        total = float(value[priced].sum())
+        change = quantity * (last - open_price)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_cost = cost / quantity
+            pnl = value - cost
+            holdings = pd.DataFrame({
+                "asset": assets,
+                "free": free,
+                "locked": locked,
+                "quantity": quantity,
+                "price": last,
+                "value": value,
+                "weight": value / total if total > 0 else np.nan,
+                "change_24h": change,
+                "change_24h_pct": (last / open_price - 1) * 100,
+                "avg_cost": avg_cost,
+                "pnl": pnl,
+                "pnl_pct": pnl / cost * 100
+            }, columns=HOLDING_COLUMNS)
+        holdings = holdings.sort_values("value", ascending=False, na_position="last", ignore_index=True)
+        return PortfolioValuation(
+            total,
+            float(np.nansum(change)),
+            float(np.nansum(pnl)),
+            holdings,
+            [asset for asset, ok in zip(assets, priced) if not ok]
+        )
+
+    def _update_cost(self, assets: List[str]):
+        # Increases are bought at the last price seen, decreases sell at the
+        # average cost; assets no longer held are forgotten, assets never
+        # priced wait for update_prices
+        for asset in assets:
+            free, locked = self.balances.get(asset, (0.0, 0.0))
+            quantity = free + locked
+            if quantity == 0.0:
+                self._cost.pop(asset, None)
+                self._prices.pop(asset, None)
+                continue
+            tracked, total = self._cost.get(asset, (0.0, 0.0))
+            if quantity > tracked:
+                price = self._prices.get(asset)
+                if price is None:
+                    continue
+                total += (quantity - tracked) * price
+            elif tracked > 0:
+                total *= quantity / tracked
+            self._cost[asset] = (quantity, total)
@@ -0,0 +1,251 @@
+import gzip
+import json
+import threading
+from fractions import Fraction
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+from src.data.kline_decoder import KLINE_DTYPE, decode_klines
+from src.data.kline_store import INTERVAL_MS, KlineStore
+import config
+
+# Higher timeframes derived from one stored base series (e.g. 1m) instead of
+# being downloaded separately. Buckets follow Binance's alignment: fixed
+# length intervals are aligned to the Unix epoch, weeks start on Monday
+# 00:00 UTC and months on the 1st 00:00 UTC.
+
+WEEK_OFFSET_MS = 4 * 86_400_000  # 1970-01-01 was a Thursday
+
+# Summed columns; open/close are taken from the first/last base candle and
+# high/low are the extremes.
+SUM_COLUMNS = ["volume", "quote_asset_volume", "number_of_trades", "taker_buy_base", "taker_buy_quote"]
+
+# Binance quantities have 8 decimals
+DECIMAL_SCALE = 10**8
+
+def is_resampled(interval: str) -> bool:
+    # Whether `interval` is derived from RESAMPLE_BASE_INTERVAL rather than
+    # stored on its own
+    base = config.RESAMPLE_BASE_INTERVAL
+    return bool(base) and interval != base and INTERVAL_MS[interval] > INTERVAL_MS[base]
+
+def bucket_start(open_time: np.ndarray, interval: str) -> np.ndarray:
+    open_time = np.asarray(open_time, dtype=np.int64)
+    if interval == "1M":
+        months = open_time.astype("datetime64[ms]").astype("datetime64[M]")
+        return months.astype("datetime64[ms]").astype(np.int64)
+    step = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (open_time - offset) // step * step + offset
+
+def bucket_end(start: np.ndarray, interval: str) -> np.ndarray:
+    start = np.asarray(start, dtype=np.int64)
+    if interval == "1M":
+        months = start.astype("datetime64[ms]").astype("datetime64[M]") + 1
+        return months.astype("datetime64[ms]").astype(np.int64)
+    return start + INTERVAL_MS[interval]
+
+def _decimal_sum(values: np.ndarray, first: np.ndarray) -> np.ndarray:
+    # Sums of 8-decimal quantities as Binance computes them, on the exact
+    # decimals: every value is split into whole units and 1e-8 units, both
+    # are summed as integers and each total is rounded to float64 once.
+    # Plain float sums drift from Binance's volumes in the last digits.
+    whole = np.floor(values)
+    units = np.rint((values - whole) * DECIMAL_SCALE).astype(np.int64)
+    whole_sum = np.add.reduceat(whole.astype(np.int64), first)
+    units_sum = np.add.reduceat(units, first)
+    whole_sum += units_sum // DECIMAL_SCALE
+    units_sum %= DECIMAL_SCALE
+    # Below 2**53 units the total is an exact double and one division rounds
+    # it correctly; larger totals go through an exact fraction
+    small = whole_sum < (2**53) // DECIMAL_SCALE
+    out = np.empty(len(first))
+    out[small] = (whole_sum[small] * DECIMAL_SCALE + units_sum[small]) / DECIMAL_SCALE
+    for i in np.flatnonzero(~small):
+        out[i] = float(Fraction(int(whole_sum[i]) * DECIMAL_SCALE + int(units_sum[i]), DECIMAL_SCALE))
+    return out
+
+def resample_klines(rows: np.ndarray, interval: str) -> np.ndarray:
+    # rows must be sorted by open_time. Every bucket that has at least one
+    # base candle becomes one candle, reported with the bucket's own
+    # open_time/close_time like Binance does.
+    if len(rows) == 0:
+        return np.empty(0, dtype=KLINE_DTYPE)
+    starts = bucket_start(rows["open_time"], interval)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, len(rows) - 1]
+
+    out = np.empty(len(first), dtype=KLINE_DTYPE)
+    out["open_time"] = starts[first]
+    out["close_time"] = bucket_end(starts[first], interval) - 1
+    out["open"] = rows["open"][first]
+    out["close"] = rows["close"][last]
+    out["high"] = np.maximum.reduceat(rows["high"], first)
+    out["low"] = np.minimum.reduceat(rows["low"], first)
+    out["number_of_trades"] = np.add.reduceat(rows["number_of_trades"], first)
+    for name in SUM_COLUMNS:
+        if name != "number_of_trades":
+            out[name] = _decimal_sum(rows[name], first)
+    return out
+
+# Incrementally maintained resampling of one base store to one interval.
+# Closed buckets are computed once; an update only re-aggregates the base
+# candles of the still-open bucket plus those that closed since.
+class Resampler:
+    def __init__(self, store: KlineStore, interval: str):
+        self.store = store
+        self.interval = interval
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._closed = np.empty(0, dtype=KLINE_DTYPE)
+        self._length = 0
+        self._open = np.empty(0, dtype=KLINE_DTYPE)
+        self._base_first: Optional[int] = None
+        self._pending_from: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _append_closed(self, rows: np.ndarray):
+        needed = self._length + len(rows)
+        if needed > len(self._closed):
+            grown = np.empty(max(needed, 2 * len(self._closed), 64), dtype=KLINE_DTYPE)
+            grown[:self._length] = self._closed[:self._length]
+            self._closed = grown
+        self._closed[self._length:needed] = rows
+        self._length = needed
+
+    def update(self, open_rows: Optional[np.ndarray] = None):
+        # open_rows are the base's not yet closed candles, if any.
+        with self.lock, self.store.lock:
+            if len(self.store) == 0:
+                self._reset()
+                return
+            first = self.store.first_open_time
+            if first != self._base_first:
+                # History was extended backwards, start over
+                self._reset()
+                self._base_first = first
+                start = int(bucket_start(first, self.interval))
+                # A bucket only partly covered by the base would get a wrong open
+                self._pending_from = start if start == first else int(bucket_end(start, self.interval))
+
+            rows = self.store.read(self._pending_from, tail=open_rows)
+            rows = rows[rows["open_time"] >= self._pending_from]
+            aggregated = resample_klines(rows, self.interval)
+            closed = aggregated["close_time"] <= self.store.last_close_time
+            if closed.any():
+                self._append_closed(aggregated[closed])
+                self._pending_from = int(aggregated["close_time"][closed][-1]) + 1
+            self._open = aggregated[~closed]
+
+    def read(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> np.ndarray:
+        with self.lock:
+            closed = self._closed[:self._length]
+            lo = np.searchsorted(closed["open_time"], start_ts, side="left") if start_ts is not None else 0
+            hi = np.searchsorted(closed["open_time"], end_ts, side="right") if end_ts is not None else len(closed)
+            open_rows = self._open
+            if start_ts is not None:
+                open_rows = open_rows[open_rows["open_time"] >= start_ts]
+            if end_ts is not None:
+                open_rows = open_rows[open_rows["open_time"] <= end_ts]
+            return np.concatenate([closed[lo:hi], open_rows])
+
+_resamplers: Dict[Tuple[str, str], Resampler] = {}
+_resamplers_lock = threading.Lock()
+
+def get_resampler(store: KlineStore, interval: str) -> Resampler:
+    key = (store.path, interval)
+    with _resamplers_lock:
+        if key not in _resamplers:
+            _resamplers[key] = Resampler(store, interval)
+        return _resamplers[key]
+
+def compare_klines(derived: np.ndarray, reference: np.ndarray) -> Dict[str, int]:
+    # Every column must match exactly: times and prices are copied, trade
+    # counts and volumes are summed exactly
+    result = {"rows": len(reference), "mismatched_rows": 0}
+    if len(derived) != len(reference) or not np.array_equal(derived["open_time"], reference["open_time"]):
+        result["mismatched_rows"] = len(reference)
+        return result
+    mismatched = np.zeros(len(reference), dtype=bool)
+    for name in reference.dtype.names:
+        mismatched |= derived[name] != reference[name]
+        result[f"{name}_mismatched"] = int(np.count_nonzero(derived[name] != reference[name]))
+    result["mismatched_rows"] = int(mismatched.sum())
+    return result
+
+def _open_fixture(path: str, mode: str):
+    return gzip.open(path, mode + "t") if path.endswith(".gz") else open(path, mode)
+
+def fixture_pairs(path: str) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    # (interval, resampled, Binance's own) for every interval recorded with
+    # `python -m src.data.resample record`, restricted to the buckets fully
+    # covered by the recorded base candles
+    with _open_fixture(path, "r") as f:
+        fixture = json.load(f)
+    klines = {interval: decode_klines(rows) for interval, rows in fixture["klines"].items()}
+    base = klines.pop(fixture["base"])
+    for interval, reference in klines.items():
+        derived = resample_klines(base, interval)
+        first = int(bucket_start(base["open_time"][0], interval))
+        if first != base["open_time"][0]:
+            first = int(bucket_end(first, interval))
+        last = base["close_time"][-1]
+        derived = derived[(derived["open_time"] >= first) & (derived["close_time"] <= last)]
+        reference = reference[(reference["open_time"] >= first) & (reference["close_time"] <= last)]
+        yield interval, derived, reference
+
+def main(argv=None):
+    # python -m src.data.resample record FIXTURE.json.gz --symbol BTCUSDT --days 3
+    # python -m src.data.resample check FIXTURE.json.gz
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Check resampled klines against Binance's own")
+    parser.add_argument("command", choices=["record", "check"])
+    parser.add_argument("fixture")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--base", default="1m")
+    parser.add_argument("--intervals", default="5m,15m,30m,1h,4h,1d")
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from src.api.binance_client import get_request_scheduler
+        scheduler = get_request_scheduler()
+        # Up to the last closed base candle, so every interval is recorded
+        # over the same closed history
+        step = INTERVAL_MS[args.base]
+        end_ts = int(time.time() * 1000) // step * step - 1
+        start_ts = (end_ts + 1) - args.days * 86_400_000
+
+        def download(interval: str):
+            rows, cursor = [], start_ts
+            while cursor < end_ts:
+                chunk = scheduler.get("v3/klines", {
+                    "symbol": args.symbol, "interval": interval,
+                    "startTime": cursor, "endTime": end_ts, "limit": 1000
+                }, weight=2)
+                if not chunk:
+                    break
+                rows.extend(chunk)
+                cursor = chunk[-1][0] + 1
+            return rows
+
+        fixture = {
+            "symbol": args.symbol,
+            "base": args.base,
+            "klines": {interval: download(interval) for interval in [args.base] + args.intervals.split(",")}
+        }
+        with _open_fixture(args.fixture, "w") as f:
+            json.dump(fixture, f)
+        return
+
+    for interval, derived, reference in fixture_pairs(args.fixture):
+        print(interval, compare_klines(derived, reference))
+
+if __name__ == "__main__":
+    main()
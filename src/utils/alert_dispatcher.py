@@ -0,0 +1,344 @@
+import heapq
+import itertools
+import logging
+import queue
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+from src.data.alert_rules import AlertRule, RuleEngine
+import config
+
+logger = logging.getLogger(__name__)
+
+# A rule that fired, with the values it compared: the feature and either
+# the threshold or the reference feature.
+class Alert(NamedTuple):
+    rule: AlertRule
+    value: float
+    reference_value: float
+    triggered_at: float
+    attempts: int = 0
+
+    @property
+    def symbol(self) -> str:
+        return self.rule.symbol
+
+    @property
+    def recipient_email(self) -> str:
+        return self.rule.subscriber
+
+# Keeps one SMTP connection open between sends and only reconnects (and
+# redoes STARTTLS/login) when the server has dropped it.
+class SMTPConnection:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        timeout: float = 30.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.connects = 0
+        self._server: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self.connects += 1
+        return server
+
+    def _is_alive(self) -> bool:
+        try:
+            return self._server is not None and self._server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+
+    def send(self, msg: MIMEMultipart):
+        if not self._is_alive():
+            self.close()
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._server = self._connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+def describe(alert: Alert) -> str:
+    rule = alert.rule
+    if rule.feature == "price" and rule.reference is None:
+        crossed = "rose above" if rule.direction > 0 else "fell below"
+        return (
+            f"Price Alert for {alert.symbol}:\n"
+            f"Current Price: {alert.value:.2f} USDT\n"
+            f"Target Price: {alert.reference_value:.2f} USDT\n"
+            f"The price {crossed} your target price.\n"
+        )
+    target = rule.reference or f"{rule.threshold:g}"
+    side = "above" if rule.direction > 0 else "below"
+    return (
+        f"{rule.feature} Alert for {alert.symbol}:\n"
+        f"{rule.feature}: {alert.value:.2f}\n"
+        f"{target}: {alert.reference_value:.2f}\n"
+        f"{rule.feature} crossed {side} {target}.\n"
+    )
+
+def build_digest(alerts: List[Alert], sender: str) -> MIMEMultipart:
+    symbols = sorted({alert.symbol for alert in alerts})
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = alerts[0].recipient_email
+    if len(alerts) == 1:
+        msg['Subject'] = f"Price Alert - {alerts[0].symbol}"
+    else:
+        msg['Subject'] = f"Price Alerts - {', '.join(symbols)}"
+
+    msg.attach(MIMEText("\n".join(describe(alert) for alert in alerts), 'plain'))
+    return msg
+
+# Alert rules are evaluated on every refresh but delivered from a background
+# worker, so a slow mail server never blocks rendering. A rule fires when
+# its condition becomes true (see RuleEngine) and, once delivered, stays
+# quiet for the cooldown even if the condition flips again. Alerts queued
+# within batch_window of each other are sent as one digest per recipient
+# over a single kept-alive SMTP connection.
+#
+# An alert only counts as fired once its digest has been sent. A failed
+# send is retried after retry_backoff, doubling each time, up to
+# max_attempts; until then the alert is pending and not queued again, and
+# after the last attempt the rule is re-armed.
+class AlertDispatcher:
+    def __init__(
+        self,
+        smtp: SMTPConnection,
+        sender: str,
+        batch_window: float = 5.0,
+        cooldown: float = 900.0,
+        retry_backoff: float = 30.0,
+        max_attempts: int = 5,
+        engine: Optional[RuleEngine] = None
+    ):
+        self.smtp = smtp
+        self.engine = engine if engine is not None else RuleEngine()
+        self.sender = sender
+        self.batch_window = batch_window
+        self.cooldown = cooldown
+        self.retry_backoff = retry_backoff
+        self.max_attempts = max_attempts
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.suppressed = 0
+        self._queue: "queue.Queue[Optional[Alert]]" = queue.Queue()
+        self._price_rules: Dict[Hashable, int] = {}
+        self._last_fired: Dict[int, float] = {}
+        self._pending: Set[int] = set()
+        self._retries: List[Tuple[float, int, Alert]] = []
+        self._retry_sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.smtp.close()
+
+    def watch_price(self, watcher: Hashable, symbol: str, target_price: float, recipient_email: str) -> int:
+        # One price rule per watcher (e.g. a dashboard session), replaced
+        # when its symbol, target or recipient changes
+        with self._lock:
+            rule_id = self._price_rules.get(watcher)
+            rule = self.engine.rules.get(rule_id) if rule_id is not None else None
+            if rule is not None and (rule.symbol, rule.threshold, rule.subscriber) == (symbol, float(target_price), recipient_email):
+                return rule_id
+            if rule_id is not None:
+                self._remove(rule_id)
+            rule_id = self.engine.add_price_rule(symbol, recipient_email, target_price)
+            self._price_rules[watcher] = rule_id
+            return rule_id
+
+    def unwatch(self, watcher: Hashable):
+        with self._lock:
+            rule_id = self._price_rules.pop(watcher, None)
+            if rule_id is not None:
+                self._remove(rule_id)
+
+    def prune_watchers(self, is_active: Callable[[Any], bool]):
+        # Drops the price rules of watchers that are gone, e.g. sessions
+        # that ended without turning their alert off
+        with self._lock:
+            for watcher in [watcher for watcher in self._price_rules if not is_active(watcher)]:
+                self._remove(self._price_rules.pop(watcher))
+
+    def _remove(self, rule_id: int):
+        # Alerts of the rule still queued or waiting for a retry are dropped
+        # when they come up for delivery
+        self.engine.remove(rule_id)
+        self._last_fired.pop(rule_id, None)
+
+    def check(self, symbol: str, features: Dict[str, float]) -> List[AlertRule]:
+        # Evaluates the symbol's rules and queues the ones that fired;
+        # returns those
+        fired = self.engine.evaluate(symbol, features)
+        now = time.time()
+        queued = []
+        with self._lock:
+            for rule in fired:
+                if rule.rule_id in self._pending:
+                    continue
+                if now - self._last_fired.get(rule.rule_id, float("-inf")) < self.cooldown:
+                    self.suppressed += 1
+                    continue
+                self._pending.add(rule.rule_id)
+                queued.append(rule)
+        for rule in queued:
+            reference_value = features[rule.reference] if rule.reference else rule.threshold
+            self._queue.put(Alert(rule, float(features[rule.feature]), float(reference_value), now))
+        return queued
+
+    def check_price(self, symbol: str, current_price: float, target_price: float, recipient_email: str) -> bool:
+        rule_id = self.watch_price((recipient_email, symbol), symbol, target_price, recipient_email)
+        return any(rule.rule_id == rule_id for rule in self.check(symbol, {"price": float(current_price)}))
+
+    def _collect_batch(self, first: Alert) -> Tuple[List[Alert], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, False
+            try:
+                alert = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, False
+            if alert is None:
+                return batch, True
+            batch.append(alert)
+
+    def _retry_wait(self) -> Optional[float]:
+        if not self._retries:
+            return None
+        return max(self._retries[0][0] - time.monotonic(), 0.0)
+
+    def _due_retries(self) -> List[Alert]:
+        due = []
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now:
+            due.append(heapq.heappop(self._retries)[2])
+        return due
+
+    def _sent(self, alerts: List[Alert]):
+        with self._lock:
+            for alert in alerts:
+                self._pending.discard(alert.rule.rule_id)
+                if alert.rule.rule_id in self.engine.rules:
+                    self._last_fired[alert.rule.rule_id] = alert.triggered_at
+            self.sent += len(alerts)
+
+    def _failed(self, alerts: List[Alert]):
+        for alert in alerts:
+            alert = alert._replace(attempts=alert.attempts + 1)
+            if alert.attempts < self.max_attempts:
+                due = time.monotonic() + self.retry_backoff * 2 ** (alert.attempts - 1)
+                heapq.heappush(self._retries, (due, next(self._retry_sequence), alert))
+                self.retried += 1
+                continue
+            self.engine.rearm(alert.rule.rule_id)
+            with self._lock:
+                self._pending.discard(alert.rule.rule_id)
+                self.failed += 1
+            logger.error(f"Giving up on {alert.rule.feature} alert for {alert.symbol} to {alert.recipient_email} after {alert.attempts} attempts")
+
+    def _deliver(self, batch: List[Alert]):
+        by_recipient: Dict[str, List[Alert]] = defaultdict(list)
+        with self._lock:
+            for alert in batch:
+                if alert.rule.rule_id in self.engine.rules:
+                    by_recipient[alert.recipient_email].append(alert)
+                else:
+                    self._pending.discard(alert.rule.rule_id)
+        for recipient, alerts in by_recipient.items():
+            try:
+                self.smtp.send(build_digest(alerts, self.sender))
+            except Exception as e:
+                logger.error(f"Error sending alert digest to {recipient}: {str(e)}")
+                self._failed(alerts)
+                continue
+            self._sent(alerts)
+            logger.info(f"Alert digest with {len(alerts)} alert(s) sent to {recipient}")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self._retry_wait())
+            except queue.Empty:
+                self._deliver(self._due_retries())
+                continue
+            if first is None:
+                break
+            batch, stopping = self._collect_batch(first)
+            self._deliver(batch + self._due_retries())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': self._queue.qsize(),
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'suppressed': self.suppressed
+        }
+
+_dispatcher: Optional[AlertDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_alert_dispatcher() -> AlertDispatcher:
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            smtp = SMTPConnection(
+                config.SMTP_SERVER,
+                config.SMTP_PORT,
+                config.SENDER_EMAIL,
+                config.SENDER_PASSWORD,
+                use_tls=config.SMTP_USE_TLS
+            )
+            _dispatcher = AlertDispatcher(
+                smtp,
+                config.SENDER_EMAIL,
+                batch_window=config.ALERT_BATCH_SECONDS,
+                cooldown=config.ALERT_COOLDOWN_SECONDS,
+                retry_backoff=config.ALERT_RETRY_SECONDS,
+                max_attempts=config.ALERT_MAX_ATTEMPTS
+            )
+            _dispatcher.start()
+        return _dispatcher
@@ -0,0 +1,163 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from src.data.kline_store import INTERVAL_MS
+from src.utils.metrics import get_metrics_registry
+import config
+
+# Process-wide cache shared by every Streamlit session and rerun. Entries
+# expire after a TTL and the least recently used ones are evicted once the
+# total size goes over max_bytes. Concurrent misses on the same key wait
+# for a single computation instead of all hitting Binance.
+#
+# Cached values are shared between sessions and must not be mutated.
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+# Serializes the computation of one key; dropped once nobody holds or waits
+# for it, so locks don't pile up for keys that are never seen again
+class _KeyLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+class DataCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # key -> (value, size, expires_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, _KeyLock] = {}
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        found, value = self._lookup(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: float) -> Any:
+        found, value = self._lookup(key)
+        if found:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = _KeyLock()
+            key_lock.users += 1
+        try:
+            with key_lock.lock:
+                # Another session may have filled the entry while we waited
+                found, value = self._lookup(key)
+                with self._lock:
+                    if found:
+                        self.hits += 1
+                    else:
+                        self.misses += 1
+                if not found:
+                    value = compute()
+                    # Failures (None) are not cached so the next caller retries
+                    if value is not None:
+                        self.set(key, value, ttl)
+        finally:
+            with self._lock:
+                key_lock.users -= 1
+                if key_lock.users == 0:
+                    del self._key_locks[key]
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def metric_samples(self):
+        stats = self.stats()
+        yield "cache_hits_total", "counter", {}, stats['hits']
+        yield "cache_misses_total", "counter", {}, stats['misses']
+        yield "cache_hit_ratio", "gauge", {}, stats['hit_rate']
+        yield "cache_evictions_total", "counter", {}, stats['evictions']
+        yield "cache_expirations_total", "counter", {}, stats['expirations']
+        yield "cache_entries", "gauge", {}, stats['entries']
+        yield "cache_bytes", "gauge", {}, stats['bytes']
+
+def candle_ttl(interval: str) -> float:
+    # Closed candles never change, only the open candle does, so a frame
+    # for a given interval only needs refetching as often as its last
+    # candle meaningfully moves.
+    return min(config.CACHE_MAX_TTL, max(config.CACHE_MIN_TTL, INTERVAL_MS[interval] / 1000 / 6))
+
+_cache: Optional[DataCache] = None
+_cache_lock = threading.Lock()
+
+def get_data_cache() -> DataCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DataCache(config.CACHE_MAX_BYTES)
+            get_metrics_registry().register_collector(_cache.metric_samples)
+        return _cache
@@ -0,0 +1,258 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import config
+
+logger = logging.getLogger(__name__)
+
+# In-process metrics for the fetch -> compute -> render pipeline: latency
+# histograms per span, counters, and collectors that report the state of
+# other components (request scheduler, data cache, stream) when scraped.
+# Exported in the Prometheus text format over HTTP and/or to a file.
+#
+# With METRICS_ENABLED=false, `timed` returns the function undecorated and
+# `span` returns a shared no-op context, so nothing is measured at all.
+
+PREFIX = "crypto"
+
+# Seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# (name, type, labels, value) as reported by collectors
+Sample = Tuple[str, str, Dict[str, str], float]
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    # Cumulative buckets for Prometheus plus a ring of the most recent
+    # observations from which p50/p95/p99 are computed exactly.
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, window: int = 1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._recent = np.zeros(window)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._recent[self.count % len(self._recent)] = value
+        self.count += 1
+        self.sum += value
+
+    def quantiles(self) -> Dict[float, float]:
+        recent = self._recent[:min(self.count, len(self._recent))]
+        if len(recent) == 0:
+            return {q: float("nan") for q in QUANTILES}
+        return dict(zip(QUANTILES, np.quantile(recent, QUANTILES).tolist()))
+
+class _Span:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry._observe(self.name, self.labels, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+_NULL_SPAN = nullcontext()
+
+def _escape(value: Any) -> str:
+    # Label values as the text exposition format requires: backslash,
+    # double quote and newline escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Iterable[Tuple[str, Any]]) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._spans: Dict[Tuple[str, Labels], Histogram] = {}
+        self._errors: Dict[Tuple[str, Labels], int] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **labels):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, tuple(sorted(labels.items())))
+
+    def timed(self, name: Optional[str] = None):
+        def decorator(func):
+            if not self.enabled:
+                return func
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, span_name, ()):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _observe(self, name: str, labels: Labels, seconds: float, failed: bool):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._spans.get(key)
+            if histogram is None:
+                histogram = self._spans[key] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collect(self) -> List[Sample]:
+        samples: List[Sample] = []
+        for collector in list(self._collectors):
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {str(e)}")
+        return samples
+
+    def span_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            stats = []
+            for (name, labels), histogram in sorted(self._spans.items()):
+                quantiles = histogram.quantiles()
+                stats.append({
+                    'span': name + _format_labels(labels),
+                    'count': histogram.count,
+                    'errors': self._errors.get((name, labels), 0),
+                    'mean_ms': histogram.sum / histogram.count * 1000,
+                    'p50_ms': quantiles[0.5] * 1000,
+                    'p95_ms': quantiles[0.95] * 1000,
+                    'p99_ms': quantiles[0.99] * 1000
+                })
+            return stats
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            counters = [(name, "counter", dict(labels), value) for (name, labels), value in self._counters.items()]
+        return counters + self._collect()
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            spans = [(key, h, h.quantiles(), list(h.counts), h.count, h.sum) for key, h in sorted(self._spans.items())]
+            errors = dict(self._errors)
+
+        name = f"{PREFIX}_span_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for (span_name, labels), histogram, _, counts, count, total in spans:
+            base = (("span", span_name),) + labels
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(base + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(base)} {total}")
+            lines.append(f"{name}_count{_format_labels(base)} {count}")
+
+        recent = f"{PREFIX}_span_duration_recent_seconds"
+        lines.append(f"# TYPE {recent} gauge")
+        for (span_name, labels), _, quantiles, _, _, _ in spans:
+            for q, value in quantiles.items():
+                lines.append(f"{recent}{_format_labels((('span', span_name),) + labels + (('quantile', q),))} {value}")
+
+        failures = f"{PREFIX}_span_errors_total"
+        lines.append(f"# TYPE {failures} counter")
+        for (span_name, labels), count in sorted(errors.items()):
+            lines.append(f"{failures}{_format_labels((('span', span_name),) + labels)} {count}")
+
+        typed = set()
+        for sample_name, kind, labels, value in sorted(self.samples(), key=lambda s: s[0]):
+            metric = f"{PREFIX}_{sample_name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} {kind}")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(sorted(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        # Atomic so a textfile collector never reads a partial file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+_registry = MetricsRegistry(config.METRICS_ENABLED)
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+def span(name: str, **labels):
+    return _registry.span(name, **labels)
+
+def timed(name: Optional[str] = None):
+    return _registry.timed(name)
+
+def inc(name: str, value: float = 1.0, **labels):
+    _registry.inc(name, value, **labels)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int, host: str = config.METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    # One /metrics endpoint per process, however often this is called
+    global _server
+    with _server_lock:
+        if _server is None and _registry.enabled and port:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.error(f"Error starting metrics endpoint on {host}:{port}: {str(e)}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
+
+def export_metrics():
+    # Called once per refresh/pass; the HTTP endpoint needs no export
+    if _registry.enabled and config.METRICS_FILE:
+        try:
+            _registry.write_prometheus(config.METRICS_FILE)
+        except OSError as e:
+            logger.error(f"Error writing metrics file: {str(e)}")
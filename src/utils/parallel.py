@@ -0,0 +1,85 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import config
+
+# Process pool for CPU-bound analytics, with inputs and outputs passed as
+# NumPy arrays in shared memory: tasks receive small specs, map the inputs
+# and write their slice of the outputs, so nothing large is pickled.
+
+# (shared memory name, shape, dtype)
+ArraySpec = Tuple[str, Tuple[int, ...], str]
+
+class SharedArrays:
+    # Owns the blocks it creates; they are unlinked on release()
+    def __init__(self):
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+    def create(self, shape: Tuple[int, ...], dtype, fill=None) -> Tuple[np.ndarray, ArraySpec]:
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self._blocks.append(block)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        if fill is not None:
+            array.fill(fill)
+        return array, (block.name, tuple(shape), dtype.str)
+
+    def share(self, source: np.ndarray) -> Tuple[np.ndarray, ArraySpec]:
+        array, spec = self.create(source.shape, source.dtype)
+        array[...] = source
+        return array, spec
+
+    def release(self):
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Still viewed by an array, unmapped once that is collected
+                pass
+            block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+@contextmanager
+def attached(*specs: ArraySpec) -> Iterator[List[np.ndarray]]:
+    # Pool workers share the parent's resource tracker, so attaching does
+    # not make the worker an owner of the block
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    try:
+        yield [
+            np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            for block, (_, shape, dtype) in zip(blocks, specs)
+        ]
+    finally:
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    # forkserver rather than fork: the app and collector run threads, and
+    # forking while one of them holds a lock can deadlock the child
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=config.ANALYTICS_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
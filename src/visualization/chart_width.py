@@ -0,0 +1,22 @@
+import os
+
+import streamlit.components.v1 as components
+import config
+
+_component = components.declare_component(
+    "chart_width", path=os.path.join(os.path.dirname(__file__), "chart_width")
+)
+
+# Points per trace for a chart spanning the column this is called in: one
+# per device pixel of its width as reported by the browser, kept within
+# [CHART_MIN_POINTS, CHART_MAX_POINTS] (the value comes from the client),
+# or CHART_MAX_POINTS until the first report arrives.
+def chart_max_points() -> int:
+    return points_for_width(_component(key="chart_width", default=None))
+
+def points_for_width(width) -> int:
+    try:
+        width = int(width)
+    except (TypeError, ValueError):
+        return config.CHART_MAX_POINTS
+    return min(max(width, config.CHART_MIN_POINTS), config.CHART_MAX_POINTS)
@@ -1,32 +1,43 @@
+from typing import List
+
+import numpy as np
 import plotly.graph_objs as go
 import pandas as pd
 import streamlit as st
+from src.visualization.downsampling import aggregate_ohlc, downsample_line
+from src.utils.metrics import timed
+import config
 
-def plot_candlestick(df: pd.DataFrame, symbol: str):
+def candlestick_figure(df: pd.DataFrame, symbol: str, max_points: int = config.CHART_MAX_POINTS) -> go.Figure:
+    ma_periods = [20, 50, 200]
+    # Moving averages come from the same buckets as the candles, so the lines
+    # stay aligned with them at every zoom level
+    candles = aggregate_ohlc(df, max_points, last=[f'MA_{period}' for period in ma_periods])
     trace_candle = go.Candlestick(
-        x=df.index,
-        open=df['open'],
-        high=df['high'],
-        low=df['low'],
-        close=df['close'],
+        x=candles.index,
+        open=candles['open'],
+        high=candles['high'],
+        low=candles['low'],
+        close=candles['close'],
         name="Candlestick"
     )
     
     traces = [trace_candle]
     ma_colors = ['blue', 'orange', 'red']
     
-    for (period, color) in zip([20, 50, 200], ma_colors):
-        if f'MA_{period}' in df.columns:
+    for (period, color) in zip(ma_periods, ma_colors):
+        if f'MA_{period}' in candles.columns:
+            line = candles[f'MA_{period}'].dropna()
             traces.append(go.Scatter(
-                x=df.index,
-                y=df[f'MA_{period}'],
+                x=line.index,
+                y=line,
                 name=f'MA {period}',
                 line=dict(color=color)
             ))
     
     traces.append(go.Bar(
-        x=df.index,
-        y=df['volume'],
+        x=candles.index,
+        y=candles['volume'],
         name="Volume",
         yaxis="y2",
         opacity=0.3
@@ -48,15 +59,19 @@ def plot_candlestick(df: pd.DataFrame, symbol: str):
         height=800
     )
 
-    fig = go.Figure(data=traces, layout=layout)
-    st.plotly_chart(fig, use_container_width=True)
+    return go.Figure(data=traces, layout=layout)
+
+@timed()
+def plot_candlestick(df: pd.DataFrame, symbol: str, max_points: int = config.CHART_MAX_POINTS):
+    st.plotly_chart(candlestick_figure(df, symbol, max_points), use_container_width=True)
 
-def plot_price_evolution(df: pd.DataFrame, symbol: str):
+def price_evolution_figure(df: pd.DataFrame, symbol: str, max_points: int = config.CHART_MAX_POINTS) -> go.Figure:
     fig = go.Figure()
     
+    line = downsample_line(df['close'], max_points, config.CHART_LINE_DOWNSAMPLING)
     fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['close'],
+        x=line.index,
+        y=line,
         name="Closing Price",
         line=dict(color='blue')
     ))
@@ -67,5 +82,30 @@ def plot_price_evolution(df: pd.DataFrame, symbol: str):
         yaxis_title="Price (USDT)",
         height=400
     )
-    
+    return fig
+
+@timed()
+def plot_price_evolution(df: pd.DataFrame, symbol: str, max_points: int = config.CHART_MAX_POINTS):
+    st.plotly_chart(price_evolution_figure(df, symbol, max_points), use_container_width=True)
+
+@timed()
+def plot_correlation_heatmap(symbols: List[str], correlation: np.ndarray, title: str = "Return Correlation"):
+    fig = go.Figure(go.Heatmap(
+        z=correlation,
+        x=symbols,
+        y=symbols,
+        zmin=-1,
+        zmax=1,
+        colorscale="RdBu",
+        reversescale=True,
+        text=np.round(correlation, 2),
+        texttemplate="%{text}"
+    ))
+
+    fig.update_layout(
+        title=title,
+        yaxis=dict(autorange="reversed"),
+        height=500
+    )
+
     st.plotly_chart(fig, use_container_width=True)
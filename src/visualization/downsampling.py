@@ -0,0 +1,96 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# Level-of-detail reduction applied before handing data to Plotly: a chart
+# cannot show more candles than it has horizontal pixels, so anything past
+# that only costs serialization time and browser memory.
+
+def bucket_size(n: int, max_buckets: int, align_end: bool = False) -> int:
+    # Candles per bucket when aggregating n candles into at most max_buckets
+    if n <= max_buckets:
+        return 1
+    if align_end:
+        return -(-(n - 1) // max(max_buckets - 1, 1))
+    return -(-n // max_buckets)
+
+def aggregate_ohlc(df: pd.DataFrame, max_buckets: int, last: Sequence[str] = (), align_end: bool = False) -> pd.DataFrame:
+    # Merges runs of consecutive candles into one OHLCV candle each, keyed by
+    # the first candle's timestamp. Columns in `last` (e.g. moving averages)
+    # are sampled at each bucket's last candle, like its close, so they line
+    # up with the aggregated candles. With align_end the last candle starts
+    # a bucket of its own (the first bucket is the partial one), so candles
+    # added later fill it up.
+    last = [name for name in last if name in df.columns]
+    n = len(df)
+    size = bucket_size(n, max_buckets, align_end)
+    if size == 1:
+        return df[["open", "high", "low", "close", "volume"] + last]
+    if align_end:
+        starts = np.arange((n - 1) % size, n, size)
+        if starts[0]:
+            starts = np.r_[0, starts]
+    else:
+        starts = np.arange(0, n, size)
+    ends = np.r_[starts[1:], n] - 1
+    columns = {
+        "open": df["open"].to_numpy()[starts],
+        "high": np.maximum.reduceat(df["high"].to_numpy(), starts),
+        "low": np.minimum.reduceat(df["low"].to_numpy(), starts),
+        "close": df["close"].to_numpy()[ends],
+        "volume": np.add.reduceat(df["volume"].to_numpy(), starts),
+    }
+    for name in last:
+        columns[name] = df[name].to_numpy()[ends]
+    return pd.DataFrame(columns, index=df.index[starts])
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps, per bucket, the point forming the
+    # largest triangle with the previously kept point and the next bucket's
+    # average, which preserves the visual shape of the line. Returns indices.
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+def minmax_decimate(y: np.ndarray, max_points: int) -> np.ndarray:
+    # Keeps the minimum and maximum of each bucket, in time order, so spikes
+    # survive. Returns indices.
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    size = -(-n // max(max_points // 2, 1))
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.nanargmin(blocks, axis=1)
+    highs = offsets + np.nanargmax(blocks, axis=1)
+    return np.unique(np.concatenate([lows, highs]))
+
+def downsample_line(series: pd.Series, max_points: int, method: str = "lttb") -> pd.Series:
+    valid = series.dropna()
+    if len(valid) <= max_points:
+        return valid
+    if method == "minmax":
+        indices = minmax_decimate(valid.to_numpy(), max_points)
+    else:
+        indices = lttb(valid.index.asi8, valid.to_numpy(), max_points)
+    return valid.iloc[indices]
@@ -0,0 +1,229 @@
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from src.utils.metrics import span
+from src.visualization.downsampling import aggregate_ohlc, bucket_size, downsample_line
+import config
+
+# Charts that are sent to the browser once and then only receive deltas
+# through Streamlit's add_rows. add_rows can only append, so every row
+# carries a `key` and a `seq` (refresh counter) and the Vega-Lite spec keeps,
+# per key, only the row with the highest seq. The chart's tail (the open
+# candle, or the last downsampled bucket it falls in) is re-sent under the
+# same key on every refresh and therefore replaced in place on the client.
+# Every row also carries the window's first candle (`start`) as of when it
+# was sent; the spec hides rows older than the latest one, so a sliding
+# window only trims its leading rows.
+#
+# Anything that can't be expressed that way rebuilds the chart from
+# scratch: the window's start moving back or past the chart's tail, the
+# tail growing past one bucket of the downsampled history (so appended rows
+# never mix resolutions), or rebuild_rows rows having been appended since
+# the last build (so the client-side dataset stays bounded).
+
+LATEST_ONLY = [
+    {
+        "window": [{"op": "row_number", "as": "version"}],
+        "groupby": ["key"],
+        "sort": [{"field": "seq", "order": "descending"}]
+    },
+    {"filter": "datum.version == 1"},
+    {"joinaggregate": [{"op": "max", "field": "start", "as": "window_start"}]},
+    {"filter": "datum.timestamp >= datum.window_start"}
+]
+
+MA_COLORS = {"MA_20": "blue", "MA_50": "orange", "MA_200": "red"}
+
+class _LiveChart:
+    columns: List[str] = []
+
+    def __init__(
+        self,
+        symbol: str,
+        max_points: int = config.CHART_MAX_POINTS,
+        rebuild_rows: int = config.CHART_REBUILD_ROWS
+    ):
+        self.symbol = symbol
+        self.max_points = max_points
+        self.rebuild_rows = rebuild_rows
+        self.rows_sent = 0
+        self.rebuilds = 0
+        self._element = None
+        self._start: Optional[pd.Timestamp] = None
+        self._tail: Optional[pd.Timestamp] = None
+        self._bucket = 1
+        self._appended = 0
+        self._last_sent: Optional[pd.DataFrame] = None
+        self._seq = 0
+
+    def _spec(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _history(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Initial, possibly downsampled, candles
+        return df
+
+    def _merge(self, tail: pd.DataFrame) -> pd.DataFrame:
+        # The downsampled history's last bucket as one row
+        return tail.iloc[[-1]]
+
+    def _bucket_size(self, df: pd.DataFrame, history: pd.DataFrame) -> int:
+        # Candles the history's last row may stand for before a rebuild
+        return -(-len(df) // max(len(history), 1))
+
+    def _rows(self, df: pd.DataFrame, key: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        rows = df.reindex(columns=self.columns).rename_axis("timestamp").reset_index()
+        rows["key"] = rows["timestamp"] if key is None else key
+        rows["start"] = self._start
+        rows["seq"] = self._seq
+        return rows
+
+    def _build(self, container, df: pd.DataFrame) -> pd.DataFrame:
+        history = self._history(df)
+        self._bucket = self._bucket_size(df, history)
+        self._start, self._tail = df.index[0], history.index[-1]
+        self._appended = 0
+        self._last_sent = None
+        data = self._rows(history)
+        self._element = container.vega_lite_chart(data, self._spec(), use_container_width=True)
+        self.rebuilds += 1
+        return data
+
+    def _delta(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        # Rows replacing the chart's tail, or None if it has to be rebuilt
+        if self._element is None or not self._start <= df.index[0] <= self._tail:
+            return None
+        self._start = df.index[0]
+        tail = df[df.index >= self._tail]
+        if self._bucket == 1:
+            data = self._rows(tail)
+        elif len(tail) <= self._bucket:
+            data = self._rows(self._merge(tail), key=self._tail)
+        else:
+            return None
+        if self._appended + len(data) > self.rebuild_rows:
+            return None
+        if self._bucket == 1:
+            self._tail = tail.index[-1]
+        return data
+
+    def render(self, container, df: pd.DataFrame) -> pd.DataFrame:
+        # The chart is created in `container` on the first call and whenever
+        # it has to be rebuilt. Returns the rows sent to the browser.
+        data = self._delta(df) if len(df) else None
+        update = "full" if data is None else "delta"
+        with span("live_chart_render", chart=type(self).__name__, update=update):
+            if data is None:
+                data = self._build(container, df)
+            else:
+                unchanged = data.drop(columns="seq")
+                if self._last_sent is not None and unchanged.equals(self._last_sent):
+                    data = data.iloc[:0]
+                else:
+                    self._element.add_rows(data)
+                    self._appended += len(data)
+                    self._last_sent = unchanged
+            self.rows_sent += len(data)
+            self._seq += 1
+            return data
+
+class LiveCandlestickChart(_LiveChart):
+    columns = ["open", "high", "low", "close", "volume"] + list(MA_COLORS)
+
+    def _history(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Aligned to the last candle, so the candles that open after a
+        # build fill up a bucket before the next rebuild
+        candles = aggregate_ohlc(df, self.max_points, last=list(MA_COLORS), align_end=True)
+        return df if len(candles) == len(df) else candles
+
+    def _bucket_size(self, df: pd.DataFrame, history: pd.DataFrame) -> int:
+        return bucket_size(len(df), self.max_points, align_end=True)
+
+    def _merge(self, tail: pd.DataFrame) -> pd.DataFrame:
+        candle = tail.iloc[[-1]].copy()
+        candle["open"] = tail["open"].iloc[0]
+        candle["high"] = tail["high"].max()
+        candle["low"] = tail["low"].min()
+        candle["volume"] = tail["volume"].sum()
+        candle.index = tail.index[:1]
+        return candle
+
+    def _spec(self) -> Dict[str, Any]:
+        x = {"field": "timestamp", "type": "temporal", "title": "Date"}
+        color = {
+            "condition": {"test": "datum.open <= datum.close", "value": "#26a69a"},
+            "value": "#ef5350"
+        }
+        price_scale = {"zero": False}
+        return {
+            "title": f"{self.symbol} Technical Analysis",
+            "height": 800,
+            "transform": LATEST_ONLY,
+            "layer": [
+                {
+                    "layer": [
+                        {
+                            "mark": "rule",
+                            "encoding": {
+                                "x": x,
+                                "y": {"field": "low", "type": "quantitative", "scale": price_scale,
+                                      "title": "Price (USDT)"},
+                                "y2": {"field": "high"},
+                                "color": color
+                            }
+                        },
+                        {
+                            "mark": "bar",
+                            "encoding": {
+                                "x": x,
+                                "y": {"field": "open", "type": "quantitative", "scale": price_scale},
+                                "y2": {"field": "close"},
+                                "color": color
+                            }
+                        },
+                        {
+                            "transform": [{"fold": list(MA_COLORS), "as": ["series", "value"]}],
+                            "mark": "line",
+                            "encoding": {
+                                "x": x,
+                                "y": {"field": "value", "type": "quantitative", "scale": price_scale},
+                                "color": {
+                                    "field": "series",
+                                    "type": "nominal",
+                                    "scale": {"domain": list(MA_COLORS), "range": list(MA_COLORS.values())},
+                                    "title": None
+                                }
+                            }
+                        }
+                    ]
+                },
+                {
+                    "mark": {"type": "bar", "opacity": 0.3},
+                    "encoding": {
+                        "x": x,
+                        "y": {"field": "volume", "type": "quantitative", "title": "Volume",
+                              "axis": {"orient": "right"}}
+                    }
+                }
+            ],
+            "resolve": {"scale": {"y": "independent"}}
+        }
+
+class LivePriceChart(_LiveChart):
+    columns = ["close"]
+
+    def _history(self, df: pd.DataFrame) -> pd.DataFrame:
+        return downsample_line(df["close"], self.max_points, config.CHART_LINE_DOWNSAMPLING).to_frame()
+
+    def _spec(self) -> Dict[str, Any]:
+        return {
+            "title": f"{self.symbol} Price Evolution",
+            "height": 400,
+            "transform": LATEST_ONLY,
+            "mark": {"type": "line", "color": "blue"},
+            "encoding": {
+                "x": {"field": "timestamp", "type": "temporal", "title": "Date"},
+                "y": {"field": "close", "type": "quantitative", "scale": {"zero": False},
+                      "title": "Price (USDT)"}
+            }
+        }
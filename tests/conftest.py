@@ -0,0 +1,11 @@
+import pytest
+
+import config
+
+@pytest.fixture
+def store_root(tmp_path, monkeypatch):
+    # Every test gets its own kline store directory (stores and resamplers
+    # are cached per path)
+    root = str(tmp_path / "klines")
+    monkeypatch.setattr(config, "KLINE_STORE_DIR", root)
+    return root
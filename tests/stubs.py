@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.data.resample import resample_klines
+
+# BinanceAPI stand-in serving klines of every interval from one in-memory 1m
+# series, the way the fake server derives them. Chunks starting at or after
+# `fail_from` fail like a request that ran out of retries; every request is
+# recorded as (interval, start_ts, end_ts).
+class KlineClient:
+    read_only = False
+    stream = None
+
+    def __init__(self, rows: np.ndarray, fail_from=None):
+        self.rows = rows
+        self.fail_from = fail_from
+        self.requests = []
+        self._resampled = {}
+
+    def _select(self, interval, start_ts, end_ts, limit):
+        self.requests.append((interval, start_ts, end_ts))
+        if interval != "1m" and interval not in self._resampled:
+            self._resampled[interval] = resample_klines(self.rows, interval)
+        rows = self.rows if interval == "1m" else self._resampled[interval]
+        open_time = rows["open_time"]
+        return rows[(open_time >= start_ts) & (open_time <= end_ts)][:limit]
+
+    def get_klines_array(self, symbol, interval, start_ts, end_ts, limit=1000):
+        if self.fail_from is not None and start_ts >= self.fail_from:
+            self.requests.append((interval, start_ts, end_ts))
+            return None
+        return self._select(interval, start_ts, end_ts, limit)
+
+    def get_historical_klines(self, symbol, interval, start_str, end_str, limit):
+        return self._select(interval, int(start_str), int(end_str), 10**9).tolist()
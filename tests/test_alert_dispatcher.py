@@ -0,0 +1,103 @@
+import socket
+import time
+from email import message_from_bytes
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from src.utils.alert_dispatcher import AlertDispatcher, SMTPConnection
+
+# Local SMTP server keeping every accepted message; the next `fail` DATA
+# commands are refused with a temporary error.
+class _Handler:
+    def __init__(self):
+        self.messages = []
+        self.fail = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail:
+            self.fail -= 1
+            return "451 Try again later"
+        self.messages.append(message_from_bytes(envelope.content))
+        return "250 OK"
+
+@pytest.fixture
+def smtp_server():
+    # The controller checks it is up by connecting, so it needs a real port
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = _Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+@pytest.fixture
+def dispatcher(smtp_server):
+    handler, port = smtp_server
+    dispatcher = AlertDispatcher(
+        SMTPConnection("127.0.0.1", port, use_tls=False, timeout=5),
+        "alerts@example.com",
+        batch_window=0.2,
+        cooldown=60,
+        retry_backoff=0.1,
+        max_attempts=3
+    )
+    dispatcher.start()
+    yield handler, dispatcher
+    dispatcher.stop()
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_alerts_within_batch_window_are_one_digest(dispatcher):
+    handler, dispatcher = dispatcher
+    assert dispatcher.check_price("BTCUSDT", 99.0, 100.0, "a@example.com")
+    assert dispatcher.check_price("ETHUSDT", 9.0, 10.0, "a@example.com")
+    assert dispatcher.check_price("BTCUSDT", 99.0, 100.0, "b@example.com")
+    _wait_for(lambda: dispatcher.sent == 3)
+
+    digests = {msg["To"]: msg for msg in handler.messages}
+    assert len(handler.messages) == 2
+    assert digests["a@example.com"]["Subject"] == "Price Alerts - BTCUSDT, ETHUSDT"
+    assert digests["b@example.com"]["Subject"] == "Price Alert - BTCUSDT"
+    assert dispatcher.smtp.connects == 1
+
+    # Fired alerts stay quiet while the price stays below the target
+    assert not dispatcher.check_price("BTCUSDT", 98.0, 100.0, "a@example.com")
+
+def test_failed_send_is_retried_before_counting_as_fired(dispatcher):
+    handler, dispatcher = dispatcher
+    handler.fail = 2
+    assert dispatcher.check_price("BTCUSDT", 99.0, 100.0, "a@example.com")
+    _wait_for(lambda: dispatcher.retried >= 1)
+
+    # Pending, so not queued a second time
+    assert not dispatcher.check_price("BTCUSDT", 98.0, 100.0, "a@example.com")
+    assert dispatcher.stats()["suppressed"] == 0
+
+    _wait_for(lambda: dispatcher.sent == 1)
+    assert dispatcher.stats() == {"queued": 0, "sent": 1, "retried": 2, "failed": 0, "suppressed": 0}
+    assert len(handler.messages) == 1
+
+    # Once delivered, the cooldown applies from the alert's crossing
+    assert not dispatcher.check_price("BTCUSDT", 101.0, 100.0, "a@example.com")
+    assert not dispatcher.check_price("BTCUSDT", 99.0, 100.0, "a@example.com")
+    assert dispatcher.stats()["suppressed"] == 1
+
+def test_alert_fires_again_after_giving_up(dispatcher):
+    handler, dispatcher = dispatcher
+    handler.fail = 3
+    assert dispatcher.check_price("BTCUSDT", 99.0, 100.0, "a@example.com")
+    _wait_for(lambda: dispatcher.failed == 1)
+    assert dispatcher.retried == 2
+    assert not handler.messages
+
+    # Nothing was delivered, so neither the crossing nor the cooldown count
+    assert dispatcher.check_price("BTCUSDT", 99.0, 100.0, "a@example.com")
+    _wait_for(lambda: dispatcher.sent == 1)
+    assert len(handler.messages) == 1
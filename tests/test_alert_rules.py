@@ -0,0 +1,139 @@
+import math
+import time
+
+from src.data.alert_rules import ABOVE, BELOW, RuleEngine
+from src.utils.alert_dispatcher import AlertDispatcher
+
+def _fired(engine, symbol, fast, slow):
+    return [rule.rule_id for rule in engine.evaluate(symbol, {"MA_20": fast, "MA_50": slow})]
+
+def test_crossover_fires_on_the_cross_only():
+    engine = RuleEngine()
+    up = engine.add_crossover_rule("BTCUSDT", "a@example.com", 20, 50, ABOVE)
+    down = engine.add_crossover_rule("BTCUSDT", "a@example.com", 20, 50, BELOW)
+
+    # The first evaluation fires whichever side the averages are on
+    assert _fired(engine, "BTCUSDT", 1.0, 2.0) == [down]
+    assert _fired(engine, "BTCUSDT", 1.5, 2.0) == []
+    assert _fired(engine, "BTCUSDT", 3.0, 2.0) == [up]
+    assert _fired(engine, "BTCUSDT", 4.0, 2.0) == []
+    # Touching counts as below
+    assert _fired(engine, "BTCUSDT", 2.0, 2.0) == [down]
+    assert _fired(engine, "BTCUSDT", 3.0, 2.0) == [up]
+
+def test_missing_features_keep_the_state():
+    engine = RuleEngine()
+    up = engine.add_crossover_rule("BTCUSDT", "a@example.com", 20, 50, ABOVE)
+    assert _fired(engine, "BTCUSDT", 3.0, 2.0) == [up]
+    assert _fired(engine, "BTCUSDT", math.nan, 2.0) == []
+    assert engine.evaluate("BTCUSDT", {"price": 1.0}) == []
+    assert _fired(engine, "BTCUSDT", 3.0, 2.0) == []
+
+def test_rules_are_per_symbol_and_removable():
+    engine = RuleEngine()
+    btc = engine.add_price_rule("BTCUSDT", "a@example.com", 100.0, BELOW)
+    eth = engine.add_price_rule("ETHUSDT", "a@example.com", 10.0, BELOW)
+    assert [r.rule_id for r in engine.evaluate("BTCUSDT", {"price": 99.0})] == [btc]
+    assert [r.rule_id for r in engine.evaluate("ETHUSDT", {"price": 9.0})] == [eth]
+    assert engine.required_features("BTCUSDT") == {"price"}
+
+    engine.remove(btc)
+    engine.evaluate("BTCUSDT", {"price": 101.0})
+    assert engine.evaluate("BTCUSDT", {"price": 99.0}) == []
+
+    engine.rearm(eth)
+    assert [r.rule_id for r in engine.evaluate("ETHUSDT", {"price": 9.0})] == [eth]
+
+class _SMTP:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, msg):
+        self.messages.append(msg)
+
+    def close(self):
+        pass
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_dispatcher_cooldown_applies_to_crossovers():
+    smtp = _SMTP()
+    dispatcher = AlertDispatcher(smtp, "alerts@example.com", batch_window=0.05, cooldown=0.5)
+    dispatcher.start()
+    try:
+        rule_id = dispatcher.engine.add_crossover_rule("BTCUSDT", "a@example.com", 20, 50, ABOVE)
+        features = {"MA_20": 3.0, "MA_50": 2.0}
+        assert [r.rule_id for r in dispatcher.check("BTCUSDT", features)] == [rule_id]
+        _wait_for(lambda: dispatcher.sent == 1)
+        body = smtp.messages[0].get_payload()[0].get_payload()
+        assert "MA_20 crossed above MA_50" in body
+
+        # Crossing back and forth within the cooldown is suppressed
+        dispatcher.check("BTCUSDT", {"MA_20": 1.0, "MA_50": 2.0})
+        assert dispatcher.check("BTCUSDT", features) == []
+        assert dispatcher.suppressed == 1
+
+        time.sleep(0.5)
+        dispatcher.check("BTCUSDT", {"MA_20": 1.0, "MA_50": 2.0})
+        assert [r.rule_id for r in dispatcher.check("BTCUSDT", features)] == [rule_id]
+        _wait_for(lambda: dispatcher.sent == 2)
+    finally:
+        dispatcher.stop()
+
+def test_changing_the_target_replaces_the_price_rule():
+    dispatcher = AlertDispatcher(_SMTP(), "alerts@example.com")
+    first = dispatcher.watch_price("session", "BTCUSDT", 100.0, "a@example.com")
+    assert dispatcher.watch_price("session", "BTCUSDT", 100.0, "a@example.com") == first
+    second = dispatcher.watch_price("session", "BTCUSDT", 90.0, "a@example.com")
+    assert second != first
+    assert list(dispatcher.engine.rules) == [second]
+    # Only the new target is checked
+    assert not dispatcher.check("BTCUSDT", {"price": 95.0})
+    assert [r.rule_id for r in dispatcher.check("BTCUSDT", {"price": 89.0})] == [second]
+
+    # A new address or symbol replaces the rule too
+    third = dispatcher.watch_price("session", "BTCUSDT", 90.0, "b@example.com")
+    fourth = dispatcher.watch_price("session", "ETHUSDT", 90.0, "b@example.com")
+    assert list(dispatcher.engine.rules) == [fourth]
+    assert third != fourth
+
+def test_disabled_alert_stops_firing():
+    smtp = _SMTP()
+    dispatcher = AlertDispatcher(smtp, "alerts@example.com", batch_window=0.05, cooldown=0.0)
+    dispatcher.start()
+    try:
+        dispatcher.watch_price("session", "BTCUSDT", 100.0, "a@example.com")
+        assert dispatcher.check("BTCUSDT", {"price": 99.0})
+        _wait_for(lambda: dispatcher.sent == 1)
+
+        dispatcher.unwatch("session")
+        dispatcher.check("BTCUSDT", {"price": 101.0})
+        assert dispatcher.check("BTCUSDT", {"price": 99.0}) == []
+        assert dispatcher.engine.rules == {}
+    finally:
+        dispatcher.stop()
+    assert len(smtp.messages) == 1
+
+def test_alert_of_a_removed_rule_is_not_sent():
+    smtp = _SMTP()
+    dispatcher = AlertDispatcher(smtp, "alerts@example.com", batch_window=0.05)
+    dispatcher.watch_price("session", "BTCUSDT", 100.0, "a@example.com")
+    assert dispatcher.check("BTCUSDT", {"price": 99.0})
+    # Turned off while the alert was still queued
+    dispatcher.unwatch("session")
+    dispatcher.start()
+    dispatcher.stop()
+    assert smtp.messages == []
+    assert dispatcher.sent == 0
+
+def test_rules_of_ended_sessions_are_pruned():
+    dispatcher = AlertDispatcher(_SMTP(), "alerts@example.com")
+    dispatcher.watch_price("ended", "BTCUSDT", 100.0, "a@example.com")
+    kept = dispatcher.watch_price("active", "BTCUSDT", 100.0, "b@example.com")
+    dispatcher.prune_watchers(lambda session_id: session_id == "active")
+    assert list(dispatcher.engine.rules) == [kept]
+    assert [r.subscriber for r in dispatcher.check("BTCUSDT", {"price": 99.0})] == ["b@example.com"]
@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import synthesize
+from src.data.archive import DAY_MS, read_kline_array, read_klines, write_klines
+from src.data.kline_decoder import klines_frame
+
+SYMBOL = "ARCHUSDT"
+ROWS = synthesize([SYMBOL], 3)[SYMBOL]
+
+def _days(root: str):
+    base = os.path.join(root, f"symbol={SYMBOL}", "interval=1m")
+    return {day: os.listdir(os.path.join(base, day)) for day in sorted(os.listdir(base))}
+
+def test_overlapping_writes_merge_across_days(tmp_path):
+    root = str(tmp_path)
+    half = len(ROWS) // 2
+    write_klines(ROWS[:half], SYMBOL, "1m", root, "parquet")
+    write_klines(ROWS[half - 500:], SYMBOL, "1m", root, "parquet")
+
+    np.testing.assert_array_equal(read_kline_array(SYMBOL, "1m", root=root), ROWS)
+    # One file per UTC day the candles fall in
+    days = {int(t) // DAY_MS for t in ROWS["open_time"]}
+    assert len(_days(root)) == len(days)
+    assert all(files == ["part-0.parquet"] for files in _days(root).values())
+
+def test_written_rows_win_over_stored_ones(tmp_path):
+    root = str(tmp_path)
+    write_klines(ROWS, SYMBOL, "1m", root, "parquet")
+    revised = ROWS[1000:1010].copy()
+    revised["close"] += 1.0
+    write_klines(revised, SYMBOL, "1m", root, "parquet")
+
+    stored = read_kline_array(SYMBOL, "1m", root=root)
+    assert len(stored) == len(ROWS)
+    np.testing.assert_array_equal(stored["close"][1000:1010], revised["close"])
+    np.testing.assert_array_equal(stored["close"][:1000], ROWS["close"][:1000])
+    np.testing.assert_array_equal(stored["close"][1010:], ROWS["close"][1010:])
+
+def test_frames_round_trip_with_selected_columns(tmp_path):
+    root = str(tmp_path)
+    write_klines(klines_frame(ROWS), SYMBOL, "1m", root, "parquet")
+
+    start, end = int(ROWS["open_time"][100]), int(ROWS["open_time"][2999])
+    df = read_klines(SYMBOL, "1m", start, end, columns=["close", "volume"], root=root)
+    expected = klines_frame(ROWS[100:3000])[["close", "volume"]]
+    pd.testing.assert_frame_equal(df, expected)
+
+def test_days_in_different_formats_read_together(tmp_path):
+    root = str(tmp_path)
+    boundary = int(np.searchsorted(ROWS["open_time"], (int(ROWS["open_time"][0]) // DAY_MS + 1) * DAY_MS))
+    write_klines(ROWS[:boundary], SYMBOL, "1m", root, "parquet")
+    write_klines(ROWS[boundary:], SYMBOL, "1m", root, "arrow")
+    formats = {files[0].rsplit(".", 1)[1] for files in _days(root).values()}
+    assert formats == {"parquet", "arrow"}
+
+    np.testing.assert_array_equal(read_kline_array(SYMBOL, "1m", root=root), ROWS)
+    start = int(ROWS["open_time"][boundary - 10])
+    end = int(ROWS["open_time"][boundary + 9])
+    df = read_klines(SYMBOL, "1m", start, end, columns=["close"], root=root)
+    np.testing.assert_array_equal(df["close"].to_numpy(), ROWS["close"][boundary - 10:boundary + 10])
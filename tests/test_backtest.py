@@ -0,0 +1,59 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import synthesize
+from src.data.backtest import backtest, ma_crossover, parameter_grid, sma, strategy_returns, sweep, trade_list
+
+CLOSE = np.array([10.0, 11.0, 12.0, 11.0, 10.0, 9.0, 10.0, 11.0, 12.0, 13.0])
+TIMES = np.arange(len(CLOSE), dtype=np.int64) * 3_600_000
+FEE, SLIPPAGE = 0.001, 0.0005
+
+def test_crossover_positions_returns_and_trades():
+    # SMA(2) against SMA(3), from the third close on:
+    #   fast 11.5 11.5 10.5  9.5  9.5 10.5 11.5 12.5
+    #   slow 11   11.33 11   10    9.67 10  11   12
+    positions = ma_crossover(CLOSE, fast=2, slow=3)
+    np.testing.assert_array_equal(positions, [0, 0, 1, 1, 0, 0, 0, 1, 1, 1])
+
+    cost = FEE + SLIPPAGE
+    returns, turnover = strategy_returns(CLOSE, positions, cost)
+    np.testing.assert_array_equal(turnover, [0, 0, 1, 0, 1, 0, 0, 1, 0, 0])
+    # A position earns the next candle's return; every change pays the cost
+    expected = [0, 0, -cost, 11 / 12 - 1, 10 / 11 - 1 - cost, 0, 0, -cost, 12 / 11 - 1, 13 / 12 - 1]
+    np.testing.assert_allclose(returns, expected, rtol=0, atol=1e-15)
+
+    trades = trade_list(TIMES, CLOSE, positions, FEE, SLIPPAGE)
+    assert trades["entry_time"].tolist() == [pd.Timestamp(2 * 3_600_000, unit="ms"), pd.Timestamp(7 * 3_600_000, unit="ms")]
+    assert trades["exit_time"].tolist() == [pd.Timestamp(4 * 3_600_000, unit="ms"), pd.Timestamp(9 * 3_600_000, unit="ms")]
+    np.testing.assert_allclose(trades["entry_price"], [12.006, 11.0055])
+    np.testing.assert_allclose(trades["exit_price"], [9.995, 12.9935])
+    np.testing.assert_allclose(trades["return"], [9.995 / 12.006 - 1 - 2 * FEE, 12.9935 / 11.0055 - 1 - 2 * FEE])
+    assert trades["candles"].tolist() == [2, 2]
+    assert trades["open"].tolist() == [False, True]
+
+def test_backtest_stats():
+    rows = np.zeros(len(CLOSE), dtype=[("open_time", "<i8"), ("close", "<f8")])
+    rows["open_time"], rows["close"] = TIMES, CLOSE
+    result = backtest(rows, ma_crossover, "1h", FEE, SLIPPAGE, fast=2, slow=3)
+    assert result.stats["trades"] == 2
+    assert result.stats["exposure"] == 0.5
+    assert np.isclose(result.stats["costs"], 3 * (FEE + SLIPPAGE))
+    assert np.isclose(result.stats["total_return"], np.prod(1 + result.returns) - 1)
+    assert result.equity.index[2] == pd.Timestamp(2 * 3_600_000, unit="ms")
+
+def test_sma_longer_than_the_series():
+    np.testing.assert_array_equal(sma(CLOSE, 3)[1:4], [np.nan, 11.0, 34 / 3])
+    assert np.isnan(sma(CLOSE, len(CLOSE) + 5)).all()
+    assert not ma_crossover(CLOSE, fast=5, slow=len(CLOSE) + 5).any()
+
+def test_sweep_is_the_same_on_several_workers():
+    rows = synthesize(["SWEEPUSDT"], 2)["SWEEPUSDT"]
+    grid = parameter_grid(fast=[5, 10, 20, 40], slow=[50, 100, 200], allow_short=[False, True])
+    serial = sweep(rows, grid, interval="1m", workers=1)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("forkserver")) as pool:
+        parallel = sweep(rows, grid, interval="1m", workers=2, pool=pool, chunk=5)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert len(serial) == 24
@@ -0,0 +1,136 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+from src.api.binance_client import BinanceAPI, RateLimitError, RequestScheduler
+import config
+
+# Minimal Binance REST stand-in. Every request is recorded; `used_weight`
+# is reported in X-MBX-USED-WEIGHT-1M, `limit` (status, Retry-After)
+# answers the next request with a rate limit error, and v3/slow takes a
+# while so concurrent requests overlap.
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.requests = []
+        self.used_weight = 1
+        self.limit = None
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/api"
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        server = self.server
+        url = urlsplit(self.path)
+        server.requests.append((self.command, url.path, url.query, dict(self.headers)))
+        status, headers, body = 200, {}, {}
+        if server.limit is not None:
+            status, retry_after = server.limit
+            server.limit = None
+            headers["Retry-After"] = str(retry_after)
+            body = {"code": -1003, "msg": "Too many requests"}
+        elif url.path == "/api/v3/slow":
+            time.sleep(0.3)
+            body = {"slow": True}
+        elif url.path == "/api/v3/time":
+            body = {"serverTime": int(time.time() * 1000)}
+        elif url.path == "/api/v3/userDataStream":
+            body = {"listenKey": "key"}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-MBX-USED-WEIGHT-1M", str(server.used_weight))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+@pytest.fixture
+def server():
+    server = _Server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_token_bucket_throttles_to_the_weight_limit(server):
+    # 6000 weight per minute refills 100 per second
+    scheduler = RequestScheduler(server.url, weight_limit=6000)
+    scheduler.get("v3/ping", weight=5950)
+    started = time.monotonic()
+    scheduler.get("v3/ping", weight=100)
+    assert time.monotonic() - started >= 0.4
+
+def test_used_weight_header_limits_the_budget(server):
+    scheduler = RequestScheduler(server.url, weight_limit=6000)
+    server.used_weight = 5950
+    scheduler.get("v3/ping", weight=1)
+    assert scheduler.used_weight == 5950
+    started = time.monotonic()
+    scheduler.get("v3/ping", weight=100)
+    assert time.monotonic() - started >= 0.4
+
+def test_identical_concurrent_requests_are_coalesced(server):
+    scheduler = RequestScheduler(server.url)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(scheduler.get("v3/slow", {"symbol": "BTCUSDT"})))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"slow": True}] * 5
+    assert len(server.requests) == 1
+    assert scheduler.coalesced == 4
+
+@pytest.mark.parametrize("status", [429, 418])
+def test_retry_after_stops_requests_until_it_expires(server, status):
+    scheduler = RequestScheduler(server.url)
+    server.limit = (status, 1)
+    with pytest.raises(RateLimitError) as error:
+        scheduler.get("v3/ping")
+    assert error.value.retry_after == 1
+
+    # Refused locally while the ban lasts
+    with pytest.raises(RateLimitError):
+        scheduler.get("v3/ping")
+    assert len(server.requests) == 1
+
+    time.sleep(1.1)
+    assert scheduler.get("v3/ping") == {}
+    assert len(server.requests) == 2
+
+def test_account_requests_are_signed_and_accounted(server, monkeypatch):
+    monkeypatch.setattr(config, "BINANCE_API_KEY", "api-key")
+    monkeypatch.setattr(config, "BINANCE_API_SECRET", "secret")
+    scheduler = RequestScheduler(server.url)
+    api = BinanceAPI(scheduler=scheduler)
+
+    assert api.get_account() == {}
+    method, path, query, headers = next(r for r in server.requests if r[1] == "/api/v3/account")
+    assert method == "GET"
+    assert headers["X-MBX-APIKEY"] == "api-key"
+    unsigned, signature = query.rsplit("&signature=", 1)
+    assert signature == hmac.new(b"secret", unsigned.encode(), hashlib.sha256).hexdigest()
+    assert "timestamp" in dict(parse_qsl(unsigned))
+    assert scheduler.endpoint_stats["v3/account"] == {"requests": 1, "weight": 20, "bytes": 2}
+
+    assert api.create_listen_key() == "key"
+    assert api.keepalive_listen_key("key")
+    assert [r[0] for r in server.requests if r[1] == "/api/v3/userDataStream"] == ["POST", "PUT"]
+    assert scheduler.endpoint_stats["v3/userDataStream"]["weight"] == 4
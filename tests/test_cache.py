@@ -0,0 +1,70 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.utils.cache import DataCache
+
+def _block(size: int) -> np.ndarray:
+    return np.zeros(size, dtype=np.uint8)
+
+def test_entries_expire_after_their_ttl():
+    cache = DataCache(10_000)
+    cache.set("short", _block(10), ttl=0.05)
+    cache.set("long", _block(10), ttl=60)
+    assert cache.get("short") is not None
+    time.sleep(0.06)
+    assert cache.get("short") is None
+    assert cache.get("long") is not None
+    assert cache.stats()["expirations"] == 1
+    assert cache.bytes == 10
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = DataCache(2500)
+    cache.set("a", _block(1000), ttl=60)
+    cache.set("b", _block(1000), ttl=60)
+    cache.get("a")
+    cache.set("c", _block(1000), ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.bytes == 2000
+    assert cache.stats()["evictions"] == 1
+
+    # Larger than the whole cache: not stored, nothing evicted
+    cache.set("d", _block(3000), ttl=60)
+    assert cache.get("d") is None
+    assert cache.stats()["entries"] == 2
+
+def test_concurrent_misses_compute_once():
+    cache = DataCache(10_000)
+    calls = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return _block(10)
+
+    results = []
+    def worker():
+        start.wait()
+        results.append(cache.get_or_compute("key", compute, ttl=60))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats()["misses"] == 1
+    assert cache._key_locks == {}
+
+def test_key_locks_are_dropped():
+    cache = DataCache(10_000)
+    for day in range(100):
+        cache.get_or_compute(("day", day), lambda: None, ttl=60)
+    with pytest.raises(ValueError):
+        cache.get_or_compute("failing", lambda: int("x"), ttl=60)
+    assert cache._key_locks == {}
@@ -0,0 +1,46 @@
+import numpy as np
+
+from benchmarks.fixtures import synthesize
+from src.data.kline_decoder import klines_frame
+from src.data.market_data import calculate_moving_averages
+from src.visualization.chart_width import points_for_width
+from src.visualization.charts import candlestick_figure
+from src.visualization.downsampling import aggregate_ohlc
+import config
+
+FRAME = calculate_moving_averages(klines_frame(synthesize(["CHARTUSDT"], 1)["CHARTUSDT"]))
+
+def test_moving_averages_share_the_candle_buckets():
+    figure = candlestick_figure(FRAME, "CHARTUSDT", max_points=100)
+    traces = {trace.name: trace for trace in figure.data}
+    candle_x = np.asarray(traces["Candlestick"].x)
+    # 1440 candles in buckets of 15
+    assert len(candle_x) == 96
+
+    # Each bucket's MA point is its last candle's
+    ends = np.arange(14, len(FRAME), 15)
+    for period in (20, 50, 200):
+        line = traces[f"MA {period}"]
+        expected = FRAME[f"MA_{period}"].iloc[ends].to_numpy()
+        valid = ~np.isnan(expected)
+        np.testing.assert_array_equal(np.asarray(line.x), candle_x[valid])
+        np.testing.assert_array_equal(np.asarray(line.y), expected[valid])
+
+def test_short_frames_are_not_aggregated():
+    candles = aggregate_ohlc(FRAME.iloc[:50], 100, last=["MA_20", "MISSING"])
+    assert list(candles.columns) == ["open", "high", "low", "close", "volume", "MA_20"]
+    assert len(candles) == 50
+
+def test_reported_width_is_clamped():
+    assert points_for_width(None) == config.CHART_MAX_POINTS
+    assert points_for_width("wide") == config.CHART_MAX_POINTS
+    assert points_for_width(10 ** 9) == config.CHART_MAX_POINTS
+    assert points_for_width(-5) == config.CHART_MIN_POINTS
+    assert points_for_width(config.CHART_MIN_POINTS + 1) == config.CHART_MIN_POINTS + 1
+
+def test_end_aligned_buckets_leave_room_at_the_tail():
+    for n in (101, 150, 991, 1000):
+        candles = aggregate_ohlc(FRAME.iloc[:n], 100, align_end=True)
+        assert len(candles) <= 100
+        assert candles.index[-1] == FRAME.index[n - 1]
+        assert np.isclose(candles["volume"].sum(), FRAME["volume"].iloc[:n].sum())
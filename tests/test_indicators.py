@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import synthesize
+from src.data.indicators import EMA, MACD, RSI, SMA, BollingerBands, IndicatorEngine, VWAP
+from src.data.kline_decoder import klines_frame
+from src.data.market_data import calculate_moving_averages
+
+ROWS = synthesize(["INDUSDT"], 2)["INDUSDT"]
+FRAME = klines_frame(ROWS)
+SPLIT = 2000
+
+def _expected(df: pd.DataFrame) -> pd.DataFrame:
+    # The pandas formulas the indicators stand in for
+    close = df["close"]
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False).mean()
+    rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi.iloc[:14] = np.nan
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    mid = close.rolling(20).mean()
+    std = close.rolling(20).std()
+    typical = (df["high"] + df["low"] + close) / 3
+    return pd.DataFrame({
+        "sma": mid,
+        "ema": close.ewm(span=20, adjust=False).mean(),
+        "rsi": rsi,
+        "macd_macd": macd,
+        "macd_signal": signal,
+        "macd_hist": macd - signal,
+        "bb_mid": mid,
+        "bb_upper": mid + 2 * std,
+        "bb_lower": mid - 2 * std,
+        "vwap": (typical * df["volume"]).cumsum() / df["volume"].cumsum()
+    })
+
+def _engine() -> IndicatorEngine:
+    return IndicatorEngine({
+        "sma": SMA(20), "ema": EMA(span=20), "rsi": RSI(14), "macd": MACD(),
+        "bb": BollingerBands(20), "vwap": VWAP()
+    })
+
+def test_initialize_matches_pandas():
+    result = _engine().initialize(FRAME)
+    expected = _expected(FRAME)
+    for name in expected:
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, err_msg=name)
+
+@pytest.mark.parametrize("start", [0, 10, SPLIT])
+def test_updates_match_pandas(start):
+    # From an empty state, part way through the warm-up, and after a long
+    # initialized history
+    engine = _engine()
+    engine.initialize(FRAME.iloc[:start])
+    expected = _expected(FRAME)
+    candles = FRAME.iloc[start:].to_dict("records")
+    updates = []
+    for i, candle in enumerate(candles):
+        # The still-open candle is previewed first with the same values it
+        # closes with, without moving the state
+        preview = engine.update(candle, closed=False)
+        updates.append(engine.update(candle))
+        assert preview.keys() == updates[-1].keys()
+        np.testing.assert_allclose(list(preview.values()), list(updates[-1].values()), rtol=1e-12)
+    result = pd.DataFrame(updates)
+    for name in expected:
+        np.testing.assert_allclose(result[name], expected[name].iloc[start:], rtol=1e-9, atol=1e-9, err_msg=name)
+
+def test_incremental_moving_averages_match_rolling():
+    key = ("INDUSDT", "1m")
+    periods = [20, 50, 200]
+    # A window sliding forward one or more closed candles per refresh, each
+    # with one open candle at the end
+    for end in [SPLIT, SPLIT + 1, SPLIT + 2, SPLIT + 40, SPLIT + 41, SPLIT + 1500]:
+        window = klines_frame(ROWS[end - SPLIT:end].copy())
+        incremental = calculate_moving_averages(window.copy(), periods, key=key, open_rows=1)
+        rolling = calculate_moving_averages(window.copy(), periods)
+        for period in periods:
+            np.testing.assert_allclose(incremental[f"MA_{period}"], rolling[f"MA_{period}"], rtol=1e-9, err_msg=f"{end} MA_{period}")
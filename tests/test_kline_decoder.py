@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_binance import _kline_row
+from benchmarks.fixtures import synthesize
+from src.data.kline_decoder import decode_klines_json, klines_frame
+
+ROWS = synthesize(["DECODEUSDT"], 1)["DECODEUSDT"][:500]
+PAYLOAD = json.dumps([_kline_row(row) for row in ROWS], separators=(",", ":")).encode()
+
+def test_frame_matches_pandas_decoding():
+    df = klines_frame(decode_klines_json(PAYLOAD))
+
+    # How the JSON response used to be turned into a frame
+    expected = pd.DataFrame(json.loads(PAYLOAD)).iloc[:, :6]
+    expected.columns = ["timestamp", "open", "high", "low", "close", "volume"]
+    expected["timestamp"] = pd.to_datetime(expected["timestamp"], unit="ms")
+    expected = expected.set_index("timestamp").astype(float)
+
+    assert df.index.dtype == np.dtype("datetime64[ns]")
+    pd.testing.assert_frame_equal(df[expected.columns], expected)
+    assert df.index[0] == pd.Timestamp(int(ROWS["open_time"][0]), unit="ms")
+
+def test_columns_are_views_into_the_decoded_array():
+    arr = decode_klines_json(PAYLOAD)
+    df = klines_frame(arr)
+    assert np.shares_memory(df["close"].to_numpy(), arr)
+    assert not np.shares_memory(df.index.asi8, arr)
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from benchmarks.fixtures import synthesize
+from src.data.kline_decoder import KLINE_COLUMNS
+from src.data.kline_store import KlineStore
+
+SYMBOL = "STOREUSDT"
+ROWS = synthesize([SYMBOL], 1)[SYMBOL]
+
+def _sizes(store: KlineStore) -> dict:
+    return {name: os.path.getsize(store._column_path(name)) for name, _ in KLINE_COLUMNS}
+
+def test_store_opened_during_an_append_does_not_truncate(store_root, monkeypatch):
+    writer = KlineStore(store_root, SYMBOL, "1m")
+    writer.append(ROWS[:100])
+
+    # Another process opens the store while the writer is between columns
+    readers = []
+    column_path = writer._column_path
+    def opening_reader(name):
+        if name == "close" and not readers:
+            readers.append(KlineStore(store_root, SYMBOL, "1m"))
+        return column_path(name)
+    monkeypatch.setattr(writer, "_column_path", opening_reader)
+    writer.append(ROWS[100:150])
+
+    reader = readers[0]
+    assert len(reader) == 100
+    np.testing.assert_array_equal(reader.read(), ROWS[:100])
+    assert len(writer) == 150
+    np.testing.assert_array_equal(writer.read(), ROWS[:150])
+    reader.refresh()
+    np.testing.assert_array_equal(reader.read(), ROWS[:150])
+
+def test_writer_repairs_columns_left_by_a_crash(store_root):
+    writer = KlineStore(store_root, SYMBOL, "1m")
+    writer.append(ROWS[:100])
+    with open(writer._column_path("open_time"), "ab") as f:
+        f.write(ROWS["open_time"][100:110].tobytes())
+
+    store = KlineStore(store_root, SYMBOL, "1m")
+    assert len(store) == 100
+    assert _sizes(store)["open_time"] == 110 * 8
+    store.append(ROWS[100:120])
+    assert set(_sizes(store).values()) == {120 * 8}
+    np.testing.assert_array_equal(store.read(), ROWS[:120])
@@ -0,0 +1,125 @@
+import pandas as pd
+
+from benchmarks.fixtures import synthesize
+from src.data.kline_decoder import klines_frame
+from src.data.market_data import calculate_moving_averages
+from src.visualization.downsampling import aggregate_ohlc
+from src.visualization.live_charts import MA_COLORS, LiveCandlestickChart, LivePriceChart
+
+FRAME = calculate_moving_averages(klines_frame(synthesize(["LIVEUSDT"], 1)["LIVEUSDT"]))
+
+# Stand-in for a Streamlit placeholder and the chart element in it, keeping
+# the rows the browser has received since the chart was last built
+class _Container:
+    def __init__(self):
+        self.builds = 0
+        self.rows = None
+
+    def vega_lite_chart(self, data, spec, **kwargs):
+        self.builds += 1
+        self.rows = data
+        return self
+
+    def add_rows(self, data):
+        self.rows = pd.concat([self.rows, data], ignore_index=True)
+
+    def shown(self) -> pd.DataFrame:
+        # What the spec's LATEST_ONLY transform leaves of the rows
+        latest = self.rows.sort_values("seq").groupby("key").tail(1)
+        latest = latest[latest["timestamp"] >= latest["start"].max()]
+        return latest.sort_values("key").drop(columns=["seq", "key", "start"]).reset_index(drop=True)
+
+def _revise(df: pd.DataFrame, close: float) -> pd.DataFrame:
+    df = df.copy()
+    df.iloc[-1, df.columns.get_loc("close")] = close
+    return df
+
+def _expected(chart, df: pd.DataFrame) -> pd.DataFrame:
+    return chart._rows(chart._history(df)).drop(columns=["seq", "key", "start"])
+
+def test_open_candle_is_replaced_in_place():
+    chart = LiveCandlestickChart("LIVEUSDT", max_points=10_000)
+    container = _Container()
+    window = FRAME.iloc[:500]
+    chart.render(container, window)
+
+    for close in (101.0, 102.0, 103.0):
+        sent = chart.render(container, _revise(window, close))
+        assert len(sent) == 1
+        assert sent["key"].iloc[0] == window.index[-1]
+    pd.testing.assert_frame_equal(container.shown(), _expected(chart, _revise(window, 103.0)))
+
+    # Nothing changed, nothing sent
+    assert len(chart.render(container, _revise(window, 103.0))) == 0
+
+    # A new candle opens: the previous one is re-sent closed, the new one appended
+    grown = FRAME.iloc[:501]
+    sent = chart.render(container, grown)
+    assert list(sent["key"]) == list(grown.index[-2:])
+    pd.testing.assert_frame_equal(container.shown(), _expected(chart, grown))
+    assert container.builds == 1
+
+def test_sliding_window_trims_leading_rows():
+    chart = LiveCandlestickChart("LIVEUSDT", max_points=10_000)
+    container = _Container()
+    chart.render(container, FRAME.iloc[:500])
+    for shift in range(1, 4):
+        window = FRAME.iloc[shift:500 + shift]
+        sent = chart.render(container, window)
+        assert list(sent["key"]) == list(window.index[-2:])
+        pd.testing.assert_frame_equal(container.shown(), _expected(chart, window))
+    assert container.builds == 1
+
+    # A window reaching further back can't be trimmed into
+    chart.render(container, FRAME.iloc[:503])
+    assert container.builds == 2
+
+def test_appended_rows_rebuild():
+    chart = LiveCandlestickChart("LIVEUSDT", max_points=10_000, rebuild_rows=5)
+    container = _Container()
+    chart.render(container, FRAME.iloc[:500])
+    for close in range(100, 106):
+        chart.render(container, _revise(FRAME.iloc[:500], close))
+    assert container.builds == 2
+    assert len(container.rows) <= 500 + 5
+
+def test_downsampled_tail_stays_one_bucket():
+    chart = LiveCandlestickChart("LIVEUSDT", max_points=100)
+    container = _Container()
+    # 1000 candles in buckets of 10, the last one holding 1 candle
+    chart.render(container, FRAME.iloc[:991])
+    assert chart._bucket == 10
+    for end in range(992, 1001):
+        sent = chart.render(container, FRAME.iloc[:end])
+        assert len(sent) == 1
+        assert sent["key"].iloc[0] == FRAME.index[990]
+    assert container.builds == 1
+    # The buckets of the build, the last one now full
+    expected = aggregate_ohlc(FRAME.iloc[:1000], 100, last=list(MA_COLORS))
+    pd.testing.assert_frame_equal(container.shown(), chart._rows(expected).drop(columns=["seq", "key", "start"]))
+
+    # The 11th candle would start a new bucket
+    chart.render(container, FRAME.iloc[:1001])
+    assert container.builds == 2
+
+def test_price_chart_tail_follows_last_close():
+    chart = LivePriceChart("LIVEUSDT", max_points=100)
+    container = _Container()
+    chart.render(container, FRAME.iloc[:1000])
+    sent = chart.render(container, FRAME.iloc[:1003])
+    assert sent["timestamp"].iloc[0] == FRAME.index[1002]
+    assert sent["close"].iloc[0] == FRAME["close"].iloc[1002]
+    assert len(container.shown()) == 100
+
+def test_downsampled_window_slides_without_rebuilding():
+    chart = LiveCandlestickChart("LIVEUSDT", max_points=100)
+    container = _Container()
+    chart.render(container, FRAME.iloc[:991])
+    for shift in range(1, 10):
+        chart.render(container, FRAME.iloc[shift:991 + shift])
+    assert container.builds == 1
+    # The bucket the window now starts in is hidden, the others are kept
+    shown = container.shown()
+    assert shown["timestamp"].iloc[0] == FRAME.index[10]
+    assert shown["timestamp"].iloc[-1] == FRAME.index[990]
+    assert len(shown) == 99
@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import synthesize
+from src.api.local_client import LocalStoreClient, write_shared_tickers
+from src.data.kline_store import get_kline_store
+from src.data.market_data import get_market_info
+from src.data.resample import resample_klines
+import config
+
+SYMBOL = "LOCALUSDT"
+
+def _collect(root, days=10):
+    # What the collector leaves behind with the default COLLECTOR_INTERVALS:
+    # closed 1m candles plus the open one, and the shared tickers
+    rows = synthesize([SYMBOL], days)[SYMBOL]
+    now_ts = int(time.time() * 1000)
+    store = get_kline_store(SYMBOL, config.RESAMPLE_BASE_INTERVAL, root)
+    closed = rows["close_time"] < now_ts
+    store.append(rows[closed])
+    store.write_open(rows[~closed])
+    last = rows[-1]
+    ticker = {
+        "symbol": SYMBOL, "lastPrice": str(last["close"]), "openPrice": str(rows["open"][-1440]),
+        "lowPrice": str(rows["low"][-1440:].min()), "highPrice": str(rows["high"][-1440:].max()),
+        "priceChangePercent": "1.0", "volume": "10", "quoteVolume": "10", "weightedAvgPrice": str(last["close"])
+    }
+    write_shared_tickers({"1h": [ticker], "1d": [ticker], "7d": [ticker]}, root)
+    return rows
+
+def test_longer_intervals_are_resampled_from_the_base_store(store_root):
+    rows = _collect(store_root)
+    client = LocalStoreClient(store_root)
+    for interval in ["1h", "1d"]:
+        klines = client.get_klines(SYMBOL, interval, 2)
+        expected = resample_klines(rows, interval)[-2:]
+        assert len(klines) == 2
+        assert [k[0] for k in klines] == expected["open_time"].tolist()
+        assert [k[4] for k in klines] == expected["close"].tolist()
+
+def test_market_info_available_from_collector_store(store_root):
+    _collect(store_root)
+    info = get_market_info(LocalStoreClient(store_root), SYMBOL)
+    assert info is not None
+    assert np.isfinite(info["price_change_1h"])
+    assert np.isfinite(info["price_change_7d"])
@@ -0,0 +1,32 @@
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import MINUTE_MS, synthesize
+from src.data.kline_store import get_kline_store
+from src.data.market_data import _sync_kline_store
+from tests.stubs import KlineClient
+
+SYMBOL = "SYNCUSDT"
+
+def test_partial_head_backfill_is_not_persisted(store_root):
+    rows = synthesize([SYMBOL], 3)[SYMBOL]
+    now_ts = int(time.time() * 1000)
+    store = get_kline_store(SYMBOL, "1m", store_root)
+    recent = rows[-1000:]
+    store.append(recent[recent["close_time"] < now_ts])
+    first = store.first_open_time
+    start_ts = first - 2500 * MINUTE_MS
+
+    # The chunk right before the stored candles fails
+    failing = KlineClient(rows, fail_from=start_ts + 2000 * MINUTE_MS)
+    _sync_kline_store(failing, store, SYMBOL, "1m", start_ts, now_ts, now_ts)
+    assert store.first_open_time == first
+    assert store.covered_from is None
+
+    # The next refresh retries the whole head
+    _sync_kline_store(KlineClient(rows), store, SYMBOL, "1m", start_ts, now_ts, now_ts)
+    assert store.first_open_time == start_ts
+    assert store.covered_from == start_ts
+    stored = store.read()
+    assert np.all(np.diff(stored["open_time"]) == MINUTE_MS)
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from websockets.sync.server import serve
+
+from src.api.binance_client import BinanceAPI
+from src.api.market_stream import MarketStream
+
+# In the format written by `python -m src.api.market_stream record`: six minutes of
+# BTCUSDT 1m kline and ticker messages from the combined stream
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "market_stream_BTCUSDT.jsonl")
+
+with open(FIXTURE) as f:
+    MESSAGES = f.read().splitlines()
+
+MINUTE_MS = 60_000
+
+def _final_rows():
+    # The last update of every candle, as REST returns it
+    rows = {}
+    for line in MESSAGES:
+        data = json.loads(line)["data"]
+        if data["e"] == "kline":
+            k = data["k"]
+            rows[k["t"]] = [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"], "0"]
+    return [rows[t] for t in sorted(rows)]
+
+ROWS = _final_rows()
+# The first connection drops after three minutes of messages
+CUT = next(i for i, line in enumerate(MESSAGES) if json.loads(line)["data"].get("k", {}).get("t") == ROWS[3][0])
+
+# Replays the first part of the recording on the first connection and the
+# rest on the next one, then keeps it open until the client leaves
+class ReplayServer:
+    def __init__(self):
+        self.paths = []
+        self._server = serve(self._handle, "127.0.0.1", 0)
+        self.url = f"ws://127.0.0.1:{self._server.socket.getsockname()[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def _handle(self, ws):
+        self.paths.append(ws.request.path)
+        first = len(self.paths) == 1
+        for line in (MESSAGES[:CUT] if first else MESSAGES[CUT:]):
+            ws.send(line)
+        if first:
+            return
+        for _ in ws:
+            pass
+
+    def close(self):
+        self._server.shutdown()
+
+@pytest.fixture
+def replayed():
+    server = ReplayServer()
+    stream = MarketStream(["BTCUSDT"], ["1m"], base_url=server.url)
+    stream.start()
+    deadline = time.time() + 15
+    while stream.messages_received < len(MESSAGES) and time.time() < deadline:
+        time.sleep(0.02)
+    yield server, stream
+    stream.stop()
+    server.close()
+
+def test_replay_across_reconnect(replayed):
+    server, stream = replayed
+    assert stream.messages_received == len(MESSAGES)
+    assert server.paths == ["/stream?streams=btcusdt@kline_1m/btcusdt@ticker"] * 2
+    assert stream.is_live
+
+    last_ticker = json.loads(MESSAGES[-1])["data"]
+    ticker = stream.get_ticker("BTCUSDT")
+    assert ticker["lastPrice"] == last_ticker["c"]
+    assert ticker["count"] == last_ticker["n"]
+
+    # Candles from before the reconnect are dropped rather than kept with a
+    # possible hole after them
+    assert stream.get_klines("BTCUSDT", "1m", 3) == ROWS[3:]
+    assert stream.get_klines("BTCUSDT", "1m", 4) == []
+    assert stream.get_klines_since("BTCUSDT", "1m", ROWS[0][0], ROWS[-1][0]) is None
+
+def test_seed_with_gap_is_refused(replayed):
+    _, stream = replayed
+    assert stream.seed_klines("BTCUSDT", "1m", ROWS[:2]) == (ROWS[2][0], ROWS[3][0] - 1)
+    assert stream.get_klines("BTCUSDT", "1m", 4) == []
+
+    assert stream.seed_klines("BTCUSDT", "1m", ROWS[:3]) is None
+    assert stream.get_klines("BTCUSDT", "1m", 6) == ROWS
+    assert stream.get_klines_since("BTCUSDT", "1m", ROWS[0][0], ROWS[-1][0]) == ROWS
+
+# REST side of get_klines: the latest page lags behind the stream by a
+# candle, the gap is served by open time range
+class _LaggingScheduler:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, path, params=None, weight=1, raw=False):
+        self.requests.append(params)
+        if "startTime" in params:
+            return [row for row in ROWS if params["startTime"] <= row[0] <= params["endTime"]]
+        return ROWS[:2]
+
+def test_get_klines_backfills_gap_before_stream(replayed):
+    _, stream = replayed
+    scheduler = _LaggingScheduler()
+    api = BinanceAPI(stream=stream, scheduler=scheduler)
+
+    assert api.get_klines("BTCUSDT", "1m", 5) == ROWS[:2]
+    assert scheduler.requests[-1]["startTime"] == ROWS[2][0]
+    assert stream.get_klines("BTCUSDT", "1m", 6) == ROWS
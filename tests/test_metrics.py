@@ -0,0 +1,26 @@
+import socket
+import urllib.request
+
+from src.utils import metrics
+from src.utils.metrics import MetricsRegistry, start_metrics_server
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.inc("requests_total", path='v3/"klines"\\raw\nnext')
+    assert 'path="v3/\\"klines\\"\\\\raw\\nnext"' in registry.render_prometheus()
+    # One sample line, the newline did not split it
+    assert sum("requests_total{" in line for line in registry.render_prometheus().splitlines()) == 1
+
+def test_endpoint_listens_on_loopback_by_default(monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = start_metrics_server(port)
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
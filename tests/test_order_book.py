@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+
+from src.data.order_book import MarketDepth, OrderBook, read_recording, replay
+
+# In the layout written by `python -m src.data.order_book record`: depth diffs
+# and trades of BTCUSDT with two diffs before the first snapshot (the second
+# straddling it), and one diff lost later on, followed by three buffered
+# diffs and the snapshot the resync fetched
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "depth_BTCUSDT.jsonl")
+RECORDS = list(read_recording(FIXTURE))
+
+def _resync_at() -> int:
+    return max(i for i, record in enumerate(RECORDS) if "snapshot" in record)
+
+def test_replay_resyncs_after_a_gap():
+    depth = replay(RECORDS)["BTCUSDT"]
+    book = depth.book
+    assert book.synced
+    assert book.resyncs == 1
+    assert book.last_update_id == 639
+    assert not depth.pending
+
+    np.testing.assert_array_equal(book.bids.top(3), [[29999.73, 0.40477741], [29999.71, 0.26182502], [29999.70, 0.90067518]])
+    np.testing.assert_array_equal(book.asks.top(3), [[29999.76, 0.23511677], [29999.78, 0.19681037], [29999.81, 0.46489598]])
+    assert book.spread() == 29999.76 - 29999.73
+
+def test_diffs_are_buffered_until_the_snapshot():
+    first = next(i for i, record in enumerate(RECORDS) if "snapshot" in record)
+    depth = replay(RECORDS[:first])["BTCUSDT"]
+    assert not depth.book.synced
+    assert depth.needs_snapshot
+    assert len(depth.pending) == 2
+    straddling = depth.pending[-1]
+    assert straddling[0] <= RECORDS[first]["snapshot"]["lastUpdateId"] < straddling[1]
+    assert depth.load_snapshot(RECORDS[first]["snapshot"])
+    # The diff straddling the snapshot was applied on top of it
+    assert depth.book.last_update_id == straddling[1]
+
+    # Up to the gap the book follows the stream; the diffs after it wait
+    # for the resync snapshot
+    depth = replay(RECORDS[:_resync_at()])["BTCUSDT"]
+    assert not depth.book.synced
+    assert depth.book.resyncs == 1
+    assert len(depth.pending) == 3
+    assert depth.needs_snapshot
+
+def test_stale_snapshot_is_rejected():
+    resync = _resync_at()
+    depth = replay(RECORDS[:resync])["BTCUSDT"]
+    stale = RECORDS[resync]["snapshot"]
+    stale = dict(stale, lastUpdateId=depth.pending[0][0] - 2)
+    assert not depth.load_snapshot(stale)
+    assert depth.load_snapshot(RECORDS[resync]["snapshot"])
+    assert depth.book.synced
+
+def test_trades_are_deduplicated():
+    depth = replay(RECORDS)["BTCUSDT"]
+    trades = [r["data"] for r in RECORDS if r.get("data", {}).get("e") == "aggTrade"]
+    assert len(depth.trades) == len(trades)
+    replay(RECORDS, {"BTCUSDT": depth})
+    assert len(depth.trades) == len(trades)
+    stats = depth.trades.stats(0)
+    prices = np.array([float(t["p"]) for t in trades])
+    quantities = np.array([float(t["q"]) for t in trades])
+    assert np.isclose(stats["vwap"], np.dot(prices, quantities) / quantities.sum())
+
+def test_truncated_book_resyncs_when_it_runs_short():
+    book = OrderBook("BTCUSDT", max_levels=4)
+    book.apply_snapshot(10, [[f"{100 - i}", "1"] for i in range(4)], [[f"{101 + i}", "1"] for i in range(4)])
+    # A deeper bid is dropped, a better one pushes the worst out
+    assert book.apply_diff(11, 11, [["90", "1"]], [])
+    assert book.apply_diff(12, 12, [["100.5", "2"]], [])
+    np.testing.assert_array_equal(book.bids.top(10)[:, 0], [100.5, 100, 99, 98])
+    assert book.synced
+
+    # Emptying the top levels would show a book without the dropped ones
+    assert book.apply_diff(13, 13, [["100.5", "0"], ["100", "0"], ["99", "0"]], [])
+    assert not book.synced
+    assert book.resyncs == 1
+
+    # A fresh snapshot starts over
+    book.apply_snapshot(20, [[f"{98 - i}", "1"] for i in range(4)], [[f"{101 + i}", "1"] for i in range(4)])
+    assert book.synced
+    assert not book.bids.truncated
+
+def _diff(first_id, final_id, bids=(), asks=()):
+    return {"e": "depthUpdate", "U": first_id, "u": final_id, "b": list(bids), "a": list(asks)}
+
+def _snapshot(last_update_id):
+    return {"lastUpdateId": last_update_id, "bids": [["100", "1"], ["99", "1"]], "asks": [["101", "1"], ["102", "1"]]}
+
+def test_snapshot_applies_the_buffered_diffs_after_it():
+    depth = MarketDepth("BTCUSDT", max_levels=10)
+    assert not depth.needs_snapshot
+    depth.on_event(_diff(3, 4, bids=[["98", "5"]]))
+    depth.on_event(_diff(5, 7, bids=[["100", "2"]]))
+    depth.on_event(_diff(8, 10, asks=[["101", "0"]]))
+    assert depth.needs_snapshot
+    assert len(depth.pending) == 3
+
+    # The first diff predates the snapshot and is dropped, the second
+    # straddles it
+    assert depth.load_snapshot(_snapshot(6))
+    assert depth.book.synced
+    assert depth.book.last_update_id == 10
+    assert not depth.pending
+    np.testing.assert_array_equal(depth.book.bids.top(5), [[100, 2], [99, 1]])
+    np.testing.assert_array_equal(depth.book.asks.top(5), [[102, 1]])
+
+def test_gap_in_the_stream_needs_a_newer_snapshot():
+    depth = MarketDepth("BTCUSDT", max_levels=10)
+    depth.on_event(_diff(5, 7))
+    assert depth.load_snapshot(_snapshot(6))
+
+    # Updates 8-11 are lost
+    depth.on_event(_diff(12, 14, bids=[["100", "3"]]))
+    depth.on_event(_diff(15, 16, bids=[["99", "4"]]))
+    assert not depth.book.synced
+    assert depth.book.resyncs == 1
+    assert depth.needs_snapshot
+
+    # A snapshot from before the gap can't be continued from
+    assert not depth.load_snapshot(_snapshot(9))
+    assert not depth.book.synced
+    assert depth.load_snapshot(_snapshot(13))
+    assert depth.book.last_update_id == 16
+    np.testing.assert_array_equal(depth.book.bids.top(5), [[100, 3], [99, 4]])
+
+def test_gap_among_the_buffered_diffs_fails_the_snapshot():
+    depth = MarketDepth("BTCUSDT", max_levels=10)
+    depth.on_event(_diff(5, 7))
+    depth.on_event(_diff(9, 10))
+    assert not depth.load_snapshot(_snapshot(6))
+    assert not depth.book.synced
+
+    # After a reconnect the buffered diffs are discarded
+    depth.on_event(_diff(11, 12))
+    depth.reset()
+    assert not depth.pending
+    assert not depth.needs_snapshot
@@ -0,0 +1,89 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import synthesize_account
+from src.data.portfolio import Portfolio, asset_price, ticker_prices
+
+ACCOUNT = synthesize_account(assets=60, held=0.5, seed=3)
+
+def _ticker(symbol, last, open_price=None):
+    open_price = open_price if open_price is not None else last
+    return {"symbol": symbol, "lastPrice": str(last), "openPrice": str(open_price)}
+
+def _event(update_time, *balances):
+    return {"e": "outboundAccountPosition", "u": update_time,
+            "B": [{"a": asset, "f": f"{free:.8f}", "l": "0.00000000"} for asset, free in balances]}
+
+@pytest.fixture
+def portfolio():
+    portfolio = Portfolio()
+    portfolio.load(copy.deepcopy(ACCOUNT))
+    return portfolio
+
+def test_valuation_of_the_fake_account(portfolio):
+    tickers = ACCOUNT["tickers"]
+    prices = ticker_prices(tickers)
+    valuation = portfolio.valuation(tickers)
+
+    held = {b["asset"]: float(b["free"]) + float(b["locked"]) for b in ACCOUNT["balances"]
+            if float(b["free"]) or float(b["locked"])}
+    expected = {asset: quantity * asset_price(asset, prices)[0] for asset, quantity in held.items()
+                if asset_price(asset, prices) is not None}
+    assert len(valuation.holdings) == len(held)
+    assert sorted(valuation.unpriced) == sorted(held.keys() - expected.keys())
+    assert valuation.total_value == pytest.approx(sum(expected.values()), rel=1e-12)
+    values = valuation.holdings.set_index("asset")["value"].dropna()
+    assert list(values) == sorted(values, reverse=True)
+    assert values.to_dict() == pytest.approx(expected, rel=1e-12)
+    # Nothing costed before prices were ever seen
+    assert valuation.holdings["pnl"].isna().all()
+
+def test_valuation_does_not_change_the_portfolio(portfolio):
+    tickers = ACCOUNT["tickers"]
+    portfolio.update_prices(tickers)
+    first = portfolio.valuation(tickers)
+    doubled = [_ticker(t["symbol"], float(t["lastPrice"]) * 2, t["openPrice"]) for t in tickers]
+    portfolio.valuation(doubled)
+    pd.testing.assert_frame_equal(portfolio.valuation(tickers).holdings, first.holdings)
+    assert first.pnl == pytest.approx(0.0, abs=1e-6)
+
+def test_cost_follows_balance_events():
+    portfolio = Portfolio()
+    portfolio.load({"updateTime": 100, "balances": [{"asset": "BTC", "free": "1.0", "locked": "0"}]})
+    portfolio.update_prices([_ticker("BTCUSDT", 30_000.0)])
+
+    # Bought 1 BTC at 40k (the last price seen), then sold half the position
+    portfolio.update_prices([_ticker("BTCUSDT", 40_000.0)])
+    assert portfolio.apply(_event(101, ("BTC", 2.0)))
+    holding = portfolio.valuation([_ticker("BTCUSDT", 50_000.0)]).holdings.iloc[0]
+    assert holding["avg_cost"] == pytest.approx(35_000.0)
+    assert holding["pnl"] == pytest.approx(30_000.0)
+
+    assert portfolio.apply(_event(102, ("BTC", 1.0)))
+    holding = portfolio.valuation([_ticker("BTCUSDT", 50_000.0)]).holdings.iloc[0]
+    assert holding["avg_cost"] == pytest.approx(35_000.0)
+    assert holding["pnl"] == pytest.approx(15_000.0)
+
+    # Events the snapshot already reflects are ignored
+    assert not portfolio.apply(_event(102, ("BTC", 5.0)))
+
+    # A sold-out asset starts over
+    assert portfolio.apply(_event(103, ("BTC", 0.0)))
+    assert len(portfolio) == 0
+    assert portfolio.apply(_event(104, ("BTC", 1.0)))
+    assert np.isnan(portfolio.valuation([_ticker("BTCUSDT", 50_000.0)]).holdings.iloc[0]["avg_cost"])
+    portfolio.update_prices([_ticker("BTCUSDT", 45_000.0)])
+    assert portfolio.valuation([_ticker("BTCUSDT", 50_000.0)]).holdings.iloc[0]["pnl"] == pytest.approx(5_000.0)
+
+def test_resync_snapshot_costs_the_differences():
+    portfolio = Portfolio()
+    portfolio.load({"updateTime": 100, "balances": [{"asset": "ETH", "free": "2.0", "locked": "0"}]})
+    portfolio.update_prices([_ticker("ETHUSDT", 2_000.0)])
+    portfolio.update_prices([_ticker("ETHUSDT", 2_600.0)])
+    changed = portfolio.load({"updateTime": 200, "balances": [{"asset": "ETH", "free": "3.0", "locked": "1.0"}]})
+    assert changed == 1
+    holding = portfolio.valuation([_ticker("ETHUSDT", 2_600.0)]).holdings.iloc[0]
+    assert holding["avg_cost"] == pytest.approx(2_300.0)
@@ -0,0 +1,129 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.fixtures import synthesize
+from src.data.kline_store import get_kline_store
+from src.data.market_data import _read_candles, fetch_kline_array
+from src.data.kline_decoder import decode_klines
+from src.data.resample import fixture_pairs, resample_klines
+from tests.stubs import KlineClient
+
+# Synthetic, in the layout written by `python -m src.data.resample record`: two
+# UTC days of 1m candles and candles of the longer intervals, generated offline
+# in Binance's wire format. It checks decoding and bucket filtering end to end,
+# not agreement with Binance; recording a live fixture over it checks that.
+# The edge cases below have expected values worked out by hand.
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "resample_BTCUSDT.json.gz")
+
+PAIRS = {interval: (derived, reference) for interval, derived, reference in fixture_pairs(FIXTURE)}
+
+MINUTE = 60_000
+
+def _kline(open_time, open_, high, low, close, volume, quote_volume="0", trades=1):
+    # One 1m candle as Binance sends it
+    return [open_time, open_, high, low, close, volume, open_time + MINUTE - 1,
+            quote_volume, trades, "0", "0", "0"]
+
+@pytest.mark.parametrize("interval", ["5m", "1h", "1d"])
+def test_resampled_matches_fixture_klines(interval):
+    derived, reference = PAIRS[interval]
+    assert len(reference) > 0
+    for name in reference.dtype.names:
+        np.testing.assert_array_equal(derived[name], reference[name], err_msg=name)
+
+def test_cold_long_range_is_fetched_natively(store_root):
+    # 10 days of 1h candles would take 14400 1m candles
+    rows = synthesize(["COLDUSDT"], 10)["COLDUSDT"]
+    client = KlineClient(rows)
+    now_ts = int(time.time() * 1000)
+    start_ts = now_ts - 10 * 86_400_000
+
+    candles, _ = _read_candles(client, "COLDUSDT", "1h", start_ts, now_ts, now_ts)
+    assert {interval for interval, _, _ in client.requests} == {"1h"}
+    assert len(get_kline_store("COLDUSDT", "1m")) == 0
+    expected = resample_klines(rows, "1h")
+    expected = expected[expected["open_time"] >= start_ts]
+    np.testing.assert_array_equal(candles["open_time"], expected["open_time"])
+
+def test_cached_base_history_is_resampled(store_root):
+    rows = synthesize(["WARMUSDT"], 1)["WARMUSDT"]
+    now_ts = int(time.time() * 1000)
+    store = get_kline_store("WARMUSDT", "1m")
+    store.append(rows[rows["close_time"] < now_ts])
+    store.mark_covered_from(int(rows["open_time"][0]))
+    client = KlineClient(rows)
+
+    start_ts = int(rows["open_time"][0])
+    candles, _ = _read_candles(client, "WARMUSDT", "1h", start_ts, now_ts, now_ts)
+    assert all(interval == "1m" for interval, _, _ in client.requests)
+    # An hour only partly stored is left out
+    expected = resample_klines(rows, "1h")
+    expected = expected[expected["open_time"] >= start_ts]
+    np.testing.assert_array_equal(candles["open_time"], expected["open_time"])
+    np.testing.assert_array_equal(candles["close"], expected["close"])
+
+def test_native_read_skips_cached_base_history(store_root):
+    # What the cross-asset analytics ask for
+    rows = synthesize(["NATUSDT"], 1)["NATUSDT"]
+    now_ts = int(time.time() * 1000)
+    store = get_kline_store("NATUSDT", "1m")
+    store.append(rows[rows["close_time"] < now_ts])
+    store.mark_covered_from(int(rows["open_time"][0]))
+    client = KlineClient(rows)
+
+    start_ts = int(rows["open_time"][0])
+    candles = fetch_kline_array(client, "NATUSDT", "1h", start_ts, now_ts, native=True)
+    assert {interval for interval, _, _ in client.requests} == {"1h"}
+    assert len(get_kline_store("NATUSDT", "1h")) > 0
+    expected = resample_klines(rows, "1h")
+    np.testing.assert_array_equal(candles["open_time"], expected["open_time"][expected["open_time"] >= start_ts])
+
+def test_partial_buckets_and_decimal_sums():
+    # 2024-01-08 00:03 and 00:04 fall in the 00:00 5m bucket, 00:05 starts the next
+    start = 1704672000000
+    rows = decode_klines([
+        _kline(start + 3 * MINUTE, "100.5", "101.0", "100.0", "100.75", "0.10000000", "12345.67890123", 1),
+        _kline(start + 4 * MINUTE, "100.75", "102.25", "99.5", "101.0", "0.20000000", "0.00000001", 2),
+        _kline(start + 5 * MINUTE, "101.0", "101.5", "100.5", "101.25", "0.30000000", "1.11111111", 3),
+    ])
+    candles = resample_klines(rows, "5m")
+    assert candles["open_time"].tolist() == [start, start + 5 * MINUTE]
+    assert candles["close_time"].tolist() == [start + 5 * MINUTE - 1, start + 10 * MINUTE - 1]
+    assert candles[0][["open", "high", "low", "close"]].tolist() == (100.5, 102.25, 99.5, 101.0)
+    assert candles["number_of_trades"].tolist() == [3, 3]
+    # 0.1 + 0.2 is 0.30000000000000004 in floats
+    assert candles["volume"].tolist() == [0.3, 0.3]
+    assert candles["quote_asset_volume"].tolist() == [12345.67890124, 1.11111111]
+
+    candles = resample_klines(rows, "15m")
+    assert len(candles) == 1
+    assert candles["volume"][0] == 0.6
+    assert candles["quote_asset_volume"][0] == 12346.79001235
+
+def test_large_volume_sums_are_exact():
+    # Past 2**53 units of 1e-8 the sum goes through an exact fraction
+    rows = decode_klines([
+        _kline(1704672000000 + i * MINUTE, "1", "1", "1", "1", volume)
+        for i, volume in enumerate(["90000000.12345678", "0.87654322", "12.00000001"])
+    ])
+    assert resample_klines(rows, "1h")["volume"][0] == 90000013.00000001
+
+def test_weeks_start_on_monday_and_months_on_the_first():
+    rows = decode_klines([
+        _kline(1704671940000, "1", "2", "1", "2", "1"),  # Sunday 2024-01-07 23:59
+        _kline(1704672000000, "2", "3", "2", "3", "1"),  # Monday 2024-01-08 00:00
+    ])
+    weeks = resample_klines(rows, "1w")
+    assert weeks["open_time"].tolist() == [1704067200000, 1704672000000]
+    assert weeks["close_time"].tolist() == [1704671999999, 1705276799999]
+
+    rows = decode_klines([
+        _kline(1709251140000, "1", "2", "1", "2", "1"),  # 2024-02-29 23:59
+        _kline(1709251200000, "2", "3", "2", "3", "1"),  # 2024-03-01 00:00
+    ])
+    months = resample_klines(rows, "1M")
+    assert months["open_time"].tolist() == [1706745600000, 1709251200000]
+    assert months["close_time"].tolist() == [1709251199999, 1711929599999]